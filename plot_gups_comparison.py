@@ -1,15 +1,22 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project'))
+from results_store import default_store
+
+# --- 1. 数据准备 (从结果库读取，见 project/logs/manual_results.csv) ---
+store = default_store()
+sizes, pytorch_gups = store.series('nx', 'gups', run_id='gups_comparison', label='PyTorch (High-level)')
 
-# --- 1. 数据准备 ---
 # 规模标签
-labels = ['1024^2', '2048^2', '4096^2']
+labels = [f'{n}^2' for n in sizes]
 
-# PyTorch (Section 4.2) 的 GUPS 数据
-pytorch_gups = [11.13, 11.82, 13.24] 
+# PyTorch (Section 4.2) 的 GUPS 数据 (上面已读取)
 
 # Numba-Shared (Section 4.3) 的 GUPS 数据
-numba_shared_gups = [2.42, 15.89, 15.48] 
+_, numba_shared_gups = store.series('nx', 'gups', run_id='gups_comparison', label='Numba-Shared (Optimized)')
 
 x = np.arange(len(labels))  # 标签位置
 width = 0.35  # 柱状条宽度
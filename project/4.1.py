@@ -1,11 +1,10 @@
 import matplotlib.pyplot as plt
-import numpy as np
+from results_store import default_store
 
-# --- 填入你的实验数据 ---
-sizes = np.array([128, 256, 512, 1024, 2048])
-time_np = np.array([0.0380, 0.1255, 0.4837, 3.1655, 13.4633])
-# 注意：这里我暂且用 24.0s 作为 4096 的预估值，如果你重测了请修改
-time_parallel = np.array([0.0362, 0.1180, 0.4229, 1.6201, 5.7754])
+# --- 实验数据：从结果库读取 (logs/manual_results.csv 里 run_id = 4.1 的行) ---
+store = default_store()
+sizes, time_np = store.series('nx', 'time', run_id='4.1', label='NumPy (Single Core)')
+_, time_parallel = store.series('nx', 'time', run_id='4.1', label='Numba (16 Threads)')
 
 # 计算加速比
 speedup = time_np / time_parallel
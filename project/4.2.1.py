@@ -1,15 +1,23 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import default_store
 
-# 实验数据
-grid_labels = ['128', '256', '512', '1024', '2048', '4096']
+# 实验数据：从结果库读取 (logs/manual_results.csv 里 run_id = 4.2 的行)
+store = default_store()
+
+def times(label):
+    """run_id = 4.2 里某条曲线按 grid_labels 排列的时间，没测的规模为 None"""
+    xs, ys = store.series('nx', 'time', run_id='4.2', label=label)
+    t = dict(zip(xs.tolist(), ys.tolist()))
+    return [t.get(int(g)) for g in grid_labels]
+
+grid_labels = [str(n) for n in store.series('nx', 'time', run_id='4.2', label='CuPy GPU (A100)')[0]]
 x = np.arange(len(grid_labels))
 
-# 填入实验数据
-# CPU 在 4096 处设为 None
-cpu_numba_time = [0.045, 0.12, 0.462, 1.831, 7.420, None]
-gpu_cupy_time = [0.3653, 0.3630, 0.3634, 0.3659, 0.3777, 1.2830]
-gpu_pytorch_time = [0.3730, 0.3477, 0.3489, 0.3486, 0.3542, 1.2667]
+# CPU 在 4096 处没有数据 (None)
+cpu_numba_time = times('Numba CPU (16-core)')
+gpu_cupy_time = times('CuPy GPU (A100)')
+gpu_pytorch_time = times('PyTorch GPU (A100)')
 
 plt.figure(figsize=(10, 6))
 
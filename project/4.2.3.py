@@ -1,12 +1,21 @@
 import matplotlib.pyplot as plt
 import numpy as np
-
-# 1. 实验原始数据 (基于你提供的 Log)
-grid_labels = ['128', '256', '512', '1024', '2048']
-# 由于 CPU 在 4096 处 OOM，加速比计算仅到 2048 为止
-cpu_numba_time = np.array([0.045, 0.12, 0.462, 1.831, 7.420])
-gpu_cupy_time = np.array([0.3653, 0.3630, 0.3634, 0.3659, 0.3777])
-gpu_pytorch_time = np.array([0.3730, 0.3477, 0.3489, 0.3486, 0.3542])
+from results_store import default_store
+
+# 1. 实验原始数据：从结果库读取 (logs/manual_results.csv 里 run_id = 4.2 的行)
+store = default_store()
+
+def times(label):
+    """run_id = 4.2 里某条曲线按 grid_labels 排列的时间，没测的规模为 None"""
+    xs, ys = store.series('nx', 'time', run_id='4.2', label=label)
+    t = dict(zip(xs.tolist(), ys.tolist()))
+    return [t.get(int(g)) for g in grid_labels]
+
+# 由于 CPU 在 4096 处 OOM，加速比计算仅到 CPU 有数据的规模为止
+grid_labels = [str(n) for n in store.series('nx', 'time', run_id='4.2', label='Numba CPU (16-core)')[0]]
+cpu_numba_time = np.array(times('Numba CPU (16-core)'))
+gpu_cupy_time = np.array(times('CuPy GPU (A100)'))
+gpu_pytorch_time = np.array(times('PyTorch GPU (A100)'))
 
 # 2. 计算加速比 (T_cpu / T_gpu)
 cup_speedup = cpu_numba_time / gpu_cupy_time
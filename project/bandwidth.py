@@ -0,0 +1,251 @@
+import os
+import sys
+import time
+from dataclasses import dataclass
+import numpy as np
+import config
+import sources
+
+# 带宽与 Roofline：Jacobi 五点模板每个点只做 9 次浮点运算，却至少要搬 12 字节 (float32 读 pd、b，写 p)，
+# 算术强度 < 1 flop/byte，所有后端都受内存带宽限制。GUPS 只说明快了多少，
+# 这里用每个后端的访存模型把 GUPS 换算成实际带宽 (bytes/s)，再除以 STREAM 实测的可达带宽，
+# 得到 "% of attainable"：接近 100% 时再改模板本身已经没有意义，只能减少访存 (时间分块、降精度)。
+
+FLOPS_PER_POINT = 9   # 4 次加减 + 5 次乘法
+
+@dataclass(frozen=True)
+class Traffic:
+    """
+    一个后端每次 Jacobi 扫描的访存量，以 "整场数组的遍数" 计 (乘以内部点数和元素字节数即为字节数)。
+    reads / writes: 模板本身 (融合核是 pd、b 各读一遍、写一遍 p；数组表达式后端还要算上临时数组)。
+    copies: 每步额外的整场拷贝 (读一遍写一遍)，例如多 GPU 版本的 pd[:] = p 快照。
+    check: 每次收敛检查额外的遍数 (在计算核内顺带归约的后端为 0)。
+    bc: 每步把整圈边界重写几遍 (只有双 GPU 版本每步重置边界，其余后端的边界值固定在两个缓冲区里)。
+    halo_rows: 每步交换的 halo 行数 (读 + 写)。
+    host: CPU 后端。普通存储先把目标缓存行读进来 (write-allocate)，每次写入多算一遍读；原地更新不算。
+    time_block: 是否按 time_block=k 参数在缓存里连做 k 步，访存量除以 k。
+    dense_b: 源项是稠密 b 时多出来的遍数 (读写合计)。reads / writes 按点源 (sources.Points，默认) 计，
+        点源时核里不读 b；source= 是稠密 / 解析源项、sparse_b=False 或走 time_block 路径时再加上这一项。
+    """
+    reads: float
+    writes: float
+    copies: float = 0.0
+    check: float = 0.0
+    bc: int = 0
+    halo_rows: int = 0
+    host: bool = False
+    in_place: bool = False
+    time_block: bool = False
+    dense_b: float = 0.0
+
+# NumPy / CuPy / PyTorch 的数组表达式 ((a + b) * dy2 + (c + d) * dx2 - b * dx2 * dy2) * div_term
+# 拆成 9 个二元运算和一次切片赋值，每个运算读 1~2 个、写 1 个整场临时数组：共读 14 遍、写 10 遍。
+# 收敛检查 p - pd、abs、max 再读 4 遍、写 2 遍。
+_EXPR = dict(reads=14, writes=10, check=6)
+# 点源时表达式少了 b 那一项 (3 个运算)：读 10 遍、写 7 遍；稠密 b 时多出的 4 读 3 写记在 dense_b 里
+_EXPR_POINTS = dict(reads=10, writes=7, check=6, dense_b=7)
+
+TRAFFIC = {
+    "cpu":          Traffic(**_EXPR, host=True),
+    # 点源时只读 pd、写 p
+    "cpu_auto":     Traffic(reads=1, writes=1, host=True, time_block=True, dense_b=1),
+    # 红黑 SOR 原地更新：两种颜色各扫一遍，每遍读 p、b，写回 p 的缓存行
+    "cpu_rbsor":    Traffic(reads=4, writes=2, host=True, in_place=True),
+    "shm":          Traffic(reads=2, writes=1, check=2, host=True),
+    # 16 位存储 (以 float32 整场的遍数计，读写一遍 16 位的场 = 0.5)：只读 pd、写 p，b 用稀疏表不读；
+    # 稠密 b 也是 16 位，多读 0.5 遍
+    "cpu_bf16":     Traffic(reads=0.5, writes=0.5, host=True, dense_b=0.5),
+    "cpu_fp16":     Traffic(reads=0.5, writes=0.5, host=True, dense_b=0.5),
+    # 每遍从 memmap (页缓存或磁盘) 读一遍 pd、b，写一遍 p，摊到 time_block 步上；带的 halo 重复部分不计
+    "ooc":          Traffic(reads=2, writes=1, host=True, time_block=True),
+    "torch":        Traffic(**_EXPR_POINTS),
+    "cupy":         Traffic(**_EXPR),
+    "cupy_2gpu":    Traffic(**_EXPR, copies=1, bc=1, halo_rows=2),
+    # 邻点复用由 L1/L2 (或 shared memory) 完成，显存只看到 pd、b 各一遍和 p 一遍 (点源时没有 b)
+    "numba":        Traffic(reads=1, writes=1, check=2, dense_b=1),
+    "numba_shared": Traffic(reads=2, writes=1, check=2),
+    # float16 的 pd 读一遍、p 写一遍；检查时 max|Δp| 读两个场、max|p| 读两个 (其中一个全 0)
+    "numba_fp16":   Traffic(reads=0.5, writes=0.5, check=2),
+}
+
+def traffic_bytes(backend, nx, ny, iterations, params=None, checks=None, itemsize=4):
+    """
+    按 TRAFFIC 模型估算 iterations 次扫描搬运的字节数；没有模型的后端 (多重网格、CG、FFT 等) 返回 NaN。
+    checks: 收敛检查次数，默认按 config 估计 (BENCHMARK_MODE 下为 0)。
+    """
+    model = TRAFFIC.get(backend)
+    if model is None:
+        return float("nan")
+    params = params or {}
+    if checks is None:
+        checks = 0 if config.BENCHMARK_MODE else iterations // config.CHECK_INTERVAL + 1
+    interior = (nx - 2) * (ny - 2)
+    allocate = model.writes if (model.host and not model.in_place) else 0.0
+    passes = model.reads + model.writes + allocate + 2 * model.copies
+    if (not sources.is_sparse(params.get("source")) or not params.get("sparse_b", True)
+            or int(params.get("time_block", 1)) > 1):
+        passes += model.dense_b
+    per_sweep = interior * passes + 2 * (nx + ny) * model.bc + 2 * nx * model.halo_rows
+    if model.time_block:
+        per_sweep /= max(int(params.get("time_block", 1)), 1)
+    return itemsize * (iterations * per_sweep + checks * interior * model.check)
+
+def achieved_bandwidth(backend, nx, ny, iterations, seconds, params=None, checks=None, itemsize=4):
+    """按访存模型算出的实际带宽 (bytes/s)，没有模型或时间为 0 时为 NaN。"""
+    if not seconds > 0:
+        return float("nan")
+    return traffic_bytes(backend, nx, ny, iterations, params, checks, itemsize) / seconds
+
+def roofline_gups(backend, peak, params=None, itemsize=4):
+    """带宽上限 peak (bytes/s) 下模型允许的最高 GUPS (大网格、不做收敛检查)。"""
+    n = 4096
+    return peak * n * n / (traffic_bytes(backend, n, n, 1, params, checks=0, itemsize=itemsize) * 1e9)
+
+# ---------------------------------------------------------------------------------------------------
+# STREAM 风格的可达带宽标定 (CPU)
+# 字节数按实际搬运量计：copy 读 1 写 1，triad 读 2 写 1，加上普通存储的 write-allocate，
+# 与上面的访存模型口径一致 (所以会比官方 STREAM 的计数高 1/2 ~ 1/3)。
+# ---------------------------------------------------------------------------------------------------
+
+_kernels = None
+_peak_cache = {}
+
+def _stream_kernels():
+    global _kernels
+    if _kernels is None:
+        from numba import njit, prange
+
+        @njit(parallel=True, cache=True)
+        def copy(dst, src):
+            for i in prange(dst.shape[0]):
+                dst[i] = src[i]
+
+        @njit(parallel=True, cache=True)
+        def triad(a, b, c, s):
+            for i in prange(a.shape[0]):
+                a[i] = b[i] + s * c[i]
+
+        _kernels = copy, triad
+    return _kernels
+
+def stream_size(itemsize=4):
+    """每个数组的元素数：至少 4 倍末级缓存，避免测到缓存带宽 (虚拟机上报的 L3 可能很大，上限 256 MB)。"""
+    from benchmark_time_block import last_level_cache_bytes
+    llc = last_level_cache_bytes() or 32 * 1024 ** 2
+    return min(max(4 * llc, 64 * 1024 ** 2), 256 * 1024 ** 2) // itemsize
+
+def stream(n=None, repeats=10, dtype=np.float32):
+    """
+    NumPy 和 Numba (prange，当前 Numba 线程数) 的 copy / triad，返回 {名字: 最好一次的 bytes/s}。
+    NumPy triad 没有融合，拆成 multiply(out=a) 和原地 add 两遍。
+    """
+    n = n or stream_size(np.dtype(dtype).itemsize)
+    a = np.zeros(n, dtype=dtype)
+    b = np.ones(n, dtype=dtype)
+    c = np.full(n, 2.0, dtype=dtype)
+    s = dtype(3.0)
+    copy, triad = _stream_kernels()
+    copy(a, b)
+    triad(a, b, c, s)
+
+    def numpy_triad():
+        np.multiply(c, s, out=a)
+        np.add(a, b, out=a)
+
+    item = a.itemsize * n
+    tests = {
+        # (函数, 每次调用搬运的整场遍数)
+        "numpy copy":  (lambda: np.copyto(a, b), 3),
+        "numpy triad": (numpy_triad, 6),
+        "numba copy":  (lambda: copy(a, b), 3),
+        "numba triad": (lambda: triad(a, b, c, s), 4),
+    }
+    results = {}
+    for name, (fn, passes) in tests.items():
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = passes * item / best
+    return results
+
+def host_peak_bandwidth(repeats=10):
+    """
+    CPU 可达带宽 (bytes/s)：环境变量 POISSON_PEAK_GBS 优先，否则按当前 Numba 线程数跑一次 stream() 取最大值。
+    结果按线程数缓存，同一进程里只标定一次。
+    """
+    if os.environ.get("POISSON_PEAK_GBS"):
+        return float(os.environ["POISSON_PEAK_GBS"]) * 1e9
+    import numba
+    threads = numba.get_num_threads()
+    if threads not in _peak_cache:
+        _peak_cache[threads] = max(stream(repeats=repeats).values())
+    return _peak_cache[threads]
+
+def device_peak_bandwidth():
+    """
+    GPU 理论显存带宽 (bytes/s)：POISSON_GPU_PEAK_GBS 优先，否则由显存时钟和位宽算出 (DDR，乘 2)。
+    没有 GPU 时返回 NaN。
+    """
+    if os.environ.get("POISSON_GPU_PEAK_GBS"):
+        return float(os.environ["POISSON_GPU_PEAK_GBS"]) * 1e9
+    try:
+        from numba import cuda
+        if not cuda.is_available():
+            return float("nan")
+        dev = cuda.get_current_device()
+        return 2.0 * dev.MEMORY_CLOCK_RATE * 1e3 * dev.GLOBAL_MEMORY_BUS_WIDTH / 8
+    except Exception:
+        return float("nan")
+
+def attainable_bandwidth(backend):
+    """后端所在设备的可达带宽 (bytes/s)：CPU 后端用 STREAM 标定值，GPU 后端用显存理论带宽。"""
+    model = TRAFFIC.get(backend)
+    if model is None:
+        return float("nan")
+    return host_peak_bandwidth() if model.host else device_peak_bandwidth()
+
+def percent_of_attainable(backend, bandwidth):
+    """实际带宽占可达带宽的百分比。网格能放进缓存时模型按 DRAM 流量计，可能超过 100%。"""
+    peak = attainable_bandwidth(backend)
+    return 100.0 * bandwidth / peak if peak > 0 else float("nan")
+
+def run_roofline_report(sizes=(512, 1024, 2048), backends=("cpu", "cpu_auto", "cpu_rbsor", "shm")):
+    import numba
+    import solvers
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 200
+
+    print("==========================================================================")
+    print(f" STREAM Calibration (CPU, {stream_size()} elements per array)")
+    print("==========================================================================")
+    results = stream()
+    for name, bw in results.items():
+        print(f"{name:<12}: {bw / 1e9:8.2f} GB/s")
+    peak = max(results.values())
+    _peak_cache.setdefault(numba.get_num_threads(), peak)
+    print(f"Attainable  : {peak / 1e9:8.2f} GB/s")
+
+    print("\n==========================================================================")
+    print(f" Roofline: achieved bandwidth per backend ({FIXED_ITER} iterations)")
+    print("==========================================================================")
+    print(f"{'Backend':^10} | {'Grid':^10} | {'B/point':^7} | {'GUPS':^8} | {'Bound':^8} | {'GB/s':^8} | {'% Attain':^8}")
+    print("-" * 76)
+    for backend in backends:
+        if backend not in solvers.available_backends():
+            continue
+        for size in sizes:
+            res = solvers.solve(backend, nx=size, ny=size, max_iter=FIXED_ITER, tol=0.0)
+            per_point = traffic_bytes(backend, size, size, 1, checks=0) / ((size - 2) * (size - 2))
+            print(f"{backend:^10} | {f'{size}x{size}':^10} | {per_point:^7.1f} | {res.gups:^8.3f} | "
+                  f"{roofline_gups(backend, peak):^8.3f} | {res.bandwidth / 1e9:^8.2f} | "
+                  f"{percent_of_attainable(backend, res.bandwidth):^8.1f}")
+    print("-" * 76)
+    print(f"Arithmetic intensity (fused kernels): {FLOPS_PER_POINT / 16:.2f} flop/byte (CPU), "
+          f"{FLOPS_PER_POINT / 12:.2f} flop/byte (GPU)")
+
+if __name__ == "__main__":
+    # 用法: python bandwidth.py [网格大小 ...]
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (512, 1024, 2048)
+    run_roofline_report(sizes)
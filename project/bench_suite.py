@@ -0,0 +1,311 @@
+import os
+import sys
+import csv
+import json
+import time
+import socket
+import platform
+import argparse
+import subprocess
+import numpy as np
+import config
+import solvers
+import bandwidth
+import memory
+
+# 统一的基准入口，代替各个 benchmark_*.py 里各自的表格和单次 time.time()：
+#   - 后端 × 网格 × 线程数 的矩阵只在 MATRIX 里声明
+#   - 每个配置先编译、再跑 WARMUP 次不计入的预热，然后用 perf_counter 重复测 REPEATS 次，报告中位数和 IQR
+#   - 每条记录带访存模型换算的带宽 (GB/s) 和占 STREAM 可达带宽的百分比 (见 bandwidth.py)
+#   - 另外用一次不计时的运行量内存峰值和每个网格点的字节数；估计放不下的网格在分配之前就跳过 (见 memory.py)
+#   - 结果写成 JSON (含主机信息) 和 CSV (results_store 列名，可直接 ingest)，默认放在 logs/ 下，
+#     results_store.default_store() 会自动导入
+#   - compare 模式按 GUPS 与保存的基线对比，下降超过阈值的标为回归 (退出码 1，可用于 CI / 作业脚本)
+
+FIXED_ITER = 500
+REPEATS = 5
+WARMUP = 1
+
+# threads=None 表示不设置线程数 (GPU 后端)；线程数超过 NUMBA_NUM_THREADS 的配置跳过
+MATRIX = {
+    "quick": [
+        {"backend": "cpu_auto", "sizes": [128, 256], "threads": [1]},
+        {"backend": "shm", "sizes": [128, 256], "threads": [1]},
+    ],
+    "cpu": [
+        {"backend": "cpu", "sizes": [128, 256, 512], "threads": [1]},
+        {"backend": "cpu_auto", "sizes": [256, 512, 1024, 2048], "threads": [1, 4, 16, 32, 64]},
+        {"backend": "cpu_auto", "label": "time_block=4", "params": {"time_block": 4},
+         "sizes": [1024, 2048], "threads": [1, 16, 64]},
+        {"backend": "shm", "sizes": [256, 512, 1024, 2048], "threads": [4, 16, 32, 64]},
+        {"backend": "cpu_bf16", "sizes": [1024, 2048], "threads": [1, 16, 64]},
+        {"backend": "cpu_fp16", "sizes": [1024, 2048], "threads": [1, 16, 64]},
+        {"backend": "ooc", "label": "time_block=8", "params": {"time_block": 8},
+         "sizes": [1024, 2048, 4096], "threads": [1, 16, 64]},
+    ],
+    "gpu": [
+        {"backend": "torch", "sizes": [1024, 2048, 4096], "threads": [None]},
+        {"backend": "cupy", "sizes": [1024, 2048, 4096], "threads": [None]},
+        {"backend": "numba", "sizes": [1024, 2048, 4096], "threads": [None]},
+        {"backend": "numba_shared", "sizes": [1024, 2048, 4096], "threads": [None]},
+        {"backend": "numba_fp16", "sizes": [1024, 2048, 4096], "threads": [None]},
+    ],
+}
+
+# 线程数以参数形式传入的后端 (其余后端用 numba.set_num_threads)
+THREAD_PARAM = {"shm": "workers"}
+
+# 对比时用来配对记录的字段
+KEY = ("backend", "label", "nx", "ny", "threads")
+
+def host_metadata():
+    """主机与软件环境信息，写进每次运行的 JSON；CSV 里每条记录带 hostname。"""
+    import numba
+    meta = {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__,
+        "numba_threads": numba.config.NUMBA_NUM_THREADS,
+        "threading_layer": numba.config.THREADING_LAYER,
+        "cpu_model": platform.processor(),
+        "cpus": os.cpu_count(),
+        "affinity": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None,
+        "slurm_job_id": os.environ.get("SLURM_JOB_ID"),
+        "git_commit": None,
+        "gpu": None,
+    }
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    meta["cpu_model"] = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    try:
+        meta["git_commit"] = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                                            timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        pass
+    try:
+        from numba import cuda
+        if cuda.is_available():
+            meta["gpu"] = cuda.get_current_device().name.decode()
+    except Exception:
+        pass
+    return meta
+
+def _set_threads(threads):
+    import numba
+    if threads is None:
+        return True
+    if threads > numba.config.NUMBA_NUM_THREADS:
+        return False
+    numba.set_num_threads(threads)
+    return True
+
+def measure(backend, size, threads=None, params=None, label="", iters=FIXED_ITER,
+            repeats=REPEATS, warmup=WARMUP):
+    """
+    测一个配置：编译 (单独计时) -> warmup 次预热 -> repeats 次 perf_counter 计时。
+    time / time_iqr 是整次 solvers.solve 调用的墙钟时间 (含分配、进程启动)；
+    solve_time 是后端自己报告的计算时间 (中位数)，gups 和它的四分位 gups_q25 / gups_q75 按它计算。
+    peak_mem / peak_rss (MB) 和 bytes_per_cell 来自最后一次单独的 track_memory 运行，不影响计时。
+    """
+    kwargs = dict(params or {})
+    if threads is not None and backend in THREAD_PARAM:
+        kwargs[THREAD_PARAM[backend]] = threads
+
+    t0 = time.perf_counter()
+    res = solvers.solve(backend, nx=size, ny=size, max_iter=2, tol=0.0, **kwargs)
+    compile_time = res.compile_time
+    for _ in range(warmup):
+        solvers.solve(backend, nx=size, ny=size, max_iter=iters, tol=0.0, warmup=False, **kwargs)
+    setup_time = time.perf_counter() - t0
+
+    walls, solves = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        res = solvers.solve(backend, nx=size, ny=size, max_iter=iters, tol=0.0, warmup=False, **kwargs)
+        walls.append(time.perf_counter() - t0)
+        solves.append(res.wall_time)
+
+    mem = solvers.solve(backend, nx=size, ny=size, max_iter=iters, tol=0.0, warmup=False,
+                        track_memory=True, **kwargs).memory
+
+    q25, median, q75 = np.percentile(walls, [25, 50, 75])
+    # GUPS 用后端计时：shm 的墙钟时间里有进程启动，会把吞吐量压得很低
+    s25, s50, s75 = np.percentile(solves, [25, 50, 75])
+    sweeps = solvers.BACKENDS[backend].sweeps
+    updates = size * size * res.iterations
+    # 访存模型换算的带宽，和同一线程数下 STREAM 标定的可达带宽比
+    bw = bandwidth.achieved_bandwidth(backend, size, size, res.iterations, s50, params, checks=0)
+    peak = bandwidth.attainable_bandwidth(backend)
+    return {"backend": backend, "label": label, "nx": size, "ny": size,
+            "threads": -1 if threads is None else threads, "ranks": 1,
+            "iterations": res.iterations, "mode": "fixed", "status": "",
+            "time": float(median), "time_iqr": float(q75 - q25),
+            "gups": updates / (s50 * 1e9) if sweeps else float("nan"),
+            "gups_q25": updates / (s75 * 1e9) if sweeps else float("nan"),
+            "gups_q75": updates / (s25 * 1e9) if sweeps else float("nan"),
+            "bandwidth": bw / 1e9, "peak_bandwidth": peak / 1e9,
+            "pct_peak": 100.0 * bw / peak if peak > 0 else float("nan"),
+            "peak_mem": mem.peak_bytes / 1e6, "peak_rss": mem.peak_rss / 1e6,
+            "bytes_per_cell": mem.bytes_per_cell,
+            "solve_time": float(s50), "compile_time": compile_time,
+            "warmup_time": setup_time, "repeats": repeats, "timestamp": time.time()}
+
+def run_suite(suite="quick", iters=FIXED_ITER, repeats=REPEATS, warmup=WARMUP, only_threads=None,
+              backends=None):
+    """按 MATRIX[suite] 跑完整个矩阵，返回记录列表 (不可用的后端跳过)。"""
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    records = []
+    print("======================================================================================")
+    print(f" Benchmark Suite '{suite}' ({iters} iterations, {warmup} warm-up + {repeats} timed runs, perf_counter)")
+    print("======================================================================================")
+    print(f"{'Backend':^14} | {'Label':^12} | {'Grid':^10} | {'Thr':^4} | {'Median (s)':^10} | {'IQR (s)':^9} | {'GUPS':^8} | {'GB/s':^7} | {'% Peak':^6} | {'B/cell':^6}")
+    print("-" * 113)
+    for entry in MATRIX[suite]:
+        backend = entry["backend"]
+        if backends and backend not in backends:
+            continue
+        for threads in entry.get("threads", [None]):
+            if only_threads and threads is not None and threads not in only_threads:
+                continue
+            if not _set_threads(threads):
+                print(f"{backend:^14} | {entry.get('label', ''):^12} | {'':^10} | {threads:^4} | skipped: "
+                      f"more threads than NUMBA_NUM_THREADS")
+                continue
+            for size in entry["sizes"]:
+                ok, need, avail, where = memory.fits(backend, size, size, entry.get("params"))
+                if not ok:
+                    print(f"{backend:^14} | {entry.get('label', ''):^12} | {f'{size}x{size}':^10} | "
+                          f"{'-' if threads is None else threads:^4} | skipped: needs ~{need / 1e9:.1f} GB "
+                          f"{where} memory, {avail / 1e9:.1f} GB available")
+                    continue
+                try:
+                    rec = measure(backend, size, threads, entry.get("params"), entry.get("label", ""),
+                                  iters, repeats, warmup)
+                except (ImportError, RuntimeError, MemoryError) as e:
+                    print(f"{backend:^14} | {entry.get('label', ''):^12} | {f'{size}x{size}':^10} | "
+                          f"{'-' if threads is None else threads:^4} | skipped: {e}")
+                    break
+                records.append(rec)
+                print(f"{backend:^14} | {rec['label']:^12} | {f'{size}x{size}':^10} | "
+                      f"{'-' if threads is None else threads:^4} | {rec['time']:^10.4f} | "
+                      f"{rec['time_iqr']:^9.4f} | {rec['gups']:^8.3f} | {rec['bandwidth']:^7.2f} | "
+                      f"{rec['pct_peak']:^6.1f} | {rec['bytes_per_cell']:^6.1f}", flush=True)
+    print("-" * 113)
+    return records
+
+def save_results(records, meta, prefix):
+    """写 <prefix>.json (主机信息 + 记录) 和 <prefix>.csv (每条记录一行，带 host 列)。"""
+    run_id = os.path.basename(prefix)
+    for rec in records:
+        rec["run_id"] = run_id
+        rec["host"] = meta["hostname"]
+    with open(prefix + ".json", "w") as f:
+        json.dump({"run_id": run_id, "host": meta, "records": records}, f, indent=1)
+    fields = []
+    for rec in records:
+        fields += [k for k in rec if k not in fields]
+    with open(prefix + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+    return prefix + ".json", prefix + ".csv"
+
+def load_records(path):
+    """读 save_results 写出的 JSON 或 CSV，返回记录列表 (数值列转回数字)。"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)["records"]
+    records = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            rec = {}
+            for k, v in row.items():
+                try:
+                    rec[k] = int(v) if k in ("nx", "ny", "threads", "ranks", "iterations") else float(v)
+                except ValueError:
+                    rec[k] = v
+            records.append(rec)
+    return records
+
+def compare(records, baseline, threshold=0.05):
+    """
+    按 (backend, label, nx, ny, threads) 配对，打印 GUPS 变化。
+    新 GUPS 比基线低 threshold 以上 (默认 5%) 的标为 REGRESSION，返回这些配对的列表。
+    """
+    base = {tuple(r[k] for k in KEY): r for r in baseline}
+    regressions = []
+    print("======================================================================================")
+    print(f" GUPS comparison against baseline (regression threshold: {threshold * 100:.0f}%)")
+    print("======================================================================================")
+    print(f"{'Backend':^14} | {'Label':^12} | {'Grid':^10} | {'Thr':^4} | {'Base GUPS':^9} | {'New GUPS':^9} | {'Change':^7} | {'Flag':^10}")
+    print("-" * 94)
+    for rec in records:
+        key = tuple(rec[k] for k in KEY)
+        if key not in base:
+            continue
+        old, new = float(base[key]["gups"]), float(rec["gups"])
+        if not (old > 0 and new == new):
+            continue
+        change = new / old - 1.0
+        flag = ""
+        if change < -threshold:
+            flag = "REGRESSION"
+            regressions.append((rec, base[key]))
+        elif change > threshold:
+            flag = "faster"
+        threads = "-" if rec["threads"] in (-1, None) else rec["threads"]
+        grid = f"{rec['nx']}x{rec['ny']}"
+        print(f"{rec['backend']:^14} | {rec['label']:^12} | {grid:^10} | {threads:^4} | "
+              f"{old:^9.3f} | {new:^9.3f} | {f'{change * 100:+.1f}%':^7} | {flag:^10}")
+    print("-" * 94)
+    print(f"{len(regressions)} regression(s)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poisson solver benchmark suite")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="run a benchmark matrix")
+    run.add_argument("suite", nargs="?", default="quick", choices=list(MATRIX))
+    run.add_argument("--iters", type=int, default=FIXED_ITER)
+    run.add_argument("--repeats", type=int, default=REPEATS)
+    run.add_argument("--warmup", type=int, default=WARMUP)
+    run.add_argument("--threads", type=lambda s: [int(t) for t in s.split(",")], default=None,
+                     help="only these thread counts, e.g. 1,16")
+    run.add_argument("--backends", type=lambda s: s.split(","), default=None)
+    run.add_argument("--out", default=None, help="output prefix (default logs/suite_<run id>)")
+    run.add_argument("--baseline", default=None, help="compare against this JSON/CSV after the run")
+    run.add_argument("--threshold", type=float, default=0.05)
+
+    cmp_ = sub.add_parser("compare", help="compare two result files")
+    cmp_.add_argument("current")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("--threshold", type=float, default=0.05)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "compare":
+        return 1 if compare(load_records(args.current), load_records(args.baseline), args.threshold) else 0
+
+    meta = host_metadata()
+    records = run_suite(args.suite, args.iters, args.repeats, args.warmup, args.threads, args.backends)
+    run_id = meta["slurm_job_id"] or time.strftime("%Y%m%d-%H%M%S")
+    prefix = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs",
+                                      f"suite_{args.suite}_{meta['hostname']}_{run_id}")
+    for path in save_results(records, meta, prefix):
+        print(f"Saved: {path}")
+    if args.baseline:
+        return 1 if compare(records, load_records(args.baseline), args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    # 用法: python bench_suite.py run cpu --threads 1,16 --baseline logs/suite_cpu_base.json
+    #       python bench_suite.py compare new.json baseline.json --threshold 0.05
+    sys.exit(main())
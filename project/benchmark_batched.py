@@ -0,0 +1,40 @@
+import config
+from poisson_batched import solve_batched, point_sources, default_batch
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+
+def run_batched_benchmark():
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 500
+    sizes = [64, 128, 256, 512, 1024]
+    batches = [1, 4, 16]
+
+    threads = configure_numba_threads_from_env(default_threads=1)
+
+    # 预热 (Warm-up)
+    solve_cpu_auto(nx=64, ny=64, max_iter=2)
+    solve_batched(point_sources(2, 64, 64), max_iter=2)
+
+    print("==========================================================================")
+    print(f" Batched Multi-RHS Benchmark (Threads: {threads}, {FIXED_ITER} iterations, float32)")
+    print(" Per-field GUPS = nx * ny * iters * k / time / 1e9")
+    print("==========================================================================")
+    print(f"{'Grid':^10} | {'k':^4} | {'Loop (s)':^10} | {'Batch (s)':^10} | {'Loop GUPS':^9} | {'Batch GUPS':^10} | {'Gain':^6} | {'Auto batch':^10}")
+    print("-" * 91)
+
+    for size in sizes:
+        for k in batches:
+            b = point_sources(k, size, size)
+            # 逐个求解：k 次单场调用
+            loop_time = 0.0
+            for _ in range(k):
+                loop_time += solve_cpu_auto(nx=size, ny=size, max_iter=FIXED_ITER)[4]
+            _, _, _, _, batch_time = solve_batched(b, max_iter=FIXED_ITER, batch=k)
+            _, _, _, _, auto_time = solve_batched(b, max_iter=FIXED_ITER)
+            work = size * size * FIXED_ITER * k / 1e9
+            print(f"{size}x{size:<5} | {k:^4} | {loop_time:^10.4f} | {batch_time:^10.4f} | "
+                  f"{work / loop_time:^9.3f} | {work / batch_time:^10.3f} | {f'{loop_time / batch_time:.2f}x':^6} | "
+                  f"{f'{default_batch(size, size, k)}: {work / auto_time:.3f}':^10}")
+        print("-" * 91)
+
+if __name__ == "__main__":
+    run_batched_benchmark()
@@ -0,0 +1,32 @@
+import config
+from poisson_cg import solve_cg
+
+def run_cg_benchmark():
+    TOL = 1e-8   # 真实相对残差 ||b - L p|| / ||b||
+    MAX_ITER = 100000
+    sizes = [50, 100, 200, 400, 800, 1000, 2000]
+    preconds = ["none", "ssor", "chebyshev"]
+
+    # 预热 (Warmup): 触发 Numba JIT 编译
+    for pc in preconds:
+        solve_cg(nx=50, ny=50, max_iter=2, precond=pc)
+
+    print(f"=======================================================================")
+    print(f"   Matrix-free PCG Benchmark (float64)")
+    print(f"   Domain: [{config.X_MIN}, {config.X_MAX}] x [{config.Y_MIN}, {config.Y_MAX}] | Rel. Tol: {TOL}")
+    print(f"=======================================================================")
+    print(f"{'Grid':^10} | {'Precond':^10} | {'Iters':^8} | {'Time (s)':^10} | {'ms/iter':^8} | {'Status':^12}")
+    print("-" * 73)
+
+    for size in sizes:
+        for pc in preconds:
+            history = []
+            _, _, p, iters, duration = solve_cg(
+                nx=size, ny=size, max_iter=MAX_ITER, tol=TOL, precond=pc, history=history
+            )
+            status = "Converged" if iters < MAX_ITER else "Max Reached"
+            print(f"{size}x{size:<5} | {pc:^10} | {iters:^8} | {duration:^10.4f} | {duration / iters * 1e3:^8.3f} | {status:^12}")
+        print("-" * 73)
+
+if __name__ == "__main__":
+    run_cg_benchmark()
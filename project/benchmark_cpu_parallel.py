@@ -3,7 +3,26 @@ import time
 import config
 import numba
 import numpy as np
-from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+from poisson_cpu_parallel import (solve_cpu_auto, configure_numba_threads_from_env,
+                                  poisson_step_parallel)
+
+def copy_baseline(nx, ny, max_iter):
+    # 旧版循环：每步 pd[:] = p 整场拷贝 + 4 条边界重写，用来衡量双缓冲的收益
+    dx2 = np.float32((config.X_MAX - config.X_MIN) / (nx - 1)) ** 2
+    dy2 = np.float32((config.Y_MAX - config.Y_MIN) / (ny - 1)) ** 2
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+    p = np.zeros((ny, nx), dtype=np.float32)
+    pd = np.zeros((ny, nx), dtype=np.float32)
+    b = np.zeros((ny, nx), dtype=np.float32)
+    b[int(ny / 4), int(nx / 4)] = 100.0
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+
+    start_time = time.time()
+    for _ in range(max_iter):
+        pd[:] = p
+        poisson_step_parallel(p, pd, b, dx2, dy2, div_term, nx, ny)
+        p[0, :], p[-1, :], p[:, 0], p[:, -1] = 0.0, 0.0, 0.0, 0.0
+    return time.time() - start_time
 
 def run_scaling_benchmark():
     config.BENCHMARK_MODE = True # 统一固定步数
@@ -13,20 +32,24 @@ def run_scaling_benchmark():
     
     # 预热编译 (Warm-up)
     solve_cpu_auto(nx=128, ny=128, max_iter=10)
+    copy_baseline(128, 128, 10)
 
     sizes = [128, 256, 512, 1024, 2048]
 
     print("==========================================================")
     print(f" CPU Parallel Benchmark (Threads: {threads}, float32)")
     print("==========================================================")
-    print(f"{'Grid':^10} | {'Time (s)':^10} | {'Speedup':^10} | {'Max Val':^10}")
-    print("-" * 55)
+    print(f"{'Grid':^10} | {'Time (s)':^10} | {'GUPS':^8} | {'Copy GUPS':^9} | {'Gain':^6} | {'Max Val':^10}")
+    print("-" * 70)
 
     for size in sizes:
         _, _, p, iters, duration = solve_cpu_auto(
             nx=size, ny=size, max_iter=FIXED_ITER
         )
-        print(f"{size}x{size:<5} | {duration:^10.4f} | {'N/A':^10} | {np.max(p):^10.4f}")
+        gups = (size * size * iters) / (duration * 1e9)
+        copy_gups = (size * size * iters) / (copy_baseline(size, size, iters) * 1e9)
+        print(f"{size}x{size:<5} | {duration:^10.4f} | {gups:^8.3f} | {copy_gups:^9.3f} | "
+              f"{f'{gups / copy_gups:.2f}x':^6} | {np.max(p):^10.4f}")
 
 if __name__ == "__main__":
     run_scaling_benchmark()
\ No newline at end of file
@@ -24,8 +24,8 @@ def run_benchmark():
     print(f"   Base Tol: {BASE_TOL} (at 50x50) | Logic: Tol_new = Tol_base / (Size/50)^2")
     print(f"=======================================================================")
     # 表头格式完全对齐 CPU 版
-    print(f"{'Grid':^10} | {'Tol Used':^10} | {'Steps':^10} | {'Time (s)':^10} | {'Status':^12}")
-    print("-" * 68)
+    print(f"{'Grid':^10} | {'Tol Used':^10} | {'Steps':^10} | {'Time (s)':^10} | {'GUPS':^8} | {'Status':^12}")
+    print("-" * 79)
 
     # 预热 (Warmup)
     # CuPy 第一次运行需要编译 Kernel，为了不影响 50x50 的计时，我们在循环外先跑一次
@@ -50,14 +50,15 @@ def run_benchmark():
             )
             
             status = "Converged" if iters < config.MAX_ITER else "Max Reached"
+            gups = (size * size * iters) / (duration * 1e9)
             
             # 打印结果 (格式与 CPU 版一模一样)
-            print(f"{size}x{size:<5} | {dynamic_tol:.1e}  | {iters:^10} | {duration:^10.4f} | {status:^12}")
+            print(f"{size}x{size:<5} | {dynamic_tol:.1e}  | {iters:^10} | {duration:^10.4f} | {gups:^8.3f} | {status:^12}")
 
         except Exception as e:
              print(f"{size}x{size:<5} |   ERROR    | {str(e)}")
 
-    print("-" * 68)
+    print("-" * 79)
 
 if __name__ == "__main__":
     run_benchmark()
\ No newline at end of file
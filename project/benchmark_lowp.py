@@ -0,0 +1,92 @@
+import numpy as np
+import config
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+from poisson_lowp import solve_lowp
+
+# 16 位存储 (poisson_lowp.py) 与 float32 基线 (solve_cpu_auto) 的对比：
+#   1. 吞吐量：固定步数 (BENCHMARK_MODE)，全程 16 位
+#   2. 精度代价：收敛到同一个 tol，有精度保护 (最后阶段切回 float32) 和没有精度保护 (跑与基线相同的步数) 时
+#      相对 float32 解的最大相对误差，以及切换发生在第几步
+# 有 GPU 时再比较 solve_numba 的 fp32 / fp16。
+
+def rel_err(p, ref):
+    return float(np.abs(p - ref).max() / np.abs(ref).max())
+
+def run_throughput(threads):
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 200
+    sizes = [512, 1024, 2048, 4096]
+    variants = [("bf16", dict(storage="bf16")), ("fp16", dict(storage="fp16")),
+                ("bf16 dense b", dict(storage="bf16", sparse_b=False))]
+
+    # 预热编译 (Warm-up)
+    solve_cpu_auto(nx=128, ny=128, max_iter=1)
+    solve_lowp(nx=128, ny=128, max_iter=1)
+
+    print("==========================================================================")
+    print(f" Reduced-precision storage: throughput (Threads: {threads}, {FIXED_ITER} iterations)")
+    print("==========================================================================")
+    header = " | ".join(f"{name:^14}" for name, _ in variants)
+    print(f"{'Grid':^10} | {'fp32':^8} | {header}   (GUPS, speedup)")
+    print("-" * (23 + 17 * len(variants)))
+    for size in sizes:
+        _, _, _, iters, duration = solve_cpu_auto(nx=size, ny=size, max_iter=FIXED_ITER)
+        base = (size * size * iters) / (duration * 1e9)
+        cols = []
+        for _, params in variants:
+            _, _, _, iters, duration = solve_lowp(nx=size, ny=size, max_iter=FIXED_ITER, **params)
+            gups = (size * size * iters) / (duration * 1e9)
+            cols.append(f"{f'{gups:.3f} x{gups / base:.2f}':^14}")
+        print(f"{size}x{size:<5} | {base:^8.3f} | {' | '.join(cols)}")
+
+def run_accuracy():
+    config.BENCHMARK_MODE = False
+    TOL = 1e-7
+    MAX_ITER = 200000
+    # 更大的网格上 float32 基线本身就因为更新量低于 tol 提前停下 (离收敛很远)，误差对比没有意义
+    sizes = [128, 256]
+
+    print("==========================================================================")
+    print(f" Reduced-precision storage: accuracy vs float32 (tol {TOL})")
+    print("==========================================================================")
+    print(f"{'Grid':^10} | {'Format':^6} | {'fp32 it':^8} | {'it':^8} | {'switch':^7} | {'time x':^7} | "
+          f"{'rel err':^9} | {'no guard':^9}")
+    print("-" * 85)
+    for size in sizes:
+        _, _, ref, ref_it, ref_time = solve_cpu_auto(nx=size, ny=size, max_iter=MAX_ITER, tol=TOL)
+        for storage in ("bf16", "fp16"):
+            history = []
+            _, _, p, iters, duration = solve_lowp(nx=size, ny=size, max_iter=MAX_ITER, tol=TOL, storage=storage,
+                                                  history=history)
+            # 切换之后的检查记录带 L2 范数
+            switch = next((h[0] for h in history if h[2] is not None), None)
+            # 没有精度保护：跑与基线相同的步数，看 16 位存储停滞造成的误差
+            _, _, q, _, _ = solve_lowp(nx=size, ny=size, max_iter=ref_it, tol=0.0, storage=storage, guard=False)
+            print(f"{size}x{size:<5} | {storage:^6} | {ref_it:^8} | {iters:^8} | {str(switch):^7} | "
+                  f"{duration / ref_time:^7.2f} | {rel_err(p, ref):^9.2e} | {rel_err(q, ref):^9.2e}")
+
+def run_gpu():
+    from numba import cuda
+    if not cuda.is_available():
+        return
+    from poisson_numba import solve_numba
+    config.BENCHMARK_MODE = True
+    FIXED_ITER = 2000
+    print("==========================================================================")
+    print(f" GPU (Numba) fp32 vs fp16 storage ({FIXED_ITER} iterations)")
+    print("==========================================================================")
+    print(f"{'Grid':^10} | {'fp32':^8} | {'fp16':^8} | {'speedup':^7}   (GUPS)")
+    print("-" * 44)
+    solve_numba(nx=128, ny=128, max_iter=1, storage="fp16")
+    for size in [1024, 2048, 4096]:
+        gups = []
+        for storage in ("fp32", "fp16"):
+            _, _, _, iters, duration = solve_numba(nx=size, ny=size, max_iter=FIXED_ITER, storage=storage)
+            gups.append((size * size * iters) / (duration * 1e9))
+        print(f"{size}x{size:<5} | {gups[0]:^8.3f} | {gups[1]:^8.3f} | {gups[1] / gups[0]:^7.2f}")
+
+if __name__ == "__main__":
+    threads = configure_numba_threads_from_env(default_threads=1)
+    run_throughput(threads)
+    run_accuracy()
+    run_gpu()
@@ -0,0 +1,41 @@
+import warnings
+import config
+from poisson_cpu_parallel import solve_cpu_auto
+from poisson_mixed import solve_mixed
+from poisson_fft import reference_error
+
+def run_mixed_benchmark(sizes=(50, 100, 200, 400, 800, 1000, 2000)):
+    config.BENCHMARK_MODE = False
+    BASE_TOL = 1e-7   # float32 Jacobi 的动态容差 Tol_base / (Size/50)^2
+    MIXED_TOL = 1e-10 # 混合精度的 float64 相对残差
+    MAX_ITER = 200000
+
+    # 预热 (Warmup)
+    solve_cpu_auto(nx=50, ny=50, max_iter=10)
+    with warnings.catch_warnings():
+        # 两步外层迭代本来就到不了 tol
+        warnings.simplefilter("ignore", RuntimeWarning)
+        solve_mixed(nx=50, ny=50, max_iter=2)
+        solve_mixed(nx=50, ny=50, max_iter=2, inner="jacobi")
+
+    print("==========================================================================================")
+    print(f"   Mixed-Precision Iterative Refinement vs float32 Jacobi")
+    print(f"   f32: Tol = {BASE_TOL} / (Size/50)^2 on max|dp| | mixed: float64 rel. residual < {MIXED_TOL}")
+    print(f"   Err = max|p - p_DST| / max|p_DST|")
+    print("==========================================================================================")
+    print(f"{'Grid':^10} | {'f32 Iters':^9} | {'f32 (s)':^8} | {'f32 Err':^9} | "
+          f"{'Outer':^5} | {'Inner':^6} | {'Mixed (s)':^9} | {'Mixed Err':^9}")
+    print("-" * 90)
+
+    for size in sizes:
+        tol = BASE_TOL / ((size / 50.0) ** 2)
+        _, _, p32, iters, t32 = solve_cpu_auto(nx=size, ny=size, max_iter=MAX_ITER, tol=tol)
+        history = []
+        _, _, p, outer, t = solve_mixed(nx=size, ny=size, tol=MIXED_TOL, history=history)
+        inner = sum(h[2] for h in history)
+        print(f"{size}x{size:<5} | {iters:^9} | {t32:^8.3f} | {reference_error(p32):^9.2e} | "
+              f"{outer:^5} | {inner:^6} | {t:^9.4f} | {reference_error(p):^9.2e}")
+    print("-" * 90)
+
+if __name__ == "__main__":
+    run_mixed_benchmark()
@@ -1,13 +1,13 @@
 import os
+import sys
 from mpi4py import MPI
 
-# 1. 物理隔离
-localid = os.environ.get("SLURM_LOCALID", os.environ.get("OMPI_COMM_WORLD_LOCAL_RANK", "0"))
-os.environ["CUDA_VISIBLE_DEVICES"] = str(localid)
-os.environ["NUMBA_CUDA_USE_NVIDIA_BINDING"] = "1"
-os.environ["NUMBA_CUDA_REDUCE_MEMORY_USAGE"] = "0"
-
-from poisson_numba_mpi import solve_2gpu_mpi
+# 1. 物理隔离 (仅 GPU 模式；必须在 import numba 之前)
+if "cpu" not in sys.argv[1:]:
+    localid = os.environ.get("SLURM_LOCALID", os.environ.get("OMPI_COMM_WORLD_LOCAL_RANK", "0"))
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(localid)
+    os.environ["NUMBA_CUDA_USE_NVIDIA_BINDING"] = "1"
+    os.environ["NUMBA_CUDA_REDUCE_MEMORY_USAGE"] = "0"
 
 comm = MPI.COMM_WORLD
 rank = comm.Get_rank()
@@ -33,6 +33,7 @@ def run_weak_scaling():
         print("----------------------------------------------", flush=True)
 
     # 执行计算
+    from poisson_numba_mpi import solve_2gpu_mpi
     t = solve_2gpu_mpi(nx, total_ny, max_iter=iters, check_interval=check_interval)
 
     if rank == 0:
@@ -48,5 +49,46 @@ def run_weak_scaling():
             print(f"Weak Scaling Efficiency: {efficiency:.1f}%")
         print("==============================================", flush=True)
 
+def run_weak_scaling_cpu(base=1024, iters=500):
+    # --- Numba CPU + 二维笛卡尔分解，任意进程数 (mpirun -n 4 / 8 ...) ---
+    import config
+    from poisson_mpi_cart import solve_mpi_cart, choose_halo_width, make_cart
+    config.BENCHMARK_MODE = True
+
+    # 每个进程负责 base x base，全局网格按进程网格 py x px 放大
+    py, px = MPI.Compute_dims(size, 2)
+    nx, ny = base * px, base * py
+
+    # 单进程基线：rank 0 用 COMM_SELF 跑一个本地大小的问题
+    base_gups = None
+    if rank == 0:
+        _, _, _, _, t1 = solve_mpi_cart(base, base, iters, comm=MPI.COMM_SELF, gather=False)
+        base_gups = (base * base * iters) / (t1 * 1e9)
+        print(f"=== Weak Scaling Test ({size} ranks, {py}x{px} Cartesian, Numba CPU) ===")
+        print(f"Local Load per rank: {base} x {base}")
+        print(f"Total Grid Size    : {nx} x {ny}")
+        print(f"Iterations per run : {iters}")
+        print(f"Single-rank GUPS   : {base_gups:.3f}")
+        print("----------------------------------------------", flush=True)
+
+    # 深 halo：每 k 步交换一次 k 层，k 由 choose_halo_width 实测选择
+    k, _ = choose_halo_width(make_cart(), nx, ny)
+    runs = [("blocking  ", dict(overlap=False)),
+            ("overlapped", dict(overlap=True)),
+            (f"deep k={k:<3d}", dict(halo_width=k))]
+    for label, kwargs in runs:
+        _, _, _, _, t = solve_mpi_cart(nx, ny, iters, gather=False, **kwargs)
+        if rank == 0:
+            gups = (nx * ny * iters) / (t * 1e9)
+            print(f"Halo {label}: {t:.4f} s | {gups:.3f} GUPS | "
+                  f"Weak Scaling Efficiency: {gups / (base_gups * size) * 100:.1f}%", flush=True)
+    if rank == 0:
+        print("==============================================", flush=True)
+
 if __name__ == "__main__":
-    run_weak_scaling()
\ No newline at end of file
+    # 用法: srun python benchmark_mpi.py        (GPU，1 或 2 个进程)
+    #       mpirun -n 8 python benchmark_mpi.py cpu  (CPU，任意进程数)
+    if len(sys.argv) > 1 and sys.argv[1] == "cpu":
+        run_weak_scaling_cpu()
+    else:
+        run_weak_scaling()
\ No newline at end of file
@@ -0,0 +1,35 @@
+import config
+from poisson_multigrid import solve_multigrid, hierarchy_dims
+
+def run_multigrid_benchmark():
+    TOL = 1e-8   # 相对残差 ||b - L p|| / ||b||
+    MAX_CYCLES = 50
+    sizes = [50, 100, 200, 400, 800, 1000, 2000, 4096]
+
+    # 预热 (Warmup): 触发 Numba JIT 编译
+    solve_multigrid(nx=50, ny=50, max_cycles=2)
+
+    for cycle in ("V", "W"):
+        print(f"=======================================================================")
+        print(f"   Geometric Multigrid Benchmark ({cycle}-cycle, 2 pre / 2 post RB-GS)")
+        print(f"   Domain: [{config.X_MIN}, {config.X_MAX}] x [{config.Y_MIN}, {config.Y_MAX}] | Rel. Tol: {TOL}")
+        print(f"=======================================================================")
+        print(f"{'Grid':^10} | {'Levels':^6} | {'Cycles':^6} | {'Avg Factor':^10} | {'Time (s)':^10} | {'Status':^12}")
+        print("-" * 68)
+
+        for size in sizes:
+            history = []
+            _, _, p, cycles, duration = solve_multigrid(
+                nx=size, ny=size, max_cycles=MAX_CYCLES, tol=TOL, cycle=cycle, history=history
+            )
+            levels = len(hierarchy_dims(size, size))
+            # 平均每个循环的残差缩减因子
+            avg_factor = history[-1][1] ** (1.0 / len(history))
+            status = "Converged" if history[-1][1] < TOL else "Max Reached"
+
+            print(f"{size}x{size:<5} | {levels:^6} | {cycles:^6} | {avg_factor:^10.3f} | {duration:^10.4f} | {status:^12}")
+
+        print("-" * 68)
+
+if __name__ == "__main__":
+    run_multigrid_benchmark()
@@ -0,0 +1,47 @@
+import sys
+import config
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+from poisson_ooc import solve_ooc, band_rows_for, BAND_BUFFERS
+
+# 核外求解与内存里的 solve_cpu_auto 对比 (网格放得进内存时)。
+# 内存预算故意设得比场小，让每遍都要扫很多条带；文件写在 workdir (默认临时目录，Slurm 上用节点本地盘的 $TMPDIR)。
+# 页缓存放得下三个文件时测到的是内存带宽加上拷贝开销，放不下时才是真正的磁盘吞吐。
+
+def run_ooc_benchmark(workdir=None):
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 240             # 能被所有 k 整除
+    MEM_BYTES = 64 * 1024 ** 2   # 带缓冲区总预算
+    time_blocks = [1, 4, 8, 16]
+    sizes = [512, 1024, 2048, 4096]
+
+    threads = configure_numba_threads_from_env(default_threads=1)
+
+    # 预热编译 (Warm-up)
+    solve_cpu_auto(nx=128, ny=128, max_iter=1)
+    solve_ooc(nx=128, ny=128, max_iter=1, time_block=1)
+
+    print("==========================================================================")
+    print(f" Out-of-core Benchmark (Threads: {threads}, {FIXED_ITER} iterations, float32, "
+          f"{MEM_BYTES / 1024**2:.0f} MB band buffers)")
+    print("==========================================================================")
+    header = " | ".join(f"{f'k={k}':^8}" for k in time_blocks)
+    print(f"{'Grid':^10} | {'Bands':^6} | {'in-mem':^8} | {header}   (GUPS)")
+    print("-" * (41 + 11 * len(time_blocks)))
+
+    for size in sizes:
+        _, _, _, iters, duration = solve_cpu_auto(nx=size, ny=size, max_iter=FIXED_ITER)
+        in_mem = (size * size * iters) / (duration * 1e9)
+        cols = []
+        for k in time_blocks:
+            _, _, p, iters, duration = solve_ooc(nx=size, ny=size, max_iter=FIXED_ITER, time_block=k,
+                                                 mem_bytes=MEM_BYTES, workdir=workdir)
+            del p
+            cols.append(f"{(size * size * iters) / (duration * 1e9):^8.3f}")
+        rows = band_rows_for(size, size, time_blocks[-1], MEM_BYTES)
+        bands = -(-(size - 2) // rows)
+        print(f"{size}x{size:<5} | {bands:^6} | {in_mem:^8.3f} | {' | '.join(cols)}")
+    print(f"Band buffers: {BAND_BUFFERS} x (rows + 2k) x N x 4 B; 'Bands' is for k={time_blocks[-1]}")
+
+if __name__ == "__main__":
+    # 用法: python benchmark_ooc.py [工作目录]
+    run_ooc_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
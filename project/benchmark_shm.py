@@ -0,0 +1,51 @@
+import os
+import sys
+import config
+from poisson_shm import solve_shm
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+
+def run_shm_benchmark(affinity="core"):
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 500
+    sizes = [512, 1024, 2048, 4096]
+
+    # worker 数与 Numba 线程数相同，比较同样多的核
+    threads = configure_numba_threads_from_env(default_threads=len(os.sched_getaffinity(0)))
+
+    # 预热 (Warm-up)
+    solve_cpu_auto(nx=64, ny=64, max_iter=2)
+    solve_shm(nx=64, ny=64, max_iter=2, workers=threads, affinity=affinity)
+
+    print("==========================================================================")
+    print(f" Shared-Memory Multiprocess vs Numba prange ({threads} cores, affinity={affinity}, {FIXED_ITER} iterations)")
+    print("==========================================================================")
+    print(f"{'Grid':^10} | {'prange (s)':^10} | {'shm (s)':^10} | {'prange GUPS':^11} | {'shm GUPS':^9} | {'Gain':^6} | {'Imbalance':^9}")
+    print("-" * 84)
+
+    last_timings = None
+    for size in sizes:
+        _, _, _, _, t_numba = solve_cpu_auto(nx=size, ny=size, max_iter=FIXED_ITER)
+        timings = []
+        _, _, _, _, t_shm = solve_shm(nx=size, ny=size, max_iter=FIXED_ITER, workers=threads,
+                                      affinity=affinity, timings=timings)
+        work = size * size * FIXED_ITER / 1e9
+        # 最慢 worker 的计算时间 / 平均计算时间
+        compute = [w["compute"] for w in timings]
+        imbalance = max(compute) / (sum(compute) / len(compute))
+        print(f"{size}x{size:<5} | {t_numba:^10.4f} | {t_shm:^10.4f} | {work / t_numba:^11.3f} | "
+              f"{work / t_shm:^9.3f} | {f'{t_numba / t_shm:.2f}x':^6} | {imbalance:^9.3f}")
+        last_timings = timings
+    print("-" * 84)
+
+    # 最大网格的逐 worker 时间：compute 是扫描本身，wait 是在 Barrier 上等其它 worker
+    print(f"\n Per-worker time ({sizes[-1]}x{sizes[-1]})")
+    print(f"{'Worker':^6} | {'Rows':^6} | {'CPUs':^12} | {'Compute (s)':^11} | {'Wait (s)':^9}")
+    print("-" * 56)
+    for w in last_timings:
+        cpus = "-" if w["cpus"] is None else f"{w['cpus'][0]}-{w['cpus'][-1]}"
+        print(f"{w['worker']:^6} | {w['rows']:^6} | {cpus:^12} | {w['compute']:^11.4f} | {w['wait']:^9.4f}")
+
+if __name__ == "__main__":
+    # 用法: python benchmark_shm.py [core|numa|none]
+    mode = sys.argv[1] if len(sys.argv) > 1 else "core"
+    run_shm_benchmark(None if mode == "none" else mode)
@@ -0,0 +1,52 @@
+import config
+import sources
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+
+# 点源 (核里不读 b，只修正源点) 与稠密 b 的吞吐量对比，两者结果逐位相同 (见 sources.py)。
+# 稠密 b 每步多读一个整场，大网格上 (内存带宽受限) 差距最明显。有 GPU 时再比较 solve_numba 和 solve_pytorch。
+
+def _gups(solve, size, iters, source, repeats=3):
+    best = 0.0
+    for _ in range(repeats):
+        _, _, _, it, duration = solve(nx=size, ny=size, max_iter=iters, source=source)
+        best = max(best, (size * size * it) / (duration * 1e9))
+    return best
+
+def _table(title, solve, sizes, iters):
+    print("==========================================================================")
+    print(f" {title} ({iters} iterations, float32)")
+    print("==========================================================================")
+    print(f"{'Grid':^10} | {'dense b':^8} | {'points':^8} | {'speedup':^7}   (GUPS)")
+    print("-" * 46)
+    for size in sizes:
+        # 先空跑一次：进程里第一次用到这么大的场的那次运行明显偏快 (刚映射的新页)，两种源项都在这之后测
+        solve(nx=size, ny=size, max_iter=iters)
+        dense = _gups(solve, size, iters, sources.DEFAULT.dense(size, size))
+        points = _gups(solve, size, iters, sources.DEFAULT)
+        print(f"{size}x{size:<5} | {dense:^8.3f} | {points:^8.3f} | {points / dense:^7.2f}")
+
+def run_sources_benchmark():
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    threads = configure_numba_threads_from_env(default_threads=1)
+
+    # 预热编译 (Warm-up)：两种源项走不同的核
+    solve_cpu_auto(nx=128, ny=128, max_iter=1)
+    solve_cpu_auto(nx=128, ny=128, max_iter=1, source=sources.DEFAULT.dense(128, 128))
+    _table(f"Point sources vs dense b, CPU (Threads: {threads})", solve_cpu_auto, [512, 1024, 2048, 4096], 200)
+
+    from numba import cuda
+    if cuda.is_available():
+        from poisson_numba import solve_numba
+        solve_numba(nx=128, ny=128, max_iter=1)
+        _table("Point sources vs dense b, Numba CUDA", solve_numba, [1024, 2048, 4096], 2000)
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        from poisson_pytorch import solve_pytorch
+        solve_pytorch(nx=128, ny=128, max_iter=1)
+        _table("Point sources vs dense b, PyTorch", solve_pytorch, [1024, 2048, 4096], 2000)
+
+if __name__ == "__main__":
+    run_sources_benchmark()
@@ -0,0 +1,51 @@
+import os
+import config
+from poisson_cpu_parallel import solve_cpu_auto, configure_numba_threads_from_env
+
+def last_level_cache_bytes():
+    # Linux 下读 sysfs，取编号最大的 cache (一般是 L3)
+    base = "/sys/devices/system/cpu/cpu0/cache"
+    try:
+        indices = sorted(d for d in os.listdir(base) if d.startswith("index"))
+        with open(os.path.join(base, indices[-1], "size")) as f:
+            size = f.read().strip()
+    except (OSError, IndexError):
+        return None
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    return int(size[:-1]) * units[size[-1]] if size[-1] in units else int(size)
+
+def run_time_block_benchmark():
+    config.BENCHMARK_MODE = True # 固定步数，只比吞吐量
+    FIXED_ITER = 240             # 能被所有 k 整除
+    time_blocks = [1, 2, 4, 8, 16]
+    sizes = [128, 256, 512, 1024, 2048, 4096]
+
+    threads = configure_numba_threads_from_env(default_threads=1)
+    llc = last_level_cache_bytes()
+
+    # 预热编译 (Warm-up)
+    for k in time_blocks:
+        solve_cpu_auto(nx=128, ny=128, max_iter=k, time_block=k)
+
+    print("==========================================================================")
+    print(f" Temporal Blocking Benchmark (Threads: {threads}, {FIXED_ITER} iterations, float32)")
+    if llc:
+        print(f" Last-level cache: {llc / 1024**2:.1f} MB | Working set = 3 x N^2 x 4 B")
+    print("==========================================================================")
+    header = " | ".join(f"{f'k={k}':^8}" for k in time_blocks)
+    print(f"{'Grid':^10} | {'WS (MB)':^8} | {header}   (GUPS)")
+    print("-" * (24 + 11 * len(time_blocks)))
+
+    for size in sizes:
+        working_set = 3 * size * size * 4
+        cols = []
+        for k in time_blocks:
+            _, _, p, iters, duration = solve_cpu_auto(
+                nx=size, ny=size, max_iter=FIXED_ITER, time_block=k
+            )
+            cols.append(f"{(size * size * iters) / (duration * 1e9):^8.3f}")
+        mark = "  > LLC" if llc and working_set > llc else ""
+        print(f"{size}x{size:<5} | {working_set / 1024**2:^8.1f} | {' | '.join(cols)}{mark}")
+
+if __name__ == "__main__":
+    run_time_block_benchmark()
@@ -18,8 +18,8 @@ def run_torch_benchmark():
     print(f"   PyTorch Benchmark (Dynamic Tolerance Mode)")
     print(f"   Base Tol: {BASE_TOL} (at 50x50) | Logic: Tol_new = Tol_base / (Size/50)^2")
     print(f"=======================================================================")
-    print(f"{'Grid':^10} | {'Tol Used':^10} | {'Steps':^10} | {'Time (s)':^10} | {'Status':^12}")
-    print("-" * 68)
+    print(f"{'Grid':^10} | {'Tol Used':^10} | {'Steps':^10} | {'Time (s)':^10} | {'GUPS':^8} | {'Status':^12}")
+    print("-" * 79)
 
     for size in sizes:
         # 动态容差计算
@@ -40,13 +40,14 @@ def run_torch_benchmark():
             )
             
             status = "Converged" if iters < config.MAX_ITER else "Max Reached"
+            gups = (size * size * iters) / (duration * 1e9)
             
-            print(f"{size}x{size:<5} | {dynamic_tol:.1e}  | {iters:^10} | {duration:^10.4f} | {status:^12}")
+            print(f"{size}x{size:<5} | {dynamic_tol:.1e}  | {iters:^10} | {duration:^10.4f} | {gups:^8.3f} | {status:^12}")
 
         except Exception as e:
              print(f"{size}x{size:<5} |   ERROR    | {str(e)}")
 
-    print("-" * 68)
+    print("-" * 79)
 
 if __name__ == "__main__":
     run_torch_benchmark()
\ No newline at end of file
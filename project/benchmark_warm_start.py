@@ -0,0 +1,28 @@
+import sys
+import config
+from warm_start import nested_sweep
+
+def run_warm_start_benchmark(backend="cpu_auto", order=1):
+    config.BENCHMARK_MODE = False # 需要收敛判定
+    MAX_ITER = 200000
+    sizes = [50, 100, 200, 400, 800, 1000, 2000]
+
+    print("=================================================================================")
+    print(f"   Nested-iteration Warm Start ({backend}, {'bilinear' if order == 1 else 'bicubic'} prolongation)")
+    print("   Tol = 1e-7 / (Size/50)^2 | warm time includes interpolation")
+    print("=================================================================================")
+    print(f"{'Grid':^10} | {'Tol':^8} | {'Cold Iters':^10} | {'Warm Iters':^10} | {'Saved':^8} | "
+          f"{'Cold (s)':^9} | {'Warm (s)':^9} | {'Saved (s)':^9}")
+    print("-" * 91)
+
+    for row in nested_sweep(backend, sizes, order=order, max_iter=MAX_ITER):
+        warm_time = row["warm_time"] + row["interp_time"]
+        print(f"{row['size']}x{row['size']:<5} | {row['tol']:^8.1e} | {row['cold_iters']:^10} | {row['warm_iters']:^10} | "
+              f"{row['cold_iters'] - row['warm_iters']:^8} | {row['cold_time']:^9.4f} | {warm_time:^9.4f} | "
+              f"{row['cold_time'] - warm_time:^9.4f}")
+    print("-" * 91)
+
+if __name__ == "__main__":
+    # 用法: python benchmark_warm_start.py [backend] [1|3]
+    run_warm_start_benchmark(sys.argv[1] if len(sys.argv) > 1 else "cpu_auto",
+                             int(sys.argv[2]) if len(sys.argv) > 2 else 1)
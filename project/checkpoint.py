@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import math
+import time
+import threading
+import numpy as np
+import config
+
+# 检查点 / 断点续算：1000~2000^2 的多核收敛要跑 8~9 分钟，GPU 上 13 万步，Slurm 时限一到就全部白跑。
+#   - 场 p 和已完成的迭代数定期写进 np.memmap 文件，文件里有两个槽位轮流写 (双缓冲)：
+#     写一个槽位时另一个始终是完整的上一次检查点，中途被杀也能恢复
+#   - 求解线程只把 p 拷进暂存缓冲区 (GPU 后端在这一步拷回主机)，写文件、msync 在后台线程里做；
+#     上一次还没写完时这次直接跳过，求解不会等磁盘
+#   - 每次写入的耗时 (求解线程上的拷贝 + 后台写文件，核都占满时后者同样抢计算资源) 都计下来，
+#     间隔自动加大，使之不超过两次写入之间计算时间的 budget 比例
+# 所有 solve_* 都接受 checkpoint=路径 (定期写) 和 resume=路径 (或 True 表示同一路径)：
+# 文件存在就从里面的场和迭代数接着算，不存在就从头开始，所以作业脚本可以每次都带上 resume。
+# 单进程求解器还接受 snapshots=SnapshotWriter (时间序列快照，见 snapshots.py)，走同一个钩子。
+#
+# MPI 求解器每个 rank 写自己的子块 (<path>.rank<N>)；间隔和写入时机在各 rank 间取一致 (见 start 的 comm)，
+# 续算时取所有 rank 都有的最新迭代，所以某个 rank 写到一半被杀也不会拼出不同步的场。
+#
+# 文件布局：<path> 是 (2, ny, nx) 的原始数组，<path>.json 记录形状、类型和每个槽位的 (序号, 迭代数)，
+# 用 os.replace 原子替换。写槽位之前先把它在 .json 里标为无效，数据 flush 之后再登记。
+
+def _meta_path(path):
+    return path + ".json"
+
+def _read_meta(path):
+    try:
+        with open(_meta_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(path, meta):
+    tmp = _meta_path(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(path))
+
+def iterations(path):
+    """文件里有效槽位的迭代数 (没有文件时为空)。"""
+    meta = _read_meta(path)
+    if meta is None or not os.path.exists(path):
+        return []
+    return [s["iteration"] for s in meta["slots"] if s is not None]
+
+def load(path, iteration=None, copy=True):
+    """
+    读最新的有效检查点 (或指定 iteration 的那个槽位)，返回 (field, iteration)；
+    没有文件或没有符合的槽位时返回 None。copy=False 时 field 是文件里那个槽位的只读 memmap，不读进内存。
+    """
+    meta = _read_meta(path)
+    if meta is None or not os.path.exists(path):
+        return None
+    slots = [(s["seq"], k, s["iteration"]) for k, s in enumerate(meta["slots"])
+             if s is not None and iteration in (None, s["iteration"])]
+    if not slots:
+        return None
+    _, k, iteration = max(slots)
+    data = np.memmap(path, dtype=meta["dtype"], mode="r", shape=(2, *meta["shape"]))
+    return (np.array(data[k]) if copy else data[k]), iteration
+
+def _to_host(dst, field):
+    # NumPy 直接拷；Numba 设备数组 copy_to_host，CuPy .get(out=)，torch 经 .cpu()；
+    # 场分散在几块设备上时传一个把它拼进 dst 的函数
+    if isinstance(field, np.ndarray):
+        np.copyto(dst, field, casting="same_kind")
+    elif callable(field):
+        field(dst)
+    elif hasattr(field, "copy_to_host"):
+        field.copy_to_host(dst)
+    elif hasattr(field, "get"):
+        field.get(out=dst)
+    else:
+        dst[...] = field.detach().cpu().numpy()
+
+class Checkpointer:
+    """
+    ck = Checkpointer(path, (ny, nx))
+    循环里: if ck.due(it): ck.save(p, it + 1)      (it + 1 = 已完成的步数，续算从这里开始)
+    结束时: ck.close(p, final_it)   (同步写最后一次，分段跑满 max_iter 的作业下次从这里接着算)
+    在第 final_it 步判定收敛时存的是这一步之前的场 (已完成 final_it 步)，不是 p：续算重做这一步、
+    在同一步再次判定收敛，返回的场和步数与没有中断的运行相同。
+    interval: 初始间隔 (步数)，默认 config.CHECKPOINT_INTERVAL；
+    budget: 写入开销占步时间的上限 (比例)，默认 config.CHECKPOINT_BUDGET。
+    agree: 多进程时把本进程算出的新间隔换成所有进程的最大值 (例如 MPI allreduce)；
+        给了 agree 时上一次还没写完就等它，而不是跳过，保证各进程在同一步写。
+    staging=False: 不分配整场的暂存区，save 在求解线程里直接从 field 拷进槽位 (同步写，耗时全部计入 cost)。
+        给核外求解器用：场本身就是磁盘上的 memmap，内存里放不下一份拷贝。
+    """
+
+    def __init__(self, path, shape, dtype=np.float32, interval=None, budget=None, agree=None, staging=True):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.interval = interval or config.CHECKPOINT_INTERVAL
+        self.budget = budget if budget is not None else config.CHECKPOINT_BUDGET
+        self.agree = agree
+        self.writes = 0
+        self.skipped = 0
+        self.cost = 0.0          # 求解线程上的累计耗时 (秒)
+        self.write_time = 0.0    # 后台线程写文件的累计耗时 (秒)
+        self.step_time = float("nan")
+
+        meta = _read_meta(path)
+        if (meta is None or meta["shape"] != list(self.shape) or meta["dtype"] != self.dtype.str
+                or not os.path.exists(path)):
+            meta = {"shape": list(self.shape), "dtype": self.dtype.str, "slots": [None, None]}
+            np.memmap(path, dtype=self.dtype, mode="w+", shape=(2, *self.shape)).flush()
+            _write_meta(path, meta)
+        self._meta = meta
+        self._data = np.memmap(path, dtype=self.dtype, mode="r+", shape=(2, *self.shape))
+        seqs = [s["seq"] for s in meta["slots"] if s is not None]
+        self._seq = max(seqs, default=0)
+        # 下一次写最旧 (或无效) 的槽位
+        self._slot = min(range(2), key=lambda k: -1 if meta["slots"][k] is None else meta["slots"][k]["seq"])
+
+        self._staging = np.empty(self.shape, dtype=self.dtype) if staging else None
+        self._pending = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._wake = threading.Event()
+        self._closed = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        self._next = None
+        self._mark_it = None
+        self._mark_t = None
+
+    def due(self, it):
+        """第 it 步之后是否该写检查点。第一次调用只记下起点，用来量步时间。"""
+        if self._next is None:
+            self._next = it + 1 + self.interval
+            self._mark_it, self._mark_t = it + 1, time.perf_counter()
+            return False
+        return it + 1 >= self._next
+
+    def save(self, field, iteration):
+        """把 field 拷进暂存区交给后台线程；上一次还没写完时跳过。返回是否接受了这次写入。"""
+        if self._error is not None:
+            raise self._error
+        t0 = time.perf_counter()
+        steps = iteration - self._mark_it
+        if steps > 0:
+            self.step_time = (t0 - self._mark_t) / steps
+        if self.agree is not None:
+            self._idle.wait()
+        accepted = self._idle.is_set()
+        if accepted and self._staging is None:
+            saved = self.write_time
+            self._write(field, iteration)
+            self.write_time = saved
+        elif accepted:
+            self._idle.clear()
+            _to_host(self._staging, field)
+            self._pending = iteration
+            self._wake.set()
+        else:
+            self.skipped += 1
+        t1 = time.perf_counter()
+        self.cost += t1 - t0
+        if accepted:
+            self.writes += 1
+            # 开销 / (间隔 * 步时间) 超过 budget 时加大间隔；后台写入时间用已完成的几次的平均
+            if self.step_time > 0 and self.budget > 0:
+                done = self.writes - 1
+                per_write = (t1 - t0) + (self.write_time / done if done else 0.0)
+                need = math.ceil(per_write / (self.budget * self.step_time))
+                self.interval = max(self.interval, need)
+            if self.agree is not None:
+                self.interval = self.agree(self.interval)
+        self._next = iteration + self.interval
+        self._mark_it, self._mark_t = iteration, t1
+        return accepted
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._pending is None:
+                if self._closed:
+                    return
+                continue
+            try:
+                self._write(self._staging, self._pending)
+            except BaseException as e:   # 下一次 save 时在求解线程里抛出
+                self._error = e
+            self._pending = None
+            self._idle.set()
+
+    def _write(self, field, iteration):
+        t0 = time.perf_counter()
+        k = self._slot
+        self._meta["slots"][k] = None
+        _write_meta(self.path, self._meta)
+        self._data[k] = field
+        self._data.flush()
+        self._seq += 1
+        self._meta["slots"][k] = {"seq": self._seq, "iteration": int(iteration), "time": time.time()}
+        _write_meta(self.path, self._meta)
+        self._slot = 1 - k
+        self.write_time += time.perf_counter() - t0
+
+    def close(self, field=None, iteration=None):
+        """等后台写完并停止线程；给了 field 时再同步写一次 (不计入 budget)。"""
+        self._idle.wait()
+        if field is not None and self._error is None:
+            if self._staging is not None:
+                _to_host(self._staging, field)
+                field = self._staging
+            saved = self.write_time
+            self._write(field, iteration)
+            self.write_time = saved
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        del self._data
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def overhead(self):
+        """每次写入的平均开销占两次写入之间计算时间的比例 (应不超过 budget)。"""
+        if not (self.writes and self.step_time > 0):
+            return float("nan")
+        return (self.cost + self.write_time) / self.writes / (self.interval * self.step_time)
+
+    def report(self, file=sys.stderr):
+        n = max(self.writes, 1)
+        print(f"Checkpoint {self.path}: {self.writes} writes, {self.skipped} skipped, "
+              f"{self.cost / n * 1e3:.2f} ms copy + {self.write_time / n * 1e3:.2f} ms write each, "
+              f"interval {self.interval} steps ({self.overhead * 100:.2f}% of step time)", file=file)
+
+class Hooks:
+    """
+    检查点和快照 (snapshots.SnapshotWriter) 共用求解循环里的同一个钩子：
+    due 记下这一步哪些该写，save 只交给它们；close 关检查点、把快照的最后一帧写完 (快照文件由调用方关闭)。
+    """
+
+    def __init__(self, checkpointer, snapshots):
+        self.checkpointer = checkpointer
+        self.snapshots = snapshots
+        self._due = ()
+
+    def due(self, it):
+        self._due = [h for h in (self.checkpointer, self.snapshots) if h is not None and h.due(it)]
+        return bool(self._due)
+
+    def save(self, field, iteration):
+        for h in self._due:
+            h.save(field, iteration)
+        return True
+
+    def close(self, field=None, iteration=None):
+        if self.checkpointer is not None:
+            self.checkpointer.close(field, iteration)
+        if self.snapshots is not None:
+            self.snapshots.finish(field, iteration)
+
+def rank_path(path, rank):
+    """MPI 下每个 rank 的检查点文件名；path 为 None 时仍为 None。"""
+    return path and f"{path}.rank{rank}"
+
+def start(checkpoint, resume, shape, initial_guess=None, dtype=np.float32, interval=None, comm=None,
+          snapshots=None, staging=True):
+    """
+    求解函数开头调用：返回 (钩子或 None, 初值, 起始迭代)。钩子是 Checkpointer，带 snapshots 时是 Hooks。
+    resume 为 True 时用 checkpoint 的路径；文件存在时它的场代替 initial_guess，迭代从保存的步数接着算。
+    interval: 初始间隔；每次迭代很贵的求解器 (多重网格循环、混合精度外层) 传 1，之后按 budget 自动加大。
+    comm: MPI communicator。路径按 rank 区分 (rank_path)，续算取所有 rank 共有的最新迭代 (没有就都从头算)，
+        写入间隔用 allreduce 取一致。所有 rank 都要调用。
+    snapshots: snapshots.SnapshotWriter，每 every 步把整场交给它 (只有单进程、单个整场的求解器支持)。
+    staging=False: 见 Checkpointer；续算的场也不读进内存，返回检查点文件里那个槽位的只读 memmap。
+    """
+    if resume is True:
+        resume = checkpoint
+    agree = iteration = None
+    if comm is not None:
+        from mpi4py import MPI
+        checkpoint, resume = rank_path(checkpoint, comm.Get_rank()), rank_path(resume, comm.Get_rank())
+        common = set.intersection(*(set(its) for its in comm.allgather(iterations(resume) if resume else [])))
+        iteration = max(common, default=None)
+        resume = resume if iteration is not None else None
+        agree = lambda n: comm.allreduce(n, op=MPI.MAX)
+    start_it = 0
+    if resume:
+        saved = load(resume, iteration, copy=staging)
+        if saved is not None:
+            field, start_it = saved
+            if field.shape != tuple(shape):
+                raise ValueError(f"Checkpoint {resume} holds a {field.shape} field, expected {tuple(shape)}")
+            initial_guess = field
+    writer = Checkpointer(checkpoint, shape, dtype, interval, agree=agree, staging=staging) if checkpoint else None
+    if snapshots is not None:
+        snapshots.open(shape)
+        writer = Hooks(writer, snapshots)
+    return writer, initial_guess, start_it
@@ -26,4 +26,9 @@ TOLERANCE = 1e-6
 CHECK_INTERVAL = 100 
 
 # --- 绘图开关 ---
-ENABLE_PLOTTING = False
\ No newline at end of file
+ENABLE_PLOTTING = False
+
+# --- 检查点 ---
+# 初始间隔 (步数)；实际间隔会自动加大，使每次写入的开销不超过步时间的 CHECKPOINT_BUDGET。
+CHECKPOINT_INTERVAL = 1000
+CHECKPOINT_BUDGET = 0.02
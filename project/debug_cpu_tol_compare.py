@@ -1,6 +1,6 @@
 import time
 import config
-from poisson_cpu_parallel import solve_cpu_parallel
+from poisson_cpu_parallel import solve_cpu_auto
 
 def run_one(nx, ny, tol, label):
     print("=" * 80)
@@ -10,7 +10,7 @@ def run_one(nx, ny, tol, label):
     config.CHECK_INTERVAL = 50             # 每 50 步检测一次
 
     t0 = time.time()
-    x, y, p, iters, total_time = solve_cpu_parallel(
+    x, y, p, iters, total_time = solve_cpu_auto(
         nx=nx, ny=ny, max_iter=config.MAX_ITER, tol=tol
     )
     t1 = time.time()
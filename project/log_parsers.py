@@ -0,0 +1,169 @@
+import os
+import re
+import csv
+
+# 逐行解析各种 Slurm .log 输出，产生 results_store 的记录 (dict)。
+# 都是生成器：一次只读一行，不把整个文件读进内存，几千个 log 也能一遍扫完。
+# 一个文件里可以有多段输出 (例如同一个 job 先后跑几个 benchmark)，遇到新的标题行就切换格式。
+
+# 动态容差表格的一行：
+#   "2000x2000  | 6.2e-11  |   126600   |  497.0750  |  Converged  "
+# CPU DEBUG 表格最后一列是 min / max / mean，同样能匹配
+TABLE_ROW = re.compile(r"^\s*(\d+)x(\d+)\s*\|\s*([0-9.eE+-]+)\s*\|\s*(\d+)\s*\|\s*([0-9.eE+-]+)\s*\|\s*(.*?)\s*$")
+
+# 标题行 -> (backend, 图例名)；图例名里的 {threads} 在读到线程数之后填入
+TABLE_HEADERS = [
+    (re.compile(r"CPU PARALLEL Benchmark"), "cpu_auto", "CPU ({threads} Cores)"),
+    (re.compile(r"CPU DEBUG Benchmark \(Cores: (\d+)\)"), "cpu_auto", "CPU ({threads} Cores)"),
+    (re.compile(r"CuPy Benchmark"), "cupy", "CuPy"),
+    (re.compile(r"PyTorch Benchmark"), "torch", "PyTorch"),
+    (re.compile(r"Numba \(Basic\) Benchmark"), "numba", "Numba Basic"),
+    (re.compile(r"Numba \(Shared Memory\) Benchmark"), "numba_shared", "Numba Shared"),
+]
+THREADS = re.compile(r"Threads Active:\s*(\d+)")
+JOB_ID = re.compile(r"Job ID:\s*(\d+)")
+NODE = re.compile(r"Running on node:\s*(\S*)")
+
+# benchmark_mpi.py 的两种弱扩展输出
+GPU_WEAK = re.compile(r"=== Weak Scaling Test \((\d+)-GPU\) ===")
+CPU_WEAK = re.compile(r"=== Weak Scaling Test \((\d+) ranks, (\d+)x(\d+) Cartesian, Numba CPU\) ===")
+LOCAL_LOAD = re.compile(r"Local Load per (?:rank|GPU)\s*:\s*(\d+)\s*x\s*(\d+)")
+TOTAL_GRID = re.compile(r"Total Grid Size\s*:\s*(\d+)\s*x\s*(\d+)")
+TOTAL_UPDATES = re.compile(r"Total Updates\s*:\s*([0-9.]+)\s*G-Points")
+ITERATIONS = re.compile(r"Iterations per run\s*:\s*(\d+)")
+EXEC_TIME = re.compile(r"Execution Time\s*:\s*([0-9.]+)\s*s")
+THROUGHPUT = re.compile(r"Throughput\s*:\s*([0-9.]+)\s*GUPS")
+EFFICIENCY = re.compile(r"Weak Scaling Efficiency:\s*([0-9.]+)%")
+SINGLE_RANK = re.compile(r"Single-rank GUPS\s*:\s*([0-9.]+)")
+HALO_ROW = re.compile(r"Halo (.+?)\s*:\s*([0-9.]+) s \| ([0-9.]+) GUPS \| Weak Scaling Efficiency: ([0-9.]+)%")
+
+def _table_record(m, ctx):
+    nx, ny, steps, t = int(m.group(1)), int(m.group(2)), int(m.group(4)), float(m.group(5))
+    status = m.group(6) if m.group(6) in ("Converged", "Max Iter") else ""
+    return {"backend": ctx["backend"], "label": ctx["label"].format(threads=ctx["threads"]),
+            "threads": ctx["threads"], "ranks": 1, "nx": nx, "ny": ny, "tol": float(m.group(3)),
+            "iterations": steps, "time": t, "gups": nx * ny * steps / (t * 1e9) if t > 0 else float("nan"),
+            "mode": "converge" if status else "fixed", "status": status}
+
+def _gpu_weak_record(ctx):
+    # 只有读到吞吐量才算一条完整记录 (作业中途被杀时可能只打印了标题)
+    if "gups" not in ctx:
+        return None
+    nx, ny = ctx.get("grid", (-1, -1))
+    iters = -1
+    if "updates" in ctx and nx > 0:
+        iters = int(round(ctx["updates"] * 1e9 / (nx * ny)))
+    return {"backend": "numba_mpi", "label": f"{ctx['ranks']}-GPU", "ranks": ctx["ranks"],
+            "nx": nx, "ny": ny, "iterations": iters, "time": ctx.get("time", float("nan")),
+            "gups": ctx["gups"], "efficiency": ctx.get("efficiency", 100.0 if ctx["ranks"] == 1 else float("nan")),
+            "mode": "fixed"}
+
+def parse_log_lines(lines, source=""):
+    """从任意行迭代器解析记录。每条记录都带 source；run_id / host 取自 Slurm 头部 (有的话)。"""
+    ctx = None
+    run = {"source": source, "run_id": "", "host": ""}
+    for line in lines:
+        line = line.rstrip("\n")
+
+        m = JOB_ID.search(line)
+        if m:
+            run["run_id"] = m.group(1)
+            continue
+        m = NODE.search(line)
+        if m:
+            run["host"] = m.group(1)
+            continue
+
+        # 新一段输出：先把上一段未结束的 GPU 弱扩展记录交出去
+        header = None
+        for pattern, backend, label in TABLE_HEADERS:
+            m = pattern.search(line)
+            if m:
+                header = {"kind": "table", "backend": backend, "label": label,
+                          "threads": int(m.group(1)) if m.groups() else 1}
+                break
+        if header is None:
+            m = GPU_WEAK.search(line)
+            if m:
+                header = {"kind": "gpu_weak", "ranks": int(m.group(1))}
+        if header is None:
+            m = CPU_WEAK.search(line)
+            if m:
+                header = {"kind": "cpu_weak", "ranks": int(m.group(1)), "iterations": -1}
+        if header is not None:
+            if ctx is not None and ctx["kind"] == "gpu_weak":
+                rec = _gpu_weak_record(ctx)
+                if rec:
+                    yield {**run, **rec}
+            ctx = header
+            continue
+        if ctx is None:
+            continue
+
+        if ctx["kind"] == "table":
+            m = THREADS.search(line)
+            if m:
+                ctx["threads"] = int(m.group(1))
+                continue
+            m = TABLE_ROW.match(line)
+            if m:
+                yield {**run, **_table_record(m, ctx)}
+        elif ctx["kind"] == "gpu_weak":
+            for key, pattern in (("updates", TOTAL_UPDATES), ("time", EXEC_TIME),
+                                 ("gups", THROUGHPUT), ("efficiency", EFFICIENCY)):
+                m = pattern.search(line)
+                if m:
+                    ctx[key] = float(m.group(1))
+            m = TOTAL_GRID.search(line)
+            if m:
+                ctx["grid"] = (int(m.group(1)), int(m.group(2)))
+            if line.startswith("=====") and "gups" in ctx:
+                yield {**run, **_gpu_weak_record(ctx)}
+                ctx = None
+        else:
+            for key, pattern in (("local", LOCAL_LOAD), ("grid", TOTAL_GRID)):
+                m = pattern.search(line)
+                if m:
+                    ctx[key] = (int(m.group(1)), int(m.group(2)))
+            m = ITERATIONS.search(line)
+            if m:
+                ctx["iterations"] = int(m.group(1))
+                continue
+            m = SINGLE_RANK.search(line)
+            if m:
+                # 单进程基线跑的是一个进程的本地大小
+                nx, ny = ctx.get("local", (-1, -1))
+                yield {**run, "backend": "mpi_cart", "label": "single rank", "ranks": 1, "nx": nx, "ny": ny,
+                       "iterations": ctx["iterations"], "gups": float(m.group(1)), "efficiency": 100.0,
+                       "mode": "fixed"}
+                continue
+            m = HALO_ROW.search(line)
+            if m:
+                nx, ny = ctx.get("grid", (-1, -1))
+                yield {**run, "backend": "mpi_cart", "label": m.group(1).strip(), "ranks": ctx["ranks"],
+                       "nx": nx, "ny": ny, "iterations": ctx["iterations"], "time": float(m.group(2)),
+                       "gups": float(m.group(3)), "efficiency": float(m.group(4)), "mode": "fixed"}
+
+    if ctx is not None and ctx["kind"] == "gpu_weak":
+        rec = _gpu_weak_record(ctx)
+        if rec:
+            yield {**run, **rec}
+
+def parse_log(path):
+    """解析一个 .log 文件，source 为文件名。"""
+    with open(path, "r", errors="replace") as f:
+        yield from parse_log_lines(f, source=os.path.basename(path))
+
+def parse_csv(path):
+    """
+    读 results_store 列名的 CSV (bench_suite 的输出，或手工录入的 logs/manual_results.csv)。
+    空单元格视为缺失；source 统一设为文件名，数据集之间用 run_id 区分。
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            rec = {k: v for k, v in row.items() if k and v not in ("", None)}
+            rec["source"] = os.path.basename(path)
+            yield rec
+
+def parse_file(path):
+    return parse_csv(path) if path.endswith(".csv") else parse_log(path)
@@ -1,11 +1,14 @@
 import matplotlib.pyplot as plt
 import os
+import sys
 
 # === 1. 数据配置 ===
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from results_store import default_store
 
-# A. Log 文件 (确保这些文件在 logs 目录下)
+# A. Log 文件 (确保这些文件在 logs 目录下)；由 results_store 解析入库
 LOG_FILES = {
     'CPU (32 Cores)': 'cpu_test_7723800_0.log', 
     'CPU (64 Cores)': 'cpu_test_7723800_1.log',
@@ -15,18 +18,8 @@ LOG_FILES = {
     'Numba Shared':   'numba_shared_7724481.log'
 }
 
-# B. 手动录入的数据 (单核 CPU)
-MANUAL_DATA = {
-    'CPU (Single Core)': {
-        50: 0.0703,
-        100: 0.6452,
-        200: 4.1267,
-        400: 42.6447,
-        800: 831.4497,
-        1000: 1561.5273,
-        2000: 9069.6256
-    }
-}
+# B. 手动录入的数据 (单核 CPU)：logs/manual_results.csv 里 run_id = final_report 的行
+MANUAL_RUN_ID = 'final_report'
 
 # === 2. 样式配置 ===
 STYLES = {
@@ -40,38 +33,23 @@ STYLES = {
     'Numba Shared':      {'color': 'red',    'marker': '*', 'linestyle': '-',  'linewidth': 2.5, 'markersize': 10} 
 }
 
-# === 3. 解析函数 ===
-def parse_log(filename):
-    filepath = os.path.join(BASE_DIR, filename)
-    data = {}
-    if not os.path.exists(filepath):
-        print(f"⚠️ 跳过: 找不到文件 {filename}")
-        return data
-    
-    with open(filepath, 'r') as f:
-        for line in f:
-            if "x" in line and "Converged" in line:
-                try:
-                    parts = line.split('|')
-                    grid_size = int(parts[0].strip().split('x')[0])
-                    time_val = float(parts[3].strip())
-                    data[grid_size] = time_val
-                except (ValueError, IndexError):
-                    continue
-    return dict(sorted(data.items()))
-
-# === 4. 整合数据 ===
+# === 3. 整合数据 (从结果库查询) ===
+store = default_store()
 all_data = {}
 
 for label, filename in LOG_FILES.items():
-    parsed = parse_log(filename)
-    if parsed:
-        all_data[label] = parsed
-
-for label, data in MANUAL_DATA.items():
-    all_data[label] = data
-
-# === 5. 绘图核心函数 ===
+    xs, ys = store.series('nx', 'time', source=filename, status='Converged')
+    if len(xs):
+        all_data[label] = dict(zip(xs.tolist(), ys.tolist()))
+    else:
+        print(f"⚠️ 跳过: 结果库里没有 {filename} 的数据")
+
+for label in store.distinct('label'):
+    xs, ys = store.series('nx', 'time', run_id=MANUAL_RUN_ID, label=label)
+    if len(xs):
+        all_data[label] = dict(zip(xs.tolist(), ys.tolist()))
+
+# === 4. 绘图核心函数 ===
 def plot_chart(dataset_names, title, filename_suffix, y_log=False, max_x_limit=None):
     plt.figure(figsize=(12, 8), dpi=150)
     save_path = os.path.join(BASE_DIR, f"result_{filename_suffix}.png")
@@ -124,7 +102,7 @@ def plot_chart(dataset_names, title, filename_suffix, y_log=False, max_x_limit=N
     plt.savefig(save_path)
     print(f"✅ 图表已生成: {save_path}")
 
-# === 6. 生成图表 (确保列表里有 Numba Basic) ===
+# === 5. 生成图表 (确保列表里有 Numba Basic) ===
 
 # 图 1: 完整全景 (Log Scale)
 plot_chart(
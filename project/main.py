@@ -1,17 +1,23 @@
+import time
+_T_START = time.perf_counter()
+
 import config
-from poisson_cpu import solve_cpu
-from poisson_cpu_parallel import solve_cpu_parallel
-from poisson_pytorch import solve_pytorch
-from poisson_numba import solve_numba
-from poisson_numba_shared import solve_numba_shared
-from visualize import save_plot
-import numpy as np
+from solvers import solve
 
-def print_result(name, t, it, fps, base_t=None):
+def print_result(name, res, base_t=None):
     speedup = ""
     if base_t:
-        speedup = f"| Speedup: {base_t/t:.2f}x"
-    print(f"{name:<20} | Time: {t:.4f}s | Steps: {it:<5} | FPS: {fps:<8.1f} {speedup}")
+        speedup = f"| Speedup: {base_t/res.wall_time:.2f}x"
+    fps = res.iterations / res.wall_time
+    print(f"{name:<20} | Time: {res.wall_time:.4f}s | Steps: {res.iterations:<5} | FPS: {fps:<8.1f} "
+          f"| GUPS: {res.gups:<6.3f} | JIT: {res.compile_time:.2f}s {speedup}")
+
+def save_plot(res, filename):
+    # matplotlib 只在真的要画图时才导入
+    if not config.ENABLE_PLOTTING:
+        return
+    from visualize import save_plot as _save_plot
+    _save_plot(res.x, res.y, res.field, filename)
 
 def main():
     print(f"==========================================================")
@@ -22,61 +28,52 @@ def main():
 
     # 1. CPU Baseline
     # 如果网格太大，CPU 太慢，可以选择性跳过
+    t_cpu = None
+    first_solve_done = False
     if config.NX > 1000:
         print("⚠️ Grid > 1000, skipping Single Core CPU to save time...")
-        t_cpu = None
-        p_ref = None
     else:
-        x, y, p_ref, it_cpu, t_cpu = solve_cpu()
-        print_result("CPU Single Core", t_cpu, it_cpu, it_cpu/t_cpu)
-        save_plot(x, y, p_ref, "result_cpu.png")
+        res = solve("cpu", warmup=False)
+        t_cpu = res.wall_time
+        first_solve_done = True
+        print(f"   Startup to first CPU solve: {time.perf_counter() - _T_START - t_cpu:.3f}s")
+        print_result("CPU Single Core", res)
+        save_plot(res, "result_cpu.png")
 
     # 2. CPU Parallel
+    base_t = t_cpu
     try:
-        x, y, p_cpu_p, it_cpu_p, t_cpu_p = solve_cpu_parallel()
-        base_t = t_cpu if t_cpu else t_cpu_p # 如果跳过单核，就用多核当基准
-        print_result("CPU Parallel", t_cpu_p, it_cpu_p, it_cpu_p/t_cpu_p, t_cpu)
+        res = solve("cpu_auto")
+        if not first_solve_done:
+            print(f"   Startup to first CPU solve: {time.perf_counter() - _T_START - res.wall_time:.3f}s")
+        base_t = t_cpu if t_cpu else res.wall_time # 如果跳过单核，就用多核当基准
+        print_result("CPU Parallel", res, t_cpu)
     except Exception as e:
         print(f"CPU Parallel Failed: {e}")
 
     print("-" * 60)
 
-    # 3. PyTorch
-    try:
-        x, y, p_torch, it_torch, t_torch = solve_pytorch()
-        print_result("PyTorch (GPU)", t_torch, it_torch, it_torch/t_torch, base_t)
-        save_plot(x, y, p_torch, "result_pytorch.png")
-    except Exception as e:
-        print(f"PyTorch Failed: {e}")
-
-    # 4. Numba Basic
-    try:
-        x, y, p_numba, it_numba, t_numba = solve_numba()
-        if p_numba is None:
-            print("Numba Basic skipped (No GPU).")
-        else:
-            print_result("Numba Basic", t_numba, it_numba, it_numba/t_numba, base_t)
-            save_plot(x, y, p_numba, "result_numba.png")
-    except Exception as e:
-        print(f"Numba Basic Failed: {e}")
-
-    # 5. Numba Shared (Optimized)
-    try:
-        x, y, p_shared, it_shared, t_shared = solve_numba_shared()
-        if p_shared is None:
-            print("Numba Shared skipped (No GPU).")
-        else:
-            print_result("Numba Shared", t_shared, it_shared, it_shared/t_shared, base_t)
-            
+    # 3-5. GPU 后端：按需导入，缺少 torch / CUDA 时只跳过对应后端
+    t_numba = None
+    for backend, name, filename in [
+        ("torch", "PyTorch (GPU)", "result_pytorch.png"),
+        ("numba", "Numba Basic", "result_numba.png"),
+        ("numba_shared", "Numba Shared", "result_numba_shared.png"),
+    ]:
+        try:
+            res = solve(backend)
+        except Exception as e:
+            print(f"{name} Failed: {e}")
+            continue
+        print_result(name, res, base_t)
+        if backend == "numba":
+            t_numba = res.wall_time
+        elif backend == "numba_shared" and t_numba:
             # 显示优化提升
-            if 't_numba' in locals() and t_numba:
-                print(f"   >>> Optimization Gain (Shared vs Basic): {t_numba/t_shared:.2f}x")
-            
-            save_plot(x, y, p_shared, "result_numba_shared.png")
-    except Exception as e:
-        print(f"Numba Shared Failed: {e}")
+            print(f"   >>> Optimization Gain (Shared vs Basic): {t_numba/res.wall_time:.2f}x")
+        save_plot(res, filename)
 
     print("\nDone.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
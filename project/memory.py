@@ -0,0 +1,283 @@
+import os
+import sys
+import threading
+import tracemalloc
+from dataclasses import dataclass
+import numpy as np
+
+# 内存记账：报告里 4096^2 的 CPU 运行写着 "N/A (OOM)"，但代码里没有任何地方量过内存。
+#   - FOOTPRINT：每个后端的峰值占用模型 (以整场数组个数计)，在分配之前估算一次求解要多少内存，
+#     装不下就拒绝 (solvers.solve 抛 MemoryError) 或由 bench_suite 跳过这个网格
+#   - MemoryMonitor：实测一次求解的峰值。tracemalloc 统计 Python/NumPy 分配的字节，
+#     后台线程采样 RSS (实际驻留)，GPU 后端再读 torch / CuPy 分配器的峰值
+#   - python memory.py [网格大小 ...]：模型和实测对比，以及每个网格点占多少字节
+
+@dataclass(frozen=True)
+class Footprint:
+    """
+    一次求解的峰值占用，以 "整场数组的个数" 计 (乘以 nx * ny * itemsize 即为字节数)。
+    host / device: 主机内存和显存里同时存活的整场数组 (含数组表达式的临时数组和返回前的拷贝)。
+    itemsize: 元素字节数；后端接受 dtype= 参数时按参数换算 (CG / 多重网格 / FFT 默认 float64)。
+    """
+    host: float
+    device: float = 0.0
+    itemsize: int = 4
+
+# 数值由 "python memory.py" 在 CPU 上实测校准 (tracemalloc 峰值 / 单个整场数组)，GPU 后端按代码里的数组数估计。
+FOOTPRINT = {
+    # p, pd, b, diff 四个整场，外加模板表达式里同时存活的两个内部点临时数组
+    "cpu":          Footprint(host=6),
+    # p, pd, b；点源 (sources.Points，默认) 时没有 b，这里按稠密 b 留上限
+    "cpu_auto":     Footprint(host=3),
+    "cpu_rbsor":    Footprint(host=2),
+    # 16 位的 p、pd 合计一个整场；峰值在返回的 float32 场和精度保护的 float32 阶段 (p、pd、b)
+    "cpu_bf16":     Footprint(host=4),
+    "cpu_fp16":     Footprint(host=4),
+    # 共享内存里的 p, pd, b，加上主进程返回前的拷贝
+    "shm":          Footprint(host=4),
+    # 场在 memmap 文件里，内存里只有带缓冲区 (按 mem_bytes 限定，与网格大小无关)，不做预检
+    "ooc":          Footprint(host=0),
+    # 每层 p, b, r (各层合计 4/3 倍)、限制/延拓的半宽缓冲区，加上 V 循环里的临时数组
+    "multigrid":    Footprint(host=7.5, itemsize=8),
+    # p, f, r, z, d, q (Chebyshev 预条件再多一个)
+    "cg":           Footprint(host=6, itemsize=8),
+    # b, p, 变换系数和 scipy 的输出数组、工作区
+    "fast_direct":  Footprint(host=5, itemsize=8),
+    # float64 的 p, b, r 和缩放后的修正量，float32 右端项和内层 float32 多重网格
+    "mixed":        Footprint(host=16),
+    "mixed_torch":  Footprint(host=2, device=16),
+    "torch":        Footprint(host=1, device=6),
+    "cupy":         Footprint(host=1, device=6),
+    # 两块 GPU 各放一半，合计约等于单卡；只返回迭代数和时间
+    "cupy_2gpu":    Footprint(host=0, device=7),
+    # 同上按稠密 b 估计：点源时主机和显存里都少一个整场
+    "numba":        Footprint(host=3, device=3),
+    # 16 位阶段显存里只有 p、pd 和归约用的全 0 场 (共 1.5 个)，切回 float32 后与 numba 相同
+    "numba_fp16":   Footprint(host=3, device=3),
+    "numba_shared": Footprint(host=3, device=3),
+}
+
+# 估计值之外留的余量：分配器碎片、解释器和已经加载的库
+HEADROOM = 0.9
+
+def field_bytes(nx, ny, itemsize=4):
+    return nx * ny * itemsize
+
+def estimate_bytes(backend, nx, ny, params=None):
+    """按 FOOTPRINT 估算峰值 (host_bytes, device_bytes)；没有模型的后端返回 (NaN, NaN)。"""
+    model = FOOTPRINT.get(backend)
+    if model is None:
+        return float("nan"), float("nan")
+    params = params or {}
+    itemsize = np.dtype(params["dtype"]).itemsize if "dtype" in params else model.itemsize
+    one = field_bytes(nx, ny, itemsize)
+    return model.host * one, model.device * one
+
+def _cgroup_limit():
+    # Slurm / 容器通过 cgroup 限制内存，MemAvailable 看到的是整个节点
+    for limit, usage in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                         ("/sys/fs/cgroup/memory/memory.limit_in_bytes",
+                          "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        try:
+            with open(limit) as f:
+                text = f.read().strip()
+            if text == "max":
+                return None
+            with open(usage) as f:
+                return int(text) - int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+def available_host_bytes():
+    """还能分配的主机内存：/proc/meminfo 的 MemAvailable 与 cgroup 剩余额度取小；读不到时为 NaN。"""
+    avail = float("nan")
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    avail = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    cgroup = _cgroup_limit()
+    if cgroup is not None:
+        avail = cgroup if avail != avail else min(avail, cgroup)
+    return float(avail)
+
+def available_device_bytes():
+    """当前 GPU 的空闲显存 (bytes)，没有 GPU 时为 NaN。"""
+    try:
+        from numba import cuda
+        if not cuda.is_available():
+            return float("nan")
+        return float(cuda.current_context().get_memory_info().free)
+    except Exception:
+        return float("nan")
+
+def fits(backend, nx, ny, params=None, headroom=HEADROOM):
+    """
+    预检：返回 (ok, need_bytes, avail_bytes, where)。只检查有模型、且能读到可用量的那一侧；
+    主机和显存都放得下 (估计值 <= headroom * 可用量) 时 ok。
+    """
+    host, device = estimate_bytes(backend, nx, ny, params)
+    checks = (("host", host, available_host_bytes), ("device", device, available_device_bytes))
+    for where, need, avail_fn in checks:
+        if not need > 0:
+            continue
+        avail = avail_fn()
+        if avail == avail and need > headroom * avail:
+            return False, need, avail, where
+    return True, host, available_host_bytes(), "host"
+
+def preflight(backend, nx, ny, params=None, headroom=HEADROOM):
+    """分配之前调用：估计的峰值放不下时抛 MemoryError，而不是让进程被 OOM killer 杀掉。"""
+    ok, need, avail, where = fits(backend, nx, ny, params, headroom)
+    if not ok:
+        raise MemoryError(f"{backend} {nx}x{ny} needs ~{need / 1e9:.2f} GB of {where} memory, "
+                          f"{avail / 1e9:.2f} GB available")
+
+def largest_fitting(backend, sizes, params=None, headroom=HEADROOM):
+    """sizes 里估计放得下的网格 (n x n)，按原顺序。"""
+    return [n for n in sizes if fits(backend, n, n, params, headroom)[0]]
+
+# ---------------------------------------------------------------------------------------------------
+# 实测
+# ---------------------------------------------------------------------------------------------------
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes():
+    """当前进程的驻留内存 (bytes)。Linux 读 /proc/self/statm，其它系统退回 getrusage 的峰值。"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+@dataclass
+class MemoryStats:
+    """
+    一次求解的内存峰值 (bytes，都是相对开始时的增量)。
+    peak_alloc: tracemalloc 看到的峰值 (NumPy 数组按申请的大小计，即使页面还没被写过)。
+    peak_rss: 采样到的驻留内存峰值 (只算被写过的页面；共享内存块和子进程不在内)。
+    peak_device: torch / CuPy 分配器报告的显存峰值，其它后端为 NaN。
+    """
+    cells: int
+    peak_alloc: float = float("nan")
+    peak_rss: float = float("nan")
+    peak_device: float = float("nan")
+
+    @property
+    def peak_bytes(self):
+        # 主机分配峰值 + 显存峰值；没有 tracemalloc 数据时退回 RSS
+        host = self.peak_alloc if self.peak_alloc == self.peak_alloc else self.peak_rss
+        device = self.peak_device if self.peak_device == self.peak_device else 0.0
+        return host + device
+
+    @property
+    def bytes_per_cell(self):
+        return self.peak_bytes / self.cells if self.cells else float("nan")
+
+class MemoryMonitor:
+    """
+    with MemoryMonitor(nx * ny) as mem: solve(...)
+    之后 mem.stats 是 MemoryStats。trace=False 时不开 tracemalloc (只采样 RSS，开销可以忽略)；
+    tracemalloc 会拖慢每次 Python 分配，计时用的运行不要打开。
+    """
+
+    def __init__(self, cells, trace=True, interval=0.002):
+        self.cells = cells
+        self.trace = trace
+        self.interval = interval
+        self.stats = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._rss_peak = max(self._rss_peak, rss_bytes())
+
+    def _device_reset(self):
+        self._device = []
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            self._device.append(("torch", torch.cuda.memory_allocated()))
+        cp = sys.modules.get("cupy")
+        if cp is not None:
+            # 内存池缓存已释放的块，清空之后 total_bytes 就是这次求解的高水位
+            pool = cp.get_default_memory_pool()
+            pool.free_all_blocks()
+            self._device.append(("cupy", pool.total_bytes()))
+
+    def _device_peak(self):
+        peak = float("nan")
+        for name, start in self._device:
+            if name == "torch":
+                import torch
+                torch.cuda.synchronize()
+                used = torch.cuda.max_memory_allocated() - start
+            else:
+                import cupy as cp
+                used = cp.get_default_memory_pool().total_bytes() - start
+            peak = used if peak != peak else peak + used
+        return float(peak)
+
+    def __enter__(self):
+        self._started_trace = False
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_trace = True
+            tracemalloc.reset_peak()
+            self._alloc_start = tracemalloc.get_traced_memory()[0]
+        self._device_reset()
+        self._rss_start = self._rss_peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._rss_peak = max(self._rss_peak, rss_bytes())
+        self.stats = MemoryStats(self.cells, peak_rss=float(self._rss_peak - self._rss_start),
+                                 peak_device=self._device_peak())
+        if self.trace:
+            self.stats.peak_alloc = float(tracemalloc.get_traced_memory()[1] - self._alloc_start)
+            if self._started_trace:
+                tracemalloc.stop()
+        return False
+
+def run_memory_report(sizes=(256, 512, 1024), backends=("cpu", "cpu_auto", "cpu_rbsor", "shm", "multigrid",
+                                                       "cg", "fast_direct", "mixed")):
+    import config
+    import solvers
+    config.BENCHMARK_MODE = True # 固定步数，内存峰值与步数无关
+    FIXED_ITER = 20
+
+    print("==========================================================================")
+    print(f" Memory: model vs measured peak ({available_host_bytes() / 1e9:.1f} GB host memory available)")
+    print("==========================================================================")
+    print(f"{'Backend':^12} | {'Grid':^10} | {'Model (MB)':^10} | {'Alloc (MB)':^10} | {'RSS (MB)':^9} | {'B/cell':^7}")
+    print("-" * 74)
+    for backend in backends:
+        for size in sizes:
+            host, _ = estimate_bytes(backend, size, size)
+            try:
+                res = solvers.solve(backend, nx=size, ny=size, max_iter=FIXED_ITER, tol=0.0, track_memory=True)
+            except (ImportError, RuntimeError, MemoryError) as e:
+                print(f"{backend:^12} | {f'{size}x{size}':^10} | skipped: {e}")
+                break
+            mem = res.memory
+            print(f"{backend:^12} | {f'{size}x{size}':^10} | {host / 1e6:^10.1f} | {mem.peak_alloc / 1e6:^10.1f} | "
+                  f"{mem.peak_rss / 1e6:^9.1f} | {mem.bytes_per_cell:^7.1f}")
+    print("-" * 74)
+
+if __name__ == "__main__":
+    # 用法: python memory.py [网格大小 ...]
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (256, 512, 1024)
+    run_memory_report(sizes)
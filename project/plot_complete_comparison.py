@@ -1,24 +1,33 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from results_store import default_store
+
+# --- 1. 数据准备 (从结果库读取，见 logs/manual_results.csv) ---
+store = default_store()
+
+def aligned(sizes, run_id, label):
+    """某条曲线在 sizes 上的时间，没测的规模为 NaN"""
+    xs, ys = store.series('nx', 'time', run_id=run_id, label=label)
+    t = dict(zip(xs.tolist(), ys.tolist()))
+    return np.array([t.get(int(n), np.nan) for n in sizes])
 
-# --- 1. 数据准备 (严格对齐你的实验日志) ---
 # 网格规模 (N x N)
-sizes_standard = np.array([128, 256, 512, 1024, 2048, 4096])
+sizes_standard = store.series('nx', 'time', run_id='4.2', label='PyTorch GPU (A100)')[0]
 # Numba Basic 的特殊采样点
-sizes_basic = np.array([100, 200, 400, 800, 1000, 2000])
+sizes_basic = store.series('nx', 'time', run_id='complete_comparison', label='Numba-Basic (Naive GPU)')[0]
 
 # 执行时间 (1000次迭代)
 # CPU (16-core Numba)
-t_cpu = np.array([0.045, 0.120, 0.462, 1.831, 7.420, np.nan]) 
+t_cpu = aligned(sizes_standard, '4.2', 'Numba CPU (16-core)')
 
 # PyTorch (Section 4.2)
-t_pytorch = np.array([0.3730, 0.3477, 0.3489, 0.3486, 0.3542, 1.2667])
+t_pytorch = aligned(sizes_standard, '4.2', 'PyTorch GPU (A100)')
 
 # Numba-Basic (受限于频繁同步与Python循环)
-t_numba_basic = np.array([0.4512, 1.3236, 3.5222, 7.7829, 9.7226, 29.0137])
+t_numba_basic = aligned(sizes_basic, 'complete_comparison', 'Numba-Basic (Naive GPU)')
 
 # Numba-Shared (4.3极致优化版)
-t_numba_opt = np.array([np.nan, np.nan, np.nan, 0.4332, 0.2640, 1.0837])
+t_numba_opt = aligned(sizes_standard, 'complete_comparison', 'Numba-Shared (Fused+Shared)')
 
 # --- 2. 绘图：执行耗时对比 (Log-Log) ---
 plt.figure(figsize=(12, 7))
@@ -35,16 +44,17 @@ plt.grid(True, which="both", ls="-", alpha=0.3)
 plt.legend(fontsize=11)
 
 # 标注 4.3 节的关键突破
-plt.annotate('Optimization Victory!', xy=(2048, 0.264), xytext=(400, 0.1),
+plt.annotate('Optimization Victory!', xy=(2048, t_numba_opt[sizes_standard == 2048][0]), xytext=(400, 0.1),
              arrowprops=dict(facecolor='red', shrink=0.05, width=2), fontsize=12, color='red', fontweight='bold')
 plt.savefig('complete_time_scaling.png', dpi=300)
 
 # --- 3. 绘图：加速比对比 (Speedup) ---
 plt.figure(figsize=(12, 7))
-# 以 CPU 2048x2048 的 7.42s 为基准
-speedup_pt = 7.420 / 0.3542 # PyTorch at 2048
-speedup_opt = 7.420 / 0.2640 # Numba-Shared at 2048
-speedup_basic = 7.420 / 29.0137 # Numba-Basic at 2000
+# 以 CPU 2048x2048 的时间为基准
+t_cpu_2048 = t_cpu[sizes_standard == 2048][0]
+speedup_pt = t_cpu_2048 / t_pytorch[sizes_standard == 2048][0] # PyTorch at 2048
+speedup_opt = t_cpu_2048 / t_numba_opt[sizes_standard == 2048][0] # Numba-Shared at 2048
+speedup_basic = t_cpu_2048 / t_numba_basic[sizes_basic == 2000][0] # Numba-Basic at 2000
 
 methods = ['Numba-Basic', 'PyTorch', 'Numba-Shared']
 speedups = [speedup_basic, speedup_pt, speedup_opt]
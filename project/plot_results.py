@@ -1,26 +1,32 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import sys
+from results_store import default_store
 
 # 如果在没有显示器的服务器上运行，使用非交互式后端
 if sys.platform.startswith('linux'):
     plt.switch_backend('agg')
 
 # ==========================================
-# 核心实验数据录入 (来自你的日志文件)
+# 核心实验数据 (从结果库读取：logs/ 下的 log 和 manual_results.csv)
 # ==========================================
+store = default_store()
+
+# Chart 2 & 3 数据: 弱扩展性测试 (N=2048 -> N=4096)，同一 GPU 数的多次运行取中位数
+num_gpus, exec_times = store.series('ranks', 'time', backend='numba_mpi')  # 秒
+_, throughputs = store.series('ranks', 'gups', backend='numba_mpi')        # GUPS
+_, efficiencies = store.series('ranks', 'efficiency', backend='numba_mpi') # 百分比
+
 # Chart 1 数据: 性能演进
 labels_evo = ['CPU\n(Serial)', 'CPU\n(OpenMP)', 'GPU Base\n(4.3)', 'GPU Opt\n(1-Card)', 'GPU Opt\n(2-Card)']
-# 注意：CPU数据是估算值用于对比，后三个是你真实测得的
-gups_evo = [0.005, 0.05, 15.89, 61.59, 113.39] 
+# 注意：CPU数据是估算值用于对比 (status = estimate)，后三个是真实测得的
+gups_evo = [store.value('gups', run_id='plot_results', label='CPU (Serial)'),
+            store.value('gups', run_id='plot_results', label='CPU (OpenMP)'),
+            store.value('gups', run_id='gups_comparison', backend='numba_shared', nx=2048),
+            throughputs[num_gpus == 1][0],
+            throughputs[num_gpus == 2][0]]
 colors_evo = ['#9ca3af', '#6b7280', '#fcd34d', '#34d399', '#3b82f6']
 
-# Chart 2 & 3 数据: 弱扩展性测试 (N=2048 -> N=4096)
-num_gpus = [1, 2]
-exec_times = [0.3405, 0.3699]  # 秒
-throughputs = [61.59, 113.39]  # GUPS
-efficiencies = [100.0, 91.4]   # 百分比
-
 # 设置通用绘图风格
 plt.rcParams.update({'font.size': 12, 'font.family': 'sans-serif'})
 
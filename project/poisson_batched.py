@@ -0,0 +1,186 @@
+import numpy as np
+import time
+import itertools
+import config
+import tracing
+import checkpoint as ckpt_io
+import numba
+from numba import njit, prange, types
+from poisson_cpu_parallel import TIME_BLOCK_CACHE_BYTES
+
+# 同一网格、多个右端项 b：k 个场叠成 (k, ny, nx)，一次 prange 推进所有还没收敛的场。
+# 并行粒度是 (场, 行)，小网格时单个场的行数不够喂饱所有线程，批量之后就够了。
+
+# 每个并行任务负责一个场里连续的 ROW_BLOCK 行
+ROW_BLOCK = 16
+
+@njit(cache=True)
+def _rows_update(p, pd, b, dx2, dy2, div_term, nx, y0, y1):
+    # p / pd / b 是单个场的二维视图，写法与 poisson_step_serial 相同 (能向量化)
+    for y in range(y0, y1):
+        for x in range(1, nx - 1):
+            p[y, x] = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
+                        b[y, x] * dx2 * dy2) * div_term)
+
+@njit(cache=True)
+def _rows_max_diff(p, pd, nx, y0, y1):
+    err = 0.0
+    for y in range(y0, y1):
+        for x in range(1, nx - 1):
+            err = max(err, abs(p[y, x] - pd[y, x]))
+    return err
+
+@njit(parallel=True, cache=True)
+def batched_step(p, pd, b, active, dx2, dy2, div_term, nx, ny):
+    # active 为仍在迭代的场的下标，已收敛的场不再计算
+    blocks = (ny - 2 + ROW_BLOCK - 1) // ROW_BLOCK
+    for t in prange(active.shape[0] * blocks):
+        f = active[t // blocks]
+        y0 = 1 + (t % blocks) * ROW_BLOCK
+        y1 = min(y0 + ROW_BLOCK, ny - 1)
+        _rows_update(p[f], pd[f], b[f], dx2, dy2, div_term, nx, y0, y1)
+
+@njit(parallel=True, cache=True)
+def batched_step_norm(p, pd, b, active, dx2, dy2, div_term, nx, ny, block_err):
+    # 同 batched_step，并把每个行块的 max|p - pd| 写进 block_err[t]
+    blocks = (ny - 2 + ROW_BLOCK - 1) // ROW_BLOCK
+    for t in prange(active.shape[0] * blocks):
+        f = active[t // blocks]
+        y0 = 1 + (t % blocks) * ROW_BLOCK
+        y1 = min(y0 + ROW_BLOCK, ny - 1)
+        _rows_update(p[f], pd[f], b[f], dx2, dy2, div_term, nx, y0, y1)
+        block_err[t] = _rows_max_diff(p[f], pd[f], nx, y0, y1)
+
+def compile_kernels():
+    """按显式签名编译批量核 (float32)，返回耗时 (秒)，第一次之后从磁盘缓存加载。"""
+    t0 = time.perf_counter()
+    f4, i8 = types.float32, types.int64
+    arr = f4[:, :, ::1]
+    stencil = (arr, arr, arr, i8[::1], f4, f4, f4, i8, i8)
+    batched_step.compile(stencil)
+    batched_step_norm.compile(stencil + (f4[::1],))
+    return time.perf_counter() - t0
+
+def default_batch(nx, ny, k=None, threads=None):
+    """
+    单个场能放进缓存时，批量会把同一个场的相邻两次扫描隔开，失去 L2 里的复用，
+    所以只批到所有线程的缓存装得下为止；单个场本来就装不下时没有复用可丢，整批一起算。
+    """
+    threads = threads or numba.get_num_threads()
+    field_bytes = 3 * nx * ny * 4
+    budget = threads * TIME_BLOCK_CACHE_BYTES
+    n = max(1, budget // field_bytes) if field_bytes <= budget else (k or 8)
+    return min(n, k) if k else n
+
+def point_sources(k, nx=config.NX, ny=config.NY, seed=0, dtype=np.float32):
+    """k 个随机的一正一负点源 (第 0 个就是项目默认的 b)，用于测试和基准。"""
+    rng = np.random.default_rng(seed)
+    b = np.zeros((k, ny, nx), dtype=dtype)
+    b[0, int(ny / 4), int(nx / 4)] = 100.0
+    b[0, int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    for f in range(1, k):
+        (y0, y1), (x0, x1) = rng.integers(1, ny - 1, 2), rng.integers(1, nx - 1, 2)
+        b[f, y0, x0] += 100.0
+        b[f, y1, x1] -= 100.0
+    return b
+
+def _solve_stack(b, max_iter, tol, history, initial_guess=None, ckpt=None, start=0):
+    k, ny, nx = b.shape
+    dx = np.float32((config.X_MAX - config.X_MIN) / (nx - 1))
+    dy = np.float32((config.Y_MAX - config.Y_MIN) / (ny - 1))
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    p = np.zeros((k, ny, nx), dtype=np.float32)
+    pd = np.zeros((k, ny, nx), dtype=np.float32)
+    if initial_guess is not None:
+        p[:] = initial_guess
+        pd[:] = initial_guess
+    blocks = (ny - 2 + ROW_BLOCK - 1) // ROW_BLOCK
+    block_err = np.zeros(k * blocks, dtype=np.float32)
+    active = np.arange(k, dtype=np.int64)
+    iters = np.full(k, max_iter, dtype=np.int64)
+    step = tracing.wrap(batched_step, "stencil")
+
+    for it in range(start, max_iter):
+        pd, p = p, pd
+        if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
+            n = active.shape[0] * blocks
+            with tracing.span("stencil+check", fields=int(active.shape[0])):
+                batched_step_norm(p, pd, b, active, dx2, dy2, div_term, nx, ny, block_err)
+                field_err = block_err[:n].reshape(active.shape[0], blocks).max(axis=1)
+            if history is not None:
+                history.append((it, active.copy(), field_err))
+            done = field_err < tol
+            if done.any():
+                finished = active[done]
+                iters[finished] = it
+                # 收敛的场不再交换缓冲区，两边都放上最终结果
+                pd[finished] = p[finished]
+                active = active[~done]
+                if active.shape[0] == 0:
+                    break
+        else:
+            step(p, pd, b, active, dx2, dy2, div_term, nx, ny)
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
+
+    if ckpt is not None:
+        ckpt.close(p, int(iters.max()))
+    return p, iters
+
+def iter_solve_batched(sources, max_iter=config.MAX_ITER, tol=config.TOLERANCE, batch=8, history=None,
+                       initial_guess=None, checkpoint=None, resume=None):
+    """
+    sources 可以是 (k, ny, nx) 数组，也可以是逐个产生 (ny, nx) 数组的生成器。
+    每凑满 batch 个场就一起求解，按输入顺序逐个 yield (field, iterations)，不必把全部结果留在内存里。
+    initial_guess 与 sources 一一对应 (数组或生成器)，默认全 0。
+    checkpoint / resume: 每批一个检查点文件 <path>.<批号>，保存整批 (k, ny, nx) 的场；续算时 batch 必须相同。
+    已经收敛的场续算后会在下一次检查时再次判定收敛。
+    """
+    if resume is True:
+        resume = checkpoint
+    sources = iter(sources)
+    guesses = iter(initial_guess) if initial_guess is not None else None
+    for c in itertools.count():
+        chunk = list(itertools.islice(sources, batch))
+        if not chunk:
+            return
+        b = np.ascontiguousarray(np.stack(chunk), dtype=np.float32)
+        p0 = None if guesses is None else np.stack(list(itertools.islice(guesses, len(chunk))))
+        ckpt, p0, start = ckpt_io.start(checkpoint and f"{checkpoint}.{c}", resume and f"{resume}.{c}",
+                                        b.shape, p0)
+        p, iters = _solve_stack(b, max_iter, tol, history, p0, ckpt, start)
+        for f in range(len(chunk)):
+            yield p[f], int(iters[f])
+
+@tracing.traced
+def solve_batched(sources, max_iter=config.MAX_ITER, tol=config.TOLERANCE, batch=None, history=None,
+                  initial_guess=None, checkpoint=None, resume=None):
+    """
+    多右端项求解。每个场有自己的收敛判定 (max|Δp| < tol)，收敛后就从活动列表里移除。
+    batch=None 时按 default_batch 根据缓存大小选批量。
+    返回 (x, y, fields (k, ny, nx), iterations (k,), time)。
+    history 若传入 list，每次检查追加 (it, 活动场下标, 各场 max|Δp|)。
+    """
+    compile_kernels()
+    if batch is None:
+        if isinstance(sources, np.ndarray):
+            batch = default_batch(sources.shape[2], sources.shape[1], sources.shape[0])
+        else:
+            sources = iter(sources)
+            first = next(sources)
+            batch = default_batch(first.shape[1], first.shape[0])
+            sources = itertools.chain([first], sources)
+    start_time = time.time()
+    fields, iters = [], []
+    for field, it in iter_solve_batched(sources, max_iter, tol, batch, history, initial_guess, checkpoint, resume):
+        fields.append(field)
+        iters.append(it)
+    total_time = time.time() - start_time
+    ny, nx = fields[0].shape
+    return (np.linspace(config.X_MIN, config.X_MAX, nx),
+            np.linspace(config.Y_MIN, config.Y_MAX, ny),
+            np.stack(fields), np.array(iters), total_time)
@@ -0,0 +1,232 @@
+import numpy as np
+import math
+import time
+import config
+import tracing
+import checkpoint as ckpt_io
+from numba import njit, prange
+
+# 算子 A = -L (L 为 Jacobi 模板对应的 5 点 Laplace)，在 Dirichlet 内部点上对称正定，
+# 所以 L p = b 等价于 A p = -b，可以直接用共轭梯度。所有向量都是带 0 边界的 (ny, nx) 数组。
+
+@njit(parallel=True, cache=True)
+def matvec_dot(q, d, idx2, idy2, diag, nx, ny):
+    # q = A d，同时返回 d·q
+    acc = 0.0
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            v = (diag * d[y, x] -
+                 (d[y, x + 1] + d[y, x - 1]) * idx2 -
+                 (d[y + 1, x] + d[y - 1, x]) * idy2)
+            q[y, x] = v
+            acc += d[y, x] * v
+    return acc
+
+@njit(parallel=True, cache=True)
+def update_solution(p, r, d, q, alpha, nx, ny):
+    # p += alpha d, r -= alpha q，同时返回 r·r
+    acc = 0.0
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            p[y, x] += alpha * d[y, x]
+            rv = r[y, x] - alpha * q[y, x]
+            r[y, x] = rv
+            acc += rv * rv
+    return acc
+
+@njit(parallel=True, cache=True)
+def update_direction(d, z, beta, nx, ny):
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            d[y, x] = z[y, x] + beta * d[y, x]
+
+@njit(parallel=True, cache=True)
+def dot(a, c, nx, ny):
+    acc = 0.0
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            acc += a[y, x] * c[y, x]
+    return acc
+
+@njit(parallel=True, cache=True)
+def true_residual_norm(p, f, idx2, idy2, diag, nx, ny):
+    # ||f - A p||_2，不依赖递推残差，用来做最终的收敛判定
+    acc = 0.0
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            v = f[y, x] - (diag * p[y, x] -
+                           (p[y, x + 1] + p[y, x - 1]) * idx2 -
+                           (p[y + 1, x] + p[y - 1, x]) * idy2)
+            acc += v * v
+    return math.sqrt(acc)
+
+@njit(parallel=True, cache=True)
+def jacobi_precond_dot(z, r, inv_diag, nx, ny):
+    # z = D^-1 r，同时返回 r·z
+    acc = 0.0
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            zv = r[y, x] * inv_diag
+            z[y, x] = zv
+            acc += r[y, x] * zv
+    return acc
+
+@njit(parallel=True, cache=True)
+def ssor_color(z, r, idx2, idy2, inv_diag, omega, nx, ny, color):
+    # 对 A z = r 做一次红黑 SOR 的单色更新 (与 poisson_rbsor_sweep 同一模板，只是右端项符号相反)
+    for y in prange(1, ny - 1):
+        x0 = 1 + (y + color + 1) % 2
+        for x in range(x0, nx - 1, 2):
+            gs = (r[y, x] + (z[y, x + 1] + z[y, x - 1]) * idx2 +
+                  (z[y + 1, x] + z[y - 1, x]) * idy2) * inv_diag
+            z[y, x] += omega * (gs - z[y, x])
+
+@njit(parallel=True, cache=True)
+def chebyshev_direction(d, z, r, a, c, idx2, idy2, diag, inv_diag, nx, ny):
+    # d = a d + c D^-1 (r - A z)
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            az = (diag * z[y, x] -
+                  (z[y, x + 1] + z[y, x - 1]) * idx2 -
+                  (z[y + 1, x] + z[y - 1, x]) * idy2)
+            d[y, x] = a * d[y, x] + c * inv_diag * (r[y, x] - az)
+
+@njit(parallel=True, cache=True)
+def add_inplace(z, d, nx, ny):
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            z[y, x] += d[y, x]
+
+class Preconditioner:
+    """z = M^-1 r，apply 返回 r·z。"""
+
+    def __init__(self, kind, nx, ny, idx2, idy2, diag, dtype, omega=1.0, degree=4):
+        if kind not in ("none", "jacobi", "ssor", "chebyshev"):
+            raise ValueError(f"Unknown preconditioner '{kind}', expected 'none', 'jacobi', 'ssor' or 'chebyshev'")
+        self.kind = kind
+        self.nx, self.ny = nx, ny
+        self.idx2, self.idy2, self.diag = idx2, idy2, diag
+        self.inv_diag = dtype(1.0 / diag)
+        self.omega = dtype(omega)
+        self.degree = degree
+        if kind == "chebyshev":
+            # D^-1 A 的特征值 = 1 - mu，mu 为 Jacobi 迭代矩阵的特征值，两端都能解析算出
+            rho = ((idx2 * math.cos(math.pi / (nx - 1)) + idy2 * math.cos(math.pi / (ny - 1))) /
+                   (idx2 + idy2))
+            self.theta = 1.0           # (lmax + lmin) / 2
+            self.delta = rho           # (lmax - lmin) / 2
+            self.dcheb = np.zeros((ny, nx), dtype=dtype)
+
+    def apply(self, z, r):
+        nx, ny = self.nx, self.ny
+        if self.kind == "none":
+            z[:] = r
+            return dot(r, r, nx, ny)
+        if self.kind == "jacobi":
+            return jacobi_precond_dot(z, r, self.inv_diag, nx, ny)
+        if self.kind == "ssor":
+            # 对称顺序 红-黑-黑-红，保证 M 对称
+            z[:] = 0.0
+            for color in (0, 1, 1, 0):
+                ssor_color(z, r, self.idx2, self.idy2, self.inv_diag, self.omega, nx, ny, color)
+            return dot(r, z, nx, ny)
+        return self._chebyshev(z, r)
+
+    def _chebyshev(self, z, r):
+        # 从 z = 0 出发做 degree 步 Chebyshev 迭代，得到的 z = q(A) r 是 A 的对称正定多项式
+        nx, ny = self.nx, self.ny
+        d = self.dcheb
+        sigma = self.theta / self.delta
+        rho0 = 1.0 / sigma
+        z[:] = 0.0
+        jacobi_precond_dot(d, r, self.inv_diag / self.theta, nx, ny)
+        for k in range(self.degree):
+            add_inplace(z, d, nx, ny)
+            if k == self.degree - 1:
+                break
+            rho1 = 1.0 / (2.0 * sigma - rho0)
+            chebyshev_direction(d, z, r, rho1 * rho0, 2.0 * rho1 / self.delta,
+                                self.idx2, self.idy2, self.diag, self.inv_diag, nx, ny)
+            rho0 = rho1
+        return dot(r, z, nx, ny)
+
+def compile_kernels(preconds=("none", "jacobi", "ssor", "chebyshev"), dtype=np.float64):
+    """在小网格上把每种预条件子都跑完整的几步 (tol=0 不会提前退出)，返回编译耗时 (秒)。"""
+    t0 = time.perf_counter()
+    for pc in preconds:
+        solve_cg(nx=16, ny=16, max_iter=2, tol=0.0, precond=pc, dtype=dtype)
+    return time.perf_counter() - t0
+
+@tracing.traced
+def solve_cg(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=1e-8,
+             precond="ssor", omega=1.0, degree=4, dtype=np.float64, history=None, initial_guess=None,
+             checkpoint=None, resume=None, snapshots=None):
+    """
+    无矩阵 (预条件) 共轭梯度。tol 是真实相对残差 ||b - L p|| / ||b||，
+    递推残差满足 tol 后会再用 true_residual_norm 复核一次，不满足就继续迭代。
+    precond: "none" / "jacobi" / "ssor" (红黑对称 SOR) / "chebyshev" (degree 次多项式)。
+    均匀网格上 A 的对角元是常数，"jacobi" 只是整体缩放，迭代数和 "none" 相同。
+    history 若传入 list，每步追加 (it, 递推相对残差)。
+    检查点只保存 p：续算时以它为初值重新开始 CG (搜索方向丢失，迭代数照旧累计)。
+    """
+    xmin, xmax = config.X_MIN, config.X_MAX
+    ymin, ymax = config.Y_MIN, config.Y_MAX
+    dx = (xmax - xmin) / (nx - 1)
+    dy = (ymax - ymin) / (ny - 1)
+    idx2 = dtype(1.0 / (dx * dx))
+    idy2 = dtype(1.0 / (dy * dy))
+    diag = dtype(2.0 * (idx2 + idy2))
+
+    p = np.zeros((ny, nx), dtype=dtype)
+    f = np.zeros((ny, nx), dtype=dtype)
+    # A p = -b
+    f[int(ny / 4), int(nx / 4)] = -100.0
+    f[int(3 * ny / 4), int(3 * nx / 4)] = 100.0
+
+    r = f.copy()
+    z = np.zeros_like(p)
+    d = np.zeros_like(p)
+    q = np.zeros_like(p)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, dtype, snapshots=snapshots)
+    if initial_guess is not None:
+        # 初始残差 r = f - A p0
+        p[1:-1, 1:-1] = initial_guess[1:-1, 1:-1]
+        matvec_dot(q, p, idx2, idy2, diag, nx, ny)
+        r -= q
+    M = Preconditioner(precond, nx, ny, idx2, idy2, diag, dtype, omega, degree)
+
+    start_time = time.time()
+    f_norm = math.sqrt(dot(f, f, nx, ny))
+    rz = M.apply(z, r)
+    d[:] = z
+    final_it = max_iter
+
+    for it in range(start + 1, max_iter + 1):
+        with tracing.span("matvec"):
+            alpha = rz / matvec_dot(q, d, idx2, idy2, diag, nx, ny)
+        with tracing.span("update"):
+            rr = update_solution(p, r, d, q, alpha, nx, ny)
+        rel = math.sqrt(rr) / f_norm
+        if history is not None:
+            history.append((it, rel))
+
+        if rel < tol:
+            with tracing.span("check"):
+                true_rel = true_residual_norm(p, f, idx2, idy2, diag, nx, ny) / f_norm
+            if true_rel < tol:
+                final_it = it
+                break
+
+        with tracing.span("precond"):
+            rz_new = M.apply(z, r)
+        with tracing.span("update"):
+            update_direction(d, z, rz_new / rz, nx, ny)
+        rz = rz_new
+        if ckpt is not None and ckpt.due(it - 1):
+            ckpt.save(p, it)
+
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        ckpt.close(p, final_it)
+    return (np.linspace(xmin, xmax, nx), np.linspace(ymin, ymax, ny),
+            p, final_it, total_time)
@@ -1,8 +1,12 @@
 import numpy as np
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
 
-def solve_cpu(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+@tracing.traced
+def solve_cpu(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, initial_guess=None,
+              checkpoint=None, resume=None, snapshots=None):
     xmin, xmax = config.X_MIN, config.X_MAX
     ymin, ymax = config.Y_MIN, config.Y_MAX
     dx = np.float32((xmax - xmin) / (nx - 1))
@@ -12,6 +16,14 @@ def solve_cpu(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.T
     p = np.zeros((ny, nx), dtype=np.float32)
     pd = np.zeros((ny, nx), dtype=np.float32)
     b = np.zeros((ny, nx), dtype=np.float32)
+
+    # 检查点：resume 时从保存的场和迭代数接着算 (见 checkpoint.py)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+
+    # 初值 (例如粗网格解插值而来)，两个缓冲区都要放，边界值应为 0
+    if initial_guess is not None:
+        p[:] = initial_guess
+        pd[:] = initial_guess
     
     x = np.linspace(xmin, xmax, nx, dtype=np.float32)
     y = np.linspace(ymin, ymax, ny, dtype=np.float32)
@@ -23,25 +35,41 @@ def solve_cpu(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.T
     dy2 = dy**2
     div_term = np.float32(1.0 / (2 * (dx2 + dy2)))
     
-    start_time = time.time()
-    final_it = 0
+    # 收敛检查用的预分配缓冲区，避免 np.abs(p - pd) 每次产生两个整场临时数组
+    diff = np.empty((ny, nx), dtype=np.float32)
 
-    for it in range(max_iter):
-        pd[:] = p[:]
+    def stencil(p, pd):
         # 5点模板计算
         p[1:-1, 1:-1] = (((pd[1:-1, 2:] + pd[1:-1, :-2]) * dy2 +
                           (pd[2:, 1:-1] + pd[:-2, 1:-1]) * dx2 -
                           b[1:-1, 1:-1] * dx2 * dy2) * div_term)
+    # 每步一次的 span 在循环外包好，tracing 关掉时循环里不多任何东西
+    stencil = tracing.wrap(stencil, "stencil")
+
+    start_time = time.time()
+    final_it = 0
+
+    for it in range(start, max_iter):
+        # 双缓冲交换指针，代替 pd[:] = p[:] 的整场拷贝
+        # 边界行/列在两个缓冲区里都是 0 且从不被写入，所以不用每步重置
+        pd, p = p, pd
+        stencil(p, pd)
 
-        p[0, :] = 0; p[-1, :] = 0
-        p[:, 0] = 0; p[:, -1] = 0
-        
         if not config.BENCHMARK_MODE and it % config.CHECK_INTERVAL == 0:
-            final_error = np.abs(p - pd).max()
+            with tracing.span("check"):
+                np.subtract(p, pd, out=diff)
+                final_error = np.abs(diff, out=diff).max()
             if final_error < tol:
                 final_it = it
                 break
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
     else:
         final_it = max_iter
 
-    return x, y, p, final_it, time.time() - start_time
\ No newline at end of file
+    # 最后一次同步写不算进求解时间
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(pd if final_it < max_iter else p, final_it)
+    return x, y, p, final_it, total_time
\ No newline at end of file
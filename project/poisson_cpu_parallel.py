@@ -1,11 +1,15 @@
 import numpy as np
+import math
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
+import sources
 import os
 import numba
-from numba import njit, prange
+from numba import njit, prange, types
 
-@njit
+@njit(cache=True)
 def poisson_step_serial(p, pd, b, dx2, dy2, div_term, nx, ny):
     for y in range(1, ny - 1):
         for x in range(1, nx - 1):
@@ -13,7 +17,7 @@ def poisson_step_serial(p, pd, b, dx2, dy2, div_term, nx, ny):
                         (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
                         b[y, x] * dx2 * dy2) * div_term)
 
-@njit(parallel=True)
+@njit(parallel=True, cache=True)
 def poisson_step_parallel(p, pd, b, dx2, dy2, div_term, nx, ny):
     for y in prange(1, ny - 1):
         for x in range(1, nx - 1):
@@ -21,7 +25,314 @@ def poisson_step_parallel(p, pd, b, dx2, dy2, div_term, nx, ny):
                         (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
                         b[y, x] * dx2 * dy2) * div_term)
 
-def solve_cpu_auto(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+@njit(fastmath=True, cache=True)
+def _row_reduce(drow, dbits, mask, x0, x1):
+    # 非负浮点数按位解释成整数后大小顺序不变：清掉符号位再取整数 max，可以向量化
+    m = dbits[x0] & mask
+    for x in range(x0, x1):
+        m = max(m, dbits[x] & mask)
+    sq = 0.0
+    for x in range(x0, x1):
+        sq += drow[x] * drow[x]
+    return m, sq
+
+@njit(cache=True)
+def poisson_step_serial_norm(p, pd, b, dx2, dy2, div_term, nx, ny, scratch, bits, mask):
+    # 与 poisson_step_serial 相同，但顺带返回更新量 |p - pd| 的最大值和 L2 范数
+    drow = scratch[0]
+    dbits = bits[0]
+    err_bits = dbits[0] & 0
+    err_sq = 0.0
+    for y in range(1, ny - 1):
+        for x in range(1, nx - 1):
+            val = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                    (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
+                    b[y, x] * dx2 * dy2) * div_term)
+            p[y, x] = val
+            drow[x] = val - pd[y, x]
+        m, sq = _row_reduce(drow, dbits, mask, 1, nx - 1)
+        err_bits = max(err_bits, m)
+        err_sq += sq
+    dbits[0] = err_bits
+    return float(drow[0]), np.sqrt(err_sq)
+
+@njit(parallel=True, cache=True)
+def poisson_step_parallel_norm(p, pd, b, dx2, dy2, div_term, nx, ny,
+                               part_max, part_sq, scratch, bits, mask):
+    # 行按块分给各线程，每块有自己的差值行缓冲和 max / 平方和槽位，最后只归约 len(part_max) 个数
+    nchunks = part_max.shape[0]
+    rows = ny - 2
+    for c in prange(nchunks):
+        drow = scratch[c]
+        dbits = bits[c]
+        y0 = 1 + (c * rows) // nchunks
+        y1 = 1 + ((c + 1) * rows) // nchunks
+        err_bits = dbits[0] & 0
+        err_sq = 0.0
+        for y in range(y0, y1):
+            for x in range(1, nx - 1):
+                val = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
+                        b[y, x] * dx2 * dy2) * div_term)
+                p[y, x] = val
+                drow[x] = val - pd[y, x]
+            m, sq = _row_reduce(drow, dbits, mask, 1, nx - 1)
+            err_bits = max(err_bits, m)
+            err_sq += sq
+        # drow[0] 不参与计算，借它把整数位模式转回浮点数
+        dbits[0] = err_bits
+        part_max[c] = drow[0]
+        part_sq[c] = err_sq
+    return part_max.max(), np.sqrt(part_sq.sum())
+
+@njit(parallel=True, cache=True)
+def max_abs_diff(a, c, part_max):
+    # 不产生临时数组的 np.abs(a - c).max()
+    nchunks = part_max.shape[0]
+    ny = a.shape[0]
+    for k in prange(nchunks):
+        err_max = 0.0
+        for y in range((k * ny) // nchunks, ((k + 1) * ny) // nchunks):
+            for x in range(a.shape[1]):
+                err_max = max(err_max, abs(a[y, x] - c[y, x]))
+        part_max[k] = err_max
+    return part_max.max()
+
+def reduction_buffers(nx, ny, dtype=np.float32, threads=None):
+    """
+    poisson_step_*_norm 需要的预分配缓冲区，按顺序直接作为参数展开传入：
+    (part_max, part_sq, scratch, bits, mask)
+    """
+    # 每个线程 4 个块，负载更均衡；块数不超过内部行数
+    threads = threads or numba.get_num_threads()
+    nchunks = max(1, min(4 * threads, ny - 2))
+    scratch = np.zeros((nchunks, nx), dtype=dtype)
+    int_type = np.int32 if scratch.itemsize == 4 else np.int64
+    mask = int_type(np.iinfo(int_type).max)
+    return (np.zeros(nchunks, dtype=np.float64), np.zeros(nchunks, dtype=np.float64),
+            scratch, scratch.view(int_type), mask)
+
+# 稀疏源项 (sources.Points)：核里不读 b，每行按不带源项的模板算完 (内层循环照常向量化)，
+# 再由 _point_row 在这一行的源点上按带 b 的完整公式重算。点表按行压缩 (ptr, cols, vals)，见 Source.csr
+@njit(cache=True)
+def _point_row(p, pd, y, ptr, cols, vals, dx2, dy2, div_term):
+    for k in range(ptr[y], ptr[y + 1]):
+        x = cols[k]
+        p[y, x] = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                    (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
+                    vals[k] * dx2 * dy2) * div_term)
+
+@njit(cache=True)
+def poisson_step_serial_points(p, pd, ptr, cols, vals, dx2, dy2, div_term, nx, ny):
+    for y in range(1, ny - 1):
+        for x in range(1, nx - 1):
+            p[y, x] = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2) * div_term)
+        _point_row(p, pd, y, ptr, cols, vals, dx2, dy2, div_term)
+
+@njit(parallel=True, cache=True)
+def poisson_step_parallel_points(p, pd, ptr, cols, vals, dx2, dy2, div_term, nx, ny):
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            p[y, x] = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2) * div_term)
+        _point_row(p, pd, y, ptr, cols, vals, dx2, dy2, div_term)
+
+@njit(cache=True)
+def poisson_step_serial_norm_points(p, pd, ptr, cols, vals, dx2, dy2, div_term, nx, ny, scratch, bits, mask):
+    drow = scratch[0]
+    dbits = bits[0]
+    err_bits = dbits[0] & 0
+    err_sq = 0.0
+    for y in range(1, ny - 1):
+        for x in range(1, nx - 1):
+            val = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                    (pd[y + 1, x] + pd[y - 1, x]) * dx2) * div_term)
+            p[y, x] = val
+            drow[x] = val - pd[y, x]
+        # 源点修正完再归约，更新量与稠密 b 的核相同
+        _point_row(p, pd, y, ptr, cols, vals, dx2, dy2, div_term)
+        for k in range(ptr[y], ptr[y + 1]):
+            drow[cols[k]] = p[y, cols[k]] - pd[y, cols[k]]
+        m, sq = _row_reduce(drow, dbits, mask, 1, nx - 1)
+        err_bits = max(err_bits, m)
+        err_sq += sq
+    dbits[0] = err_bits
+    return float(drow[0]), np.sqrt(err_sq)
+
+@njit(parallel=True, cache=True)
+def poisson_step_parallel_norm_points(p, pd, ptr, cols, vals, dx2, dy2, div_term, nx, ny,
+                                      part_max, part_sq, scratch, bits, mask):
+    nchunks = part_max.shape[0]
+    rows = ny - 2
+    for c in prange(nchunks):
+        drow = scratch[c]
+        dbits = bits[c]
+        y0 = 1 + (c * rows) // nchunks
+        y1 = 1 + ((c + 1) * rows) // nchunks
+        err_bits = dbits[0] & 0
+        err_sq = 0.0
+        for y in range(y0, y1):
+            for x in range(1, nx - 1):
+                val = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2) * div_term)
+                p[y, x] = val
+                drow[x] = val - pd[y, x]
+            _point_row(p, pd, y, ptr, cols, vals, dx2, dy2, div_term)
+            for k in range(ptr[y], ptr[y + 1]):
+                drow[cols[k]] = p[y, cols[k]] - pd[y, cols[k]]
+            m, sq = _row_reduce(drow, dbits, mask, 1, nx - 1)
+            err_bits = max(err_bits, m)
+            err_sq += sq
+        dbits[0] = err_bits
+        part_max[c] = drow[0]
+        part_sq[c] = err_sq
+    return part_max.max(), np.sqrt(part_sq.sum())
+
+# 时间分块时每个 tile 的两个暂存缓冲区合计不超过这个字节数 (约等于单核 L2)
+TIME_BLOCK_CACHE_BYTES = 512 * 1024
+
+@njit(cache=True)
+def _tile_sweep(dst, src, b, dx2, dy2, div_term, lo_y, lo_x, ys, ye, xs, xe):
+    lx0 = xs - lo_x
+    for y in range(ys, ye):
+        ly = y - lo_y
+        # 用从 0 开始的行视图做内层循环：下标可证明非负，Numba 才会向量化
+        d = dst[ly, lx0:]
+        s0 = src[ly, lx0 - 1:]
+        sn = src[ly + 1, lx0:]
+        ss = src[ly - 1, lx0:]
+        bb = b[y, xs:]
+        for j in range(xe - xs):
+            d[j] = (((s0[j + 2] + s0[j]) * dy2 +
+                     (sn[j] + ss[j]) * dx2 -
+                     bb[j] * dx2 * dy2) * div_term)
+
+@njit(parallel=True, cache=True)
+def poisson_step_time_blocked(p, pd, b, dx2, dy2, div_term, nx, ny, k, tile_y, tile_x):
+    # 从 pd (第 t 步) 直接算出 p (第 t+k 步)。每个 tile 连同宽度为 k 的重叠 halo 读进暂存区，
+    # 在缓存里连续做 k 次 Jacobi，有效区域每步向内收缩一圈，最后只写回 tile 本身
+    nty = (ny - 2 + tile_y - 1) // tile_y
+    ntx = (nx - 2 + tile_x - 1) // tile_x
+    for t in prange(nty * ntx):
+        y0 = 1 + (t // ntx) * tile_y
+        x0 = 1 + (t % ntx) * tile_x
+        y1 = min(y0 + tile_y, ny - 1)
+        x1 = min(x0 + tile_x, nx - 1)
+        lo_y = max(y0 - k, 0)
+        hi_y = min(y1 + k, ny)
+        lo_x = max(x0 - k, 0)
+        hi_x = min(x1 + k, nx)
+
+        buf_a = np.empty((hi_y - lo_y, hi_x - lo_x), dtype=pd.dtype)
+        buf_a[:, :] = pd[lo_y:hi_y, lo_x:hi_x]
+        buf_b = buf_a.copy()
+        for s in range(1, k + 1):
+            # 贴着物理边界的一侧不收缩，边界值本身就是精确的
+            ys = 1 if lo_y == 0 else lo_y + s
+            ye = ny - 1 if hi_y == ny else hi_y - s
+            xs = 1 if lo_x == 0 else lo_x + s
+            xe = nx - 1 if hi_x == nx else hi_x - s
+            if s % 2 == 1:
+                _tile_sweep(buf_b, buf_a, b, dx2, dy2, div_term, lo_y, lo_x, ys, ye, xs, xe)
+            else:
+                _tile_sweep(buf_a, buf_b, b, dx2, dy2, div_term, lo_y, lo_x, ys, ye, xs, xe)
+
+        res = buf_b if k % 2 == 1 else buf_a
+        p[y0:y1, x0:x1] = res[y0 - lo_y:y1 - lo_y, x0 - lo_x:x1 - lo_x]
+
+def time_block_tiles(nx, ny, k, itemsize=4):
+    # tile 宽度不超过 512 列，高度按缓存预算反推 (两块暂存区，每块带 2k 的 halo)
+    tile_x = min(nx - 2, 512)
+    rows = TIME_BLOCK_CACHE_BYTES // (2 * itemsize * (tile_x + 2 * k))
+    tile_y = max(rows - 2 * k, 8)
+    return min(tile_y, ny - 2), tile_x
+
+@njit(parallel=True, cache=True)
+def poisson_rbsor_sweep(p, b, dx2, dy2, div_term, omega, nx, ny, color, row_err):
+    # 原地更新同一颜色 ((x + y) % 2 == color) 的点，同色点之间互不依赖，可以按行 prange
+    for y in prange(1, ny - 1):
+        x0 = 1 + (y + color + 1) % 2
+        err = 0.0
+        for x in range(x0, nx - 1, 2):
+            gs = (((p[y, x + 1] + p[y, x - 1]) * dy2 +
+                   (p[y + 1, x] + p[y - 1, x]) * dx2 -
+                   b[y, x] * dx2 * dy2) * div_term)
+            delta = omega * (gs - p[y, x])
+            p[y, x] += delta
+            if abs(delta) > err:
+                err = abs(delta)
+        # 每行只写自己的槽位，不需要原子操作
+        if color == 0 or err > row_err[y]:
+            row_err[y] = err
+
+def sor_optimal_omega(nx, ny, dx2, dy2):
+    """
+    由 Jacobi 迭代矩阵的谱半径计算最优松弛因子 (Young 公式)。
+    各向异性网格 (dx != dy) 时按 dx2/dy2 加权。
+    """
+    rho = (dy2 * math.cos(math.pi / (nx - 1)) +
+           dx2 * math.cos(math.pi / (ny - 1))) / (dx2 + dy2)
+    return 2.0 / (1.0 + math.sqrt(1.0 - rho * rho))
+
+def _kernel_signatures(dtype):
+    # 显式签名：C 连续二维数组 + 同精度标量 + int64 网格尺寸，与 solve_* 里实际传入的类型一致
+    ft = numba.from_dtype(np.dtype(dtype))
+    it = types.int32 if np.dtype(dtype).itemsize == 4 else types.int64
+    arr, vec, i8 = ft[:, ::1], ft[::1], types.int64
+    stencil = (arr, arr, arr, ft, ft, ft, i8, i8)
+    reduce_bufs = (arr, it[:, ::1], it)
+    points = (arr, arr, i8[::1], i8[::1], vec, ft, ft, ft, i8, i8)
+    return {
+        poisson_step_serial: [stencil],
+        poisson_step_parallel: [stencil],
+        poisson_step_serial_norm: [stencil + reduce_bufs],
+        poisson_step_parallel_norm: [stencil + (types.float64[::1], types.float64[::1]) + reduce_bufs],
+        poisson_step_serial_points: [points],
+        poisson_step_parallel_points: [points],
+        poisson_step_serial_norm_points: [points + reduce_bufs],
+        poisson_step_parallel_norm_points: [points + (types.float64[::1], types.float64[::1]) + reduce_bufs],
+        poisson_step_time_blocked: [stencil + (i8, i8, i8)],
+        poisson_rbsor_sweep: [(arr, arr, ft, ft, ft, ft, i8, i8, i8, vec)],
+        max_abs_diff: [(arr, arr, types.float64[::1])],
+    }
+
+def compile_kernels(dtypes=(np.float32, np.float64)):
+    """
+    按显式签名编译所有 CPU 核，返回耗时 (秒)。
+    核都带 cache=True：第一次编译后写入磁盘缓存 (NUMBA_CACHE_DIR 或 __pycache__)，
+    之后的进程 (例如 Slurm array 的每个任务) 只需从缓存加载。重复调用几乎不花时间。
+    """
+    t0 = time.perf_counter()
+    for dtype in dtypes:
+        for kernel, sigs in _kernel_signatures(dtype).items():
+            for sig in sigs:
+                kernel.compile(sig)
+    return time.perf_counter() - t0
+
+@tracing.traced
+def solve_cpu_auto(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE,
+                   method="jacobi", omega=None, time_block=1, history=None, initial_guess=None,
+                   checkpoint=None, resume=None, snapshots=None, source=None):
+    """
+    initial_guess: (ny, nx) 初值，例如上一级网格收敛解的插值；默认全 0。
+    source: 源项 (见 sources.py)，默认两点源。点源时 Jacobi 核不读 b，只在源点上修正；
+        time_block / rbsor 路径 (以及稠密、解析源项) 用稠密 b。
+    checkpoint / resume: 定期把场写进检查点文件 / 从检查点接着算 (见 checkpoint.py)。
+    history 若传入 list，每次收敛检查追加 (it, max|Δp|, ||Δp||_2)。
+    收敛量在计算核内顺带归约，检查本身几乎不增加开销，CHECK_INTERVAL 可以设成 1。
+    计时窗口之前先编译 (或从磁盘缓存加载) 全部核，返回的时间不含 JIT。
+    """
+    compile_kernels((np.float32,))
+    if method not in ("jacobi", "rbsor"):
+        raise ValueError(f"Unknown method '{method}', expected 'jacobi' or 'rbsor'")
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+    if method == "rbsor":
+        return _solve_rbsor(nx, ny, max_iter, tol, omega, history, initial_guess, ckpt, start, source)
+    if time_block > 1:
+        return _solve_time_blocked(nx, ny, max_iter, tol, time_block, history, initial_guess, ckpt, start, source)
+    src = sources.as_source(source)
+
     xmin, xmax = config.X_MIN, config.X_MAX
     ymin, ymax = config.Y_MIN, config.Y_MAX
     dx = np.float32((xmax - xmin) / (nx - 1))
@@ -30,35 +341,167 @@ def solve_cpu_auto(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=con
     # 显式指定 float32
     p = np.zeros((ny, nx), dtype=np.float32)
     pd = np.zeros((ny, nx), dtype=np.float32)
-    b = np.zeros((ny, nx), dtype=np.float32)
-
-    b[int(ny / 4), int(nx / 4)] = 100.0
-    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    # 源项参数按核的签名展开：稀疏时是 (ptr, cols, vals)，稠密时是 (b,)
+    if src.sparse:
+        terms = src.csr(nx, ny, np.float32)
+        step_serial, step_parallel = poisson_step_serial_points, poisson_step_parallel_points
+        step_serial_norm, step_parallel_norm = poisson_step_serial_norm_points, poisson_step_parallel_norm_points
+    else:
+        terms = (src.dense(nx, ny, np.float32),)
+        step_serial, step_parallel = poisson_step_serial, poisson_step_parallel
+        step_serial_norm, step_parallel_norm = poisson_step_serial_norm, poisson_step_parallel_norm
+    if initial_guess is not None:
+        p[:] = initial_guess
+        pd[:] = initial_guess
 
     dx2 = dx * dx
     dy2 = dy * dy
     div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
 
     threads = numba.get_num_threads()
+    part_max, part_sq, scratch, bits, mask = reduction_buffers(nx, ny, p.dtype, threads)
+    # 普通步每步一次，span 在循环外包好 (tracing 关掉时就是核本身)
+    step = tracing.wrap(step_serial if threads <= 1 else step_parallel, "stencil")
     start_time = time.time()
     final_it = max_iter
 
-    for it in range(max_iter):
-        pd[:] = p
-        if threads <= 1:
-            poisson_step_serial(p, pd, b, dx2, dy2, div_term, nx, ny)
+    for it in range(start, max_iter):
+        # 双缓冲：只交换引用，边界值固定在两个缓冲区的首末行/列
+        pd, p = p, pd
+        if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
+            # 检查步用带归约的核，更新量在同一次扫描里算出
+            with tracing.span("stencil+check"):
+                if threads <= 1:
+                    final_error, l2 = step_serial_norm(p, pd, *terms, dx2, dy2, div_term, nx, ny,
+                                                       scratch, bits, mask)
+                else:
+                    final_error, l2 = step_parallel_norm(p, pd, *terms, dx2, dy2, div_term, nx, ny,
+                                                         part_max, part_sq, scratch, bits, mask)
+            if history is not None:
+                history.append((it, final_error, l2))
+            if final_error < tol:
+                final_it = it
+                break
         else:
-            poisson_step_parallel(p, pd, b, dx2, dy2, div_term, nx, ny)
+            step(p, pd, *terms, dx2, dy2, div_term, nx, ny)
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
 
-        p[0, :], p[-1, :], p[:, 0], p[:, -1] = 0.0, 0.0, 0.0, 0.0
+    # 最后一次同步写不算进求解时间
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(pd if final_it < max_iter else p, final_it)
+    return None, None, p, final_it, total_time
 
-        if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
-            final_error = np.abs(p - pd).max()
+def _solve_time_blocked(nx, ny, max_iter, tol, time_block, history=None, initial_guess=None, ckpt=None, start=0,
+                        source=None):
+    xmin, xmax = config.X_MIN, config.X_MAX
+    ymin, ymax = config.Y_MIN, config.Y_MAX
+    dx = np.float32((xmax - xmin) / (nx - 1))
+    dy = np.float32((ymax - ymin) / (ny - 1))
+
+    p = np.zeros((ny, nx), dtype=np.float32)
+    pd = np.zeros((ny, nx), dtype=np.float32)
+    # 每个 tile 的 b 在缓存里被读 k 次，内存流量已经摊到 k 步上，这里用稠密 b
+    b = sources.as_source(source).dense(nx, ny, np.float32)
+    if initial_guess is not None:
+        p[:] = initial_guess
+        pd[:] = initial_guess
+
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    tile_y, tile_x = time_block_tiles(nx, ny, time_block)
+    part_max = reduction_buffers(nx, ny)[0]
+    start_time = time.time()
+    final_it = max_iter
+    it = start
+
+    while it < max_iter:
+        k = min(time_block, max_iter - it)
+        pd, p = p, pd
+        with tracing.span("stencil", steps=k):
+            poisson_step_time_blocked(p, pd, b, dx2, dy2, div_term, nx, ny, k, tile_y, tile_x)
+        it += k
+
+        # 只能在块边界上检查；这里 |p - pd| 是 k 步的累计变化量
+        if (not config.BENCHMARK_MODE) and ((it - k) // config.CHECK_INTERVAL != it // config.CHECK_INTERVAL):
+            with tracing.span("check"):
+                final_error = max_abs_diff(p, pd, part_max)
+            if history is not None:
+                history.append((it, final_error, None))
+            if final_error < tol:
+                final_it = it
+                break
+        # 检查点同样只能落在块边界上
+        if ckpt is not None and ckpt.due(it - 1):
+            ckpt.save(p, it)
+
+    # 最后一次同步写不算进求解时间
+    total_time = time.time() - start_time
+    if ckpt is not None and final_it < max_iter:
+        # 收敛时存这一块之前的场 (已完成 final_it - k 步)：续算重做同一块、在同一处判定收敛，结果逐位相同
+        ckpt.close(pd, final_it - k)
+    elif ckpt is not None:
+        ckpt.close(p, final_it)
+    return None, None, p, final_it, total_time
+
+def _solve_rbsor(nx, ny, max_iter, tol, omega=None, history=None, initial_guess=None, ckpt=None, start=0,
+                 source=None):
+    xmin, xmax = config.X_MIN, config.X_MAX
+    ymin, ymax = config.Y_MIN, config.Y_MAX
+    dx = np.float32((xmax - xmin) / (nx - 1))
+    dy = np.float32((ymax - ymin) / (ny - 1))
+
+    # 原地更新：不需要 pd，工作集只有 p 和 b
+    p = np.zeros((ny, nx), dtype=np.float32)
+    b = sources.as_source(source).dense(nx, ny, np.float32)
+    row_err = np.zeros(ny, dtype=np.float32)
+    if initial_guess is not None:
+        p[:] = initial_guess
+
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    # omega=None -> 按谱半径自动计算；omega=1.0 即红黑 Gauss-Seidel
+    if omega is None:
+        omega = sor_optimal_omega(nx, ny, float(dx2), float(dy2))
+    omega = np.float32(omega)
+
+    sweep = tracing.wrap(poisson_rbsor_sweep, "stencil")
+    # 原地更新没有上一步的场；写检查点时在检查步之前留一份，收敛时存它 (见下面的 close)
+    prev = np.empty_like(p) if ckpt is not None else None
+    start_time = time.time()
+    final_it = max_iter
+
+    for it in range(start, max_iter):
+        check = (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0)
+        if check and prev is not None:
+            np.copyto(prev, p)
+        sweep(p, b, dx2, dy2, div_term, omega, nx, ny, 0, row_err)
+        sweep(p, b, dx2, dy2, div_term, omega, nx, ny, 1, row_err)
+
+        # row_err 记录的是本次红+黑扫描中的最大更新量，与 Jacobi 的 |p - pd| 对应
+        if check:
+            with tracing.span("check"):
+                final_error = row_err.max()
+            if history is not None:
+                history.append((it, final_error, None))
             if final_error < tol:
                 final_it = it
                 break
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
 
-    return None, None, p, final_it, time.time() - start_time
+    # 最后一次同步写不算进求解时间
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(prev if final_it < max_iter else p, final_it)
+    return None, None, p, final_it, total_time
 
 def configure_numba_threads_from_env(default_threads: int = 1) -> int:
     n = int(os.environ.get("NUMBA_NUM_THREADS", str(default_threads)))
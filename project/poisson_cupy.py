@@ -2,8 +2,12 @@ import cupy as cp
 import numpy as np
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
 
-def solve_cupy(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+@tracing.traced
+def solve_cupy(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, initial_guess=None,
+               checkpoint=None, resume=None, snapshots=None):
     xmin, xmax = config.X_MIN, config.X_MAX
     ymin, ymax = config.Y_MIN, config.Y_MAX
     dx = np.float32((xmax - xmin) / (nx - 1))
@@ -22,33 +26,53 @@ def solve_cupy(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.
     dy2 = dy**2
     div_term = cp.float32(1.0 / (2 * (dx2 + dy2)))
     
-    # 2. 预热 (Warmup)
-    p[1:-1, 1:-1] = (((pd[1:-1, 2:] + pd[1:-1, :-2]) * dy2 +
-                      (pd[2:, 1:-1] + pd[:-2, 1:-1]) * dx2 -
-                      b[1:-1, 1:-1] * dx2 * dy2) * div_term)
+    # 2. 预热 (Warmup)，写到 pd 里，第一步交换后会被覆盖
+    pd[1:-1, 1:-1] = (((p[1:-1, 2:] + p[1:-1, :-2]) * dy2 +
+                       (p[2:, 1:-1] + p[:-2, 1:-1]) * dx2 -
+                       b[1:-1, 1:-1] * dx2 * dy2) * div_term)
+    pd[:] = 0.0
+    # 检查点：resume 时从保存的场和迭代数接着算 (见 checkpoint.py)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+    if initial_guess is not None:
+        p[:] = cp.asarray(initial_guess, dtype=cp.float32)
+        pd[:] = p
     cp.cuda.Device().synchronize() 
 
-    start_time = time.time()
-    final_it = 0
+    # tracing 打开时每个 span 结束前同步，量到的是核的真实耗时
+    sync = cp.cuda.Device().synchronize
 
-    for it in range(max_iter):
-        pd[:] = p[:] # GPU 内部拷贝
-        
+    def stencil(p, pd):
+        # 只写内部点，边界 0 值固定在两个缓冲区里
         p[1:-1, 1:-1] = (((pd[1:-1, 2:] + pd[1:-1, :-2]) * dy2 +
                           (pd[2:, 1:-1] + pd[:-2, 1:-1]) * dx2 -
                           b[1:-1, 1:-1] * dx2 * dy2) * div_term)
+    # 每步一次的 span 在循环外包好，tracing 关掉时循环里不多任何东西
+    stencil = tracing.wrap(stencil, "stencil", sync=sync)
+
+    start_time = time.time()
+    final_it = 0
 
-        p[0, :], p[-1, :], p[:, 0], p[:, -1] = 0.0, 0.0, 0.0, 0.0
+    for it in range(start, max_iter):
+        pd, p = p, pd # 双缓冲交换，不再做 GPU 内部整场拷贝
+        
+        stencil(p, pd)
         
         if not config.BENCHMARK_MODE and it % config.CHECK_INTERVAL == 0:
-            diff = cp.max(cp.abs(p - pd))
+            with tracing.span("check", sync=sync):
+                diff = cp.max(cp.abs(p - pd))
             if diff < tol:
                 final_it = it
                 break
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
     else:
         final_it = max_iter
 
     cp.cuda.Device().synchronize() # 计时结束前必须同步
     total_time = time.time() - start_time
-    
-    return None, None, cp.asnumpy(p), final_it, total_time
\ No newline at end of file
+    with tracing.span("copy"):
+        field = cp.asnumpy(p)
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(pd if final_it < max_iter else field, final_it)
+    return None, None, field, final_it, total_time
\ No newline at end of file
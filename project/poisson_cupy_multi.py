@@ -2,6 +2,8 @@ import cupy as cp
 import numpy as np
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
 
 
 
@@ -36,8 +38,10 @@ def enable_p2p_if_possible(dev0=0, dev1=1):
         return False
 
 
+@tracing.traced
 def solve_cupy_2gpu(nx=config.NX, ny=config.NY,
-                   max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+                   max_iter=config.MAX_ITER, tol=config.TOLERANCE, initial_guess=None,
+                   checkpoint=None, resume=None, snapshots=None):
     xmin, xmax = config.X_MIN, config.X_MAX
     ymin, ymax = config.Y_MIN, config.Y_MAX
     dx = (xmax - xmin) / (nx - 1)
@@ -85,27 +89,42 @@ def solve_cupy_2gpu(nx=config.NX, ny=config.NY,
         with cp.cuda.Device(1):
             b1[iy_b - mid + 1, ix_b] = -100
 
+    # 检查点：resume 时从保存的场和迭代数接着算 (见 checkpoint.py)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+
+    def gathered(a0, a1):
+        def gather(dst):
+            # 全局场 = GPU 0 的 [0, mid) 行 + GPU 1 去掉顶部 halo 的部分
+            with cp.cuda.Device(0):
+                a0[:mid].get(out=dst[:mid])
+            with cp.cuda.Device(1):
+                a1[1:].get(out=dst[mid:])
+        return gather
+    gather = gathered(p0, p1)
+
     # --- try P2P ---
     p2p = enable_p2p_if_possible(0, 1)
 
     # --- warmup / init ---
+    # 初值按同样的行划分拆到两张卡上：GPU 0 为全局行 [0, mid]，GPU 1 为 [mid-1, ny)
     with cp.cuda.Device(0):
-        p0[1:-1, 1:-1] = 0.0
+        p0[1:-1, 1:-1] = 0.0 if initial_guess is None else cp.asarray(initial_guess[1:mid, 1:-1], dtype=cp.float32)
     with cp.cuda.Device(1):
-        p1[1:-1, 1:-1] = 0.0
+        p1[1:-1, 1:-1] = 0.0 if initial_guess is None else cp.asarray(initial_guess[mid:-1, 1:-1], dtype=cp.float32)
     cp.cuda.Device(0).synchronize()
     cp.cuda.Device(1).synchronize()
 
-    start_time = time.time()
-    final_it = max_iter
+    def sync():
+        cp.cuda.Device(0).synchronize()
+        cp.cuda.Device(1).synchronize()
 
-    for it in range(max_iter):
-        # snapshot
+    def snapshot():
         with cp.cuda.Device(0):
             pd0[:] = p0
         with cp.cuda.Device(1):
             pd1[:] = p1
 
+    def stencil():
         # --- GPU 0 compute (excluding bottom halo) ---
         with cp.cuda.Device(0):
             p0[1:-1, 1:-1] = (
@@ -122,7 +141,7 @@ def solve_cupy_2gpu(nx=config.NX, ny=config.NY,
                  b1[1:-1, 1:-1] * dx2 * dy2) * div_term
             )
 
-        # --- halo exchange ---
+    def halo():
         if p2p:
             # GPU0 -> GPU1 : p0[-2, :] to p1[0, :]
             with cp.cuda.Device(1):
@@ -143,6 +162,7 @@ def solve_cupy_2gpu(nx=config.NX, ny=config.NY,
             with cp.cuda.Device(0):
                 p0[-1, :] = cp.asarray(tmp1)
 
+    def bc():
         # --- boundary conditions (apply on each GPU) ---
         with cp.cuda.Device(0):
             p0[0, :] = 0.0
@@ -154,20 +174,43 @@ def solve_cupy_2gpu(nx=config.NX, ny=config.NY,
             p1[:, 0] = 0.0
             p1[:, -1] = 0.0
 
+    # 每步四个阶段各一个 span，在循环外包好：tracing 关掉时循环里只有这四个函数本身；
+    # 打开时每个 span 结束前同步两块卡，量到的是真实耗时
+    snapshot = tracing.wrap(snapshot, "copy", sync=sync)
+    stencil = tracing.wrap(stencil, "stencil", sync=sync)
+    halo = tracing.wrap(halo, "halo", sync=sync)
+    bc = tracing.wrap(bc, "bc", sync=sync)
+
+    start_time = time.time()
+    final_it = max_iter
+
+    for it in range(start, max_iter):
+        snapshot()
+        stencil()
+        halo()
+        bc()
+
         # --- convergence check ---
         if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
-            with cp.cuda.Device(0):
-                diff0 = cp.max(cp.abs(p0 - pd0)).item()
-            with cp.cuda.Device(1):
-                diff1 = cp.max(cp.abs(p1 - pd1)).item()
+            with tracing.span("check"):
+                with cp.cuda.Device(0):
+                    diff0 = cp.max(cp.abs(p0 - pd0)).item()
+                with cp.cuda.Device(1):
+                    diff1 = cp.max(cp.abs(p1 - pd1)).item()
 
             diff = max(diff0, diff1)
             if diff < tol:
                 final_it = it
                 break
 
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(gather, it + 1)
+
     cp.cuda.Device(0).synchronize()
     cp.cuda.Device(1).synchronize()
     total_time = time.time() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(gathered(pd0, pd1) if final_it < max_iter else gather, final_it)
 
     return final_it, total_time
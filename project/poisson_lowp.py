@@ -0,0 +1,307 @@
+import math
+import time
+import numpy as np
+import numba
+from numba import njit, prange, types
+import config
+import tracing
+import checkpoint as ckpt_io
+import sources
+from poisson_cpu_parallel import (compile_kernels as compile_cpu_kernels, poisson_step_serial, poisson_step_parallel,
+                                  poisson_step_serial_norm, poisson_step_parallel_norm, poisson_step_serial_points,
+                                  poisson_step_parallel_points, poisson_step_serial_norm_points,
+                                  poisson_step_parallel_norm_points, reduction_buffers)
+
+# 16 位存储、float32 计算的 Jacobi：模板每点 9 次浮点运算却要搬 12 字节，速度由每个网格点的字节数决定。
+#   - p、pd (和稠密的 b) 以 16 位存储：bf16 (float32 的高 16 位，指数范围相同，7 位尾数)
+#     或 fp16 (IEEE half，5 位指数，10 位尾数)。Numba 在 CPU 上不支持 float16 运算，两种格式都按位模式存成 uint16，
+#     逐行解码成 float32 放在每个线程的滚动行缓冲区里计算，算完按就近舍入 (ties to even) 编码写回
+#   - b 只存每步的源项增量 b dx2 dy2 div_term (乘上缩放后约为 1，fp16 也不会溢出)。点源 (sources.Points，默认) 时
+#     存成 float32 的稀疏表 (行, 列, 值)，核里不读 b，只在源点上重算带源项的值 (每行扫一遍点表，适合少量点源)；
+#     sparse_b=False 或稠密 / 解析源项时以 16 位稠密存储
+#   - 场按 2 的幂缩放 (源项单步增量约为 1)，fp16 的有效位才落在场的量级上；缩放是精确的，返回前除回去
+#   - 精度保护：更新量是解码后的 float32 之差 (不是存储值之差，否则更新量小于半个 ulp 时存储值不变，会误判为收敛)。
+#     更新量降到 16 位格式能分辨的水平 (GUARD_ULPS 个 ulp) 或 tol 以下时，把场解码成 float32，
+#     用 poisson_cpu_parallel 的 float32 核把收敛的最后阶段算完
+# BENCHMARK_MODE 下不做检查，全程 16 位，用来量吞吐量。
+
+BF16, FP16 = 0, 1
+FORMATS = {"bf16": BF16, "fp16": FP16}
+# 单位舍入 (相对 ulp)：bf16 7 位尾数，fp16 10 位
+EPS = {BF16: 2.0 ** -8, FP16: 2.0 ** -11}
+# 最大更新量小于 GUARD_ULPS 个 ulp (相对场的最大值) 时切到 float32：再往下场的最大值附近的点已经改不动了
+GUARD_ULPS = 1.0
+
+# ---------------------------------------------------------------------------------------------------
+# 整场编码 / 解码 (NumPy，只在初始化、检查点和切换精度时用)
+# ---------------------------------------------------------------------------------------------------
+
+def encode(field, fmt):
+    """float32 场 -> uint16 位模式 (就近舍入)。"""
+    if fmt == FP16:
+        return np.asarray(field, dtype=np.float32).astype(np.float16).view(np.uint16)
+    u = np.ascontiguousarray(field, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    return ((u + 0x7FFF + ((u >> 16) & 1)) >> 16).astype(np.uint16)
+
+def decode(bits, fmt, out=None):
+    """uint16 位模式 -> float32 场。"""
+    if out is None:
+        out = np.empty(bits.shape, dtype=np.float32)
+    if fmt == FP16:
+        out[...] = bits.view(np.float16)
+    else:
+        out.view(np.uint32)[...] = bits.astype(np.uint32) << 16
+    return out
+
+# ---------------------------------------------------------------------------------------------------
+# 核
+# ---------------------------------------------------------------------------------------------------
+
+@njit(cache=True)
+def _decode_row(src, dst, fmt):
+    bits = dst.view(np.uint32)
+    if fmt == BF16:
+        for x in range(src.shape[0]):
+            bits[x] = np.int64(src[x]) << 16
+    else:
+        # 指数和尾数整体左移 13 位放进 float32，再乘 2^(127-15) 把指数偏置补回来：正规数和次正规数都精确，
+        # 循环能向量化 (查表做不到)。inf / NaN 不会出现在场里，不单独处理
+        for x in range(src.shape[0]):
+            h = np.int64(src[x])
+            bits[x] = ((h & 0x8000) << 16) | ((h & 0x7FFF) << 13)
+        for x in range(src.shape[0]):
+            dst[x] *= np.float32(2.0 ** 112)
+
+@njit(cache=True)
+def _encode_row(src, dst, x0, x1, fmt):
+    bits = src.view(np.uint32)
+    if fmt == BF16:
+        for x in range(x0, x1):
+            u = np.int64(bits[x])
+            dst[x] = (u + 0x7FFF + ((u >> 16) & 1)) >> 16
+    else:
+        # float32 位模式 -> IEEE half，就近舍入：正规数重新偏置指数、舍掉低 13 位 (进位到 0x7C00 即 inf)；
+        # 次正规数直接按值舍入 (rint 即 ties to even)；>= 65536 溢出为 inf，NaN 保持 NaN。
+        # 写成无分支的选择，循环才能向量化；整数运算都显式用 int32 (Numba 默认提升到 int64，向量宽度减半)
+        i32 = np.int32
+        ibits = src.view(np.int32)
+        for x in range(x0, x1):
+            u = ibits[x]
+            sign = i32((u >> i32(16)) & i32(0x8000))
+            u = i32(u & i32(0x7FFFFFFF))
+            normal = i32((u - i32(0x38000000) + i32(0x0FFF) + ((u >> i32(13)) & i32(1))) >> i32(13))
+            subnormal = i32(np.rint(abs(src[x]) * np.float32(16777216.0)))
+            r = normal if u >= i32(0x38800000) else subnormal
+            r = r if u < i32(0x47800000) else (i32(0x7E00) if u > i32(0x7F800000) else i32(0x7C00))
+            dst[x] = np.uint16(sign | r)
+
+@njit(parallel=True, cache=True)
+def poisson_step_lowp(p, pd, b, b_idx, b_val, dx2, dy2, div_term, nx, ny, fmt, check,
+                      scratch, part_max, part_pmax):
+    # 从 16 位的 pd 算出 16 位的 p。每块行有自己的 5 行 float32 缓冲区：上、中、下三行滚动 + b 行 + 输出行。
+    # b / b_val 是每步的源项增量；b 为空 (0 行) 时用稀疏表 b_idx / b_val。check 时返回 (max|Δp|, max|p|)，都按 float32 值计
+    nchunks = part_max.shape[0]
+    rows = ny - 2
+    dense = b.shape[0] > 0
+    for c in prange(nchunks):
+        buf = scratch[c]
+        y0 = 1 + (c * rows) // nchunks
+        y1 = 1 + ((c + 1) * rows) // nchunks
+        up, mid, dn, brow, out = 0, 1, 2, 3, 4
+        _decode_row(pd[y0 - 1], buf[up], fmt)
+        _decode_row(pd[y0], buf[mid], fmt)
+        err = np.float32(0.0)
+        pmax = np.float32(0.0)
+        for y in range(y0, y1):
+            _decode_row(pd[y + 1], buf[dn], fmt)
+            u = buf[up]
+            m = buf[mid]
+            d = buf[dn]
+            o = buf[out]
+            if dense:
+                _decode_row(b[y], buf[brow], fmt)
+                bb = buf[brow]
+                for x in range(1, nx - 1):
+                    o[x] = ((m[x + 1] + m[x - 1]) * dy2 + (d[x] + u[x]) * dx2) * div_term - bb[x]
+            else:
+                for x in range(1, nx - 1):
+                    o[x] = ((m[x + 1] + m[x - 1]) * dy2 + (d[x] + u[x]) * dx2) * div_term
+                for k in range(b_idx.shape[0]):
+                    if b_idx[k, 0] == y:
+                        x = b_idx[k, 1]
+                        o[x] = ((m[x + 1] + m[x - 1]) * dy2 + (d[x] + u[x]) * dx2) * div_term - b_val[k]
+            if check:
+                for x in range(1, nx - 1):
+                    err = max(err, abs(o[x] - m[x]))
+                    pmax = max(pmax, abs(o[x]))
+            _encode_row(o, p[y], 1, nx - 1, fmt)
+            up, mid, dn = mid, dn, up
+        part_max[c] = err
+        part_pmax[c] = pmax
+    return part_max.max(), part_pmax.max()
+
+def _kernel_signatures():
+    f4, i8, u2 = types.float32, types.int64, types.uint16
+    grid, boolean = u2[:, ::1], types.boolean
+    return {
+        poisson_step_lowp: [(grid, grid, grid, i8[:, ::1], f4[::1], f4, f4, f4, i8, i8, i8, boolean,
+                             f4[:, :, ::1], f4[::1], f4[::1])],
+    }
+
+def compile_kernels():
+    """按显式签名编译 (或从磁盘缓存加载) 16 位核和 float32 收尾阶段的核，返回耗时 (秒)。"""
+    t0 = time.perf_counter()
+    for kernel, sigs in _kernel_signatures().items():
+        for sig in sigs:
+            kernel.compile(sig)
+    compile_cpu_kernels((np.float32,))
+    return time.perf_counter() - t0
+
+def field_scale(b_max, dx2, dy2, div_term):
+    """2 的幂，使源项的单步增量 |b| dx2 dy2 div_term 约为 1 (缩放对两种 16 位格式都是精确的)。"""
+    step = b_max * dx2 * dy2 * div_term
+    return 2.0 ** round(-math.log2(step)) if step > 0 else 1.0
+
+@tracing.traced
+def solve_lowp(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, storage="bf16",
+               sparse_b=True, guard=True, history=None, initial_guess=None, checkpoint=None, resume=None,
+               snapshots=None, source=None):
+    """
+    storage: "bf16" 或 "fp16"。sparse_b: 点源存成稀疏表 (默认)，False 时与 p 一样以 16 位稠密存储。
+    source: 源项 (见 sources.py)，默认两点源；不是点源时 b 总是稠密存储。
+    guard: 更新量降到 16 位分辨率以下 (或 tol 以下) 时切到 float32 算完；False 时全程 16 位，
+        tol 按 float32 更新量判断，但 16 位存储可能在达到 tol 之前就停滞。
+    history 若传入 list，每次收敛检查追加 (it, max|Δp|, None)；切换精度后的检查带 L2 范数。
+    checkpoint / resume / snapshots 见 checkpoint.py；保存的是 float32 场。续算时场的值都能用 16 位格式精确表示
+    (16 位阶段写的检查点) 就从 16 位阶段接着算，否则 (已经切到 float32 之后写的) 直接在 float32 阶段接着算。
+    """
+    if storage not in FORMATS:
+        raise ValueError(f"Unknown storage '{storage}', expected one of {list(FORMATS)}")
+    fmt = FORMATS[storage]
+    compile_kernels()
+
+    xmin, xmax = config.X_MIN, config.X_MAX
+    ymin, ymax = config.Y_MIN, config.Y_MAX
+    dx = np.float32((xmax - xmin) / (nx - 1))
+    dy = np.float32((ymax - ymin) / (ny - 1))
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+
+    src = sources.as_source(source)
+    sparse = sparse_b and src.sparse
+    if sparse:
+        b_idx, b_src = src.points(nx, ny, np.float32)
+        b_max = float(np.abs(b_src).max()) if len(b_src) else 0.0
+    else:
+        b32 = src.dense(nx, ny, np.float32)
+        b_max = float(np.abs(b32).max())
+        b_idx, b_src = np.zeros((0, 2), dtype=np.int64), np.zeros(0, dtype=np.float32)
+    scale = np.float32(field_scale(b_max, float(dx2), float(dy2), float(div_term)))
+    b_val = b_src * dx2 * dy2 * div_term * scale
+    if sparse:
+        b = np.zeros((0, nx), dtype=np.uint16)
+    else:
+        b32 = b32 * dx2 * dy2 * div_term * scale
+        b = encode(b32, fmt)
+        del b32
+
+    p = np.zeros((ny, nx), dtype=np.uint16)
+    resume32 = False
+    if initial_guess is not None:
+        guess = np.asarray(initial_guess, dtype=np.float32) * scale
+        p[:] = encode(guess, fmt)
+        # 缩放是 2 的幂，16 位阶段写的检查点解码后逐位不变
+        resume32 = guard and start > 0 and not np.array_equal(decode(p, fmt), guess)
+    pd = p.copy()
+
+    threads = numba.get_num_threads()
+    nchunks = max(1, min(4 * threads, ny - 2))
+    scratch = np.zeros((nchunks, 5, nx), dtype=np.float32)
+    part_max = np.zeros(nchunks, dtype=np.float32)
+    part_pmax = np.zeros(nchunks, dtype=np.float32)
+    inv_scale = np.float32(1.0) / scale
+
+    def field32(dst):
+        # 检查点 / 快照拿到的是去掉缩放的 float32 场
+        decode(p, fmt, dst)
+        dst *= inv_scale
+
+    start_time = time.time()
+    final_it = max_iter
+    switch_it = start if resume32 else None
+
+    for it in range(start, max_iter if switch_it is None else start):
+        pd, p = p, pd
+        check = (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0)
+        with tracing.span("stencil+check" if check else "stencil"):
+            err, pmax = poisson_step_lowp(p, pd, b, b_idx, b_val, dx2, dy2, div_term, nx, ny, fmt, check,
+                                          scratch, part_max, part_pmax)
+        if check:
+            err, pmax = err * inv_scale, pmax * inv_scale
+            if history is not None:
+                history.append((it, float(err), None))
+            if err < tol and not guard:
+                final_it = it
+                break
+            if guard and (err < tol or err < GUARD_ULPS * EPS[fmt] * pmax):
+                switch_it = it + 1
+                break
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(field32, it + 1)
+
+    result = np.empty((ny, nx), dtype=np.float32)
+    if resume32:
+        result[:] = initial_guess
+    else:
+        field32(result)
+    if final_it < max_iter:
+        # 收敛时检查点存上一步的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛
+        prev = np.empty((ny, nx), dtype=np.float32)
+        decode(pd, fmt, prev)
+        prev *= inv_scale
+    del p, pd, b
+
+    if switch_it is not None:
+        # 精度保护：float32 存储算完最后阶段，与 solve_cpu_auto 的主循环相同
+        with tracing.span("promote"):
+            p = result
+            pd = p.copy()
+            if sparse:
+                terms = src.csr(nx, ny, np.float32)
+                step_serial, step_parallel = poisson_step_serial_points, poisson_step_parallel_points
+                step_serial_norm, step_parallel_norm = poisson_step_serial_norm_points, poisson_step_parallel_norm_points
+            else:
+                terms = (src.dense(nx, ny, np.float32),)
+                step_serial, step_parallel = poisson_step_serial, poisson_step_parallel
+                step_serial_norm, step_parallel_norm = poisson_step_serial_norm, poisson_step_parallel_norm
+        part_max32, part_sq, scratch32, bits, mask = reduction_buffers(nx, ny, np.float32, threads)
+        step = tracing.wrap(step_serial if threads <= 1 else step_parallel, "stencil")
+        for it in range(switch_it, max_iter):
+            pd, p = p, pd
+            if it % config.CHECK_INTERVAL == 0:
+                with tracing.span("stencil+check"):
+                    if threads <= 1:
+                        err, l2 = step_serial_norm(p, pd, *terms, dx2, dy2, div_term, nx, ny, scratch32, bits, mask)
+                    else:
+                        err, l2 = step_parallel_norm(p, pd, *terms, dx2, dy2, div_term, nx, ny,
+                                                     part_max32, part_sq, scratch32, bits, mask)
+                if history is not None:
+                    history.append((it, err, l2))
+                if err < tol:
+                    final_it = it
+                    prev = pd
+                    break
+            else:
+                step(p, pd, *terms, dx2, dy2, div_term, nx, ny)
+            if ckpt is not None and ckpt.due(it):
+                ckpt.save(p, it + 1)
+        result = p
+
+    # 最后一次同步写不算进求解时间
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        ckpt.close(prev if final_it < max_iter else result, final_it)
+    return None, None, result, final_it, total_time
@@ -0,0 +1,230 @@
+import numpy as np
+import time
+import warnings
+import config
+import tracing
+import checkpoint as ckpt_io
+import numba
+from poisson_cpu_parallel import poisson_step_serial, poisson_step_parallel, compile_kernels
+from poisson_multigrid import residual_kernel, build_hierarchy, mg_cycle, residual_norm
+
+# 混合精度迭代细化 (iterative refinement)：
+#   r = b - L p            (float64)
+#   L e = r / s            (float32 内层求解，只要求把残差降低 inner_tol 倍)
+#   p += s * e             (float64)
+# float32 的扫描带宽不变，而外层残差在 float64 里计算，精度不受 float32 舍入的限制。
+# s = max|r| 把内层右端项归一化，避免残差变小后在 float32 里下溢或失去有效位。
+
+def _grid(nx, ny):
+    dx = (config.X_MAX - config.X_MIN) / (nx - 1)
+    dy = (config.Y_MAX - config.Y_MIN) / (ny - 1)
+    return dx * dx, dy * dy
+
+def _warn_not_converged(name, max_iter, rel, tol):
+    warnings.warn(f"{name}: relative residual {rel:.2e} after max_iter={max_iter} outer iterations "
+                  f"is still above tol={tol:.0e}", RuntimeWarning, stacklevel=3)
+
+class JacobiCorrection:
+    """
+    float32 Jacobi 内层：从 e = 0 开始扫描，每 CHECK_INTERVAL 次算一次 float32 残差，
+    直到 ||rhs - L e|| < inner_tol * ||rhs||，或残差不再下降 (到了 float32 的舍入下限)。
+    不能用 max|Δe| 判停：Jacobi 收敛很慢，单步更新量早就很小了，残差却远没有降够。
+    """
+
+    def __init__(self, nx, ny, inner_tol, max_sweeps):
+        dx2, dy2 = _grid(nx, ny)
+        self.nx, self.ny = nx, ny
+        self.dx2, self.dy2 = np.float32(dx2), np.float32(dy2)
+        self.div_term = np.float32(1.0 / (2.0 * (self.dx2 + self.dy2)))
+        self.inner_tol = inner_tol
+        self.max_sweeps = max_sweeps
+        self.e = np.zeros((ny, nx), dtype=np.float32)
+        self.ed = np.zeros((ny, nx), dtype=np.float32)
+        self.r = np.zeros((ny, nx), dtype=np.float32)
+        self.step = poisson_step_serial if numba.get_num_threads() <= 1 else poisson_step_parallel
+        compile_kernels((np.float32,))
+
+    def __call__(self, rhs):
+        e, ed = self.e, self.ed
+        e[:] = 0.0
+        ed[:] = 0.0
+        rhs_norm = float(np.linalg.norm(rhs[1:-1, 1:-1]))
+        prev_res = np.inf
+        sweeps = self.max_sweeps
+        for it in range(self.max_sweeps):
+            ed, e = e, ed
+            self.step(e, ed, rhs, self.dx2, self.dy2, self.div_term, self.nx, self.ny)
+            if (it + 1) % config.CHECK_INTERVAL == 0:
+                residual_kernel(self.r, e, rhs, self.dx2, self.dy2, self.nx, self.ny)
+                res = float(np.linalg.norm(self.r[1:-1, 1:-1]))
+                if res < self.inner_tol * rhs_norm or res >= prev_res:
+                    sweeps = it + 1
+                    break
+                prev_res = res
+        self.e, self.ed = e, ed
+        return e, sweeps
+
+class MultigridCorrection:
+    """float32 多重网格 V 循环内层，直到相对残差 < inner_tol。"""
+
+    def __init__(self, nx, ny, inner_tol, max_cycles):
+        self.levels = build_hierarchy(nx, ny, np.float32)
+        self.inner_tol = inner_tol
+        self.max_cycles = max_cycles
+
+    def __call__(self, rhs):
+        fine = self.levels[0]
+        fine.b[:] = rhs
+        fine.p[:] = 0.0
+        rhs_norm = float(np.linalg.norm(rhs[1:-1, 1:-1]))
+        cycles = self.max_cycles
+        for it in range(self.max_cycles):
+            mg_cycle(self.levels)
+            if residual_norm(fine) < self.inner_tol * rhs_norm:
+                cycles = it + 1
+                break
+        return fine.p, cycles
+
+@tracing.traced
+def solve_mixed(nx=config.NX, ny=config.NY, max_iter=50, tol=1e-10, inner="multigrid",
+                inner_tol=1e-3, inner_max=None, history=None, initial_guess=None, checkpoint=None, resume=None,
+                snapshots=None):
+    """
+    混合精度迭代细化。tol 是 float64 相对残差 ||b - L p|| / ||b||；max_iter 是外层细化次数。
+    inner: "multigrid" (float32 V 循环) 或 "jacobi" (float32 Jacobi 扫描，与 solve_cpu_auto 同一个核)。
+    history 若传入 list，每次外层迭代追加 (it, float64 相对残差, 本次内层迭代数)。
+    返回的 p 为 float64；检查点也按 float64 保存，按外层迭代计。
+    外层用完 max_iter 仍未达到 tol 时发出 RuntimeWarning。
+    """
+    if inner == "multigrid":
+        correction = MultigridCorrection(nx, ny, inner_tol, inner_max or 50)
+    elif inner == "jacobi":
+        correction = JacobiCorrection(nx, ny, inner_tol, inner_max or 100 * nx * ny)
+    else:
+        raise ValueError(f"Unknown inner solver '{inner}', expected 'multigrid' or 'jacobi'")
+
+    dx2, dy2 = _grid(nx, ny)
+    p = np.zeros((ny, nx), dtype=np.float64)
+    b = np.zeros((ny, nx), dtype=np.float64)
+    r = np.zeros((ny, nx), dtype=np.float64)
+    rhs = np.zeros((ny, nx), dtype=np.float32)
+    b[int(ny / 4), int(nx / 4)] = 100.0
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, np.float64, interval=1,
+                                               snapshots=snapshots)
+    if initial_guess is not None:
+        p[:] = initial_guess
+
+    start_time = time.time()
+    b_norm = float(np.linalg.norm(b[1:-1, 1:-1]))
+    final_it = max_iter
+
+    for it in range(start, max_iter):
+        with tracing.span("residual"):
+            residual_kernel(r, p, b, dx2, dy2, nx, ny)
+            rel = float(np.linalg.norm(r[1:-1, 1:-1])) / b_norm
+        if rel < tol:
+            final_it = it
+            break
+        scale = np.abs(r).max()
+        np.multiply(r, 1.0 / scale, out=rhs, casting="same_kind")
+        with tracing.span("inner"):
+            e, inner_iters = correction(rhs)
+        with tracing.span("update"):
+            p += scale * e
+        if history is not None:
+            history.append((it, rel, inner_iters))
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
+    else:
+        residual_kernel(r, p, b, dx2, dy2, nx, ny)
+        rel = float(np.linalg.norm(r[1:-1, 1:-1])) / b_norm
+        if rel >= tol:
+            _warn_not_converged("solve_mixed", max_iter, rel, tol)
+
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        ckpt.close(p, final_it)
+    return (np.linspace(config.X_MIN, config.X_MAX, nx),
+            np.linspace(config.Y_MIN, config.Y_MAX, ny),
+            p, final_it, total_time)
+
+@tracing.traced
+def solve_mixed_torch(nx=config.NX, ny=config.NY, max_iter=50, tol=1e-10, inner_tol=1e-3,
+                      inner_max=None, history=None, initial_guess=None, checkpoint=None, resume=None,
+                      snapshots=None):
+    """
+    Torch (CUDA) 版本：内层为 float32 Jacobi，外层残差与解在显存里用 float64 计算。
+    参数含义同 solve_mixed；内层判停与 JacobiCorrection 相同 (float32 残差)。
+    """
+    import torch
+    device = torch.device('cuda')
+    dx2, dy2 = _grid(nx, ny)
+    div_term = 1.0 / (2.0 * (dx2 + dy2))
+    inner_max = inner_max or 100 * nx * ny
+
+    p = torch.zeros((ny, nx), device=device, dtype=torch.float64)
+    b = torch.zeros((ny, nx), device=device, dtype=torch.float64)
+    r = torch.zeros((ny, nx), device=device, dtype=torch.float64)
+    b[int(ny / 4), int(nx / 4)] = 100.0
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, np.float64, interval=1,
+                                               snapshots=snapshots)
+    if initial_guess is not None:
+        p.copy_(torch.as_tensor(initial_guess, dtype=torch.float64))
+    e = torch.zeros((ny, nx), device=device, dtype=torch.float32)
+    e_old = torch.zeros_like(e)
+    rhs = torch.zeros_like(e)
+    r32 = torch.zeros_like(e)
+    torch.cuda.synchronize()
+
+    start_time = time.time()
+    b_norm = torch.linalg.norm(b).item()
+    final_it = max_iter
+
+    def residual(out, u, f):
+        # out = f - L u (L 与 Jacobi 模板一致)，按 u 的精度计算
+        out[1:-1, 1:-1] = f[1:-1, 1:-1] - ((u[1:-1, 2:] - 2.0 * u[1:-1, 1:-1] + u[1:-1, :-2]) / dx2 +
+                                           (u[2:, 1:-1] - 2.0 * u[1:-1, 1:-1] + u[:-2, 1:-1]) / dy2)
+        return torch.linalg.norm(out).item()
+
+    for it in range(start, max_iter):
+        rel = residual(r, p, b) / b_norm
+        if rel < tol:
+            final_it = it
+            break
+        scale = torch.max(torch.abs(r))
+        rhs.copy_(r / scale)
+
+        e.zero_()
+        e_old.zero_()
+        rhs_norm = torch.linalg.norm(rhs).item()
+        prev_res = float("inf")
+        sweeps = inner_max
+        for k in range(inner_max):
+            e_old, e = e, e_old
+            e[1:-1, 1:-1] = (((e_old[1:-1, 2:] + e_old[1:-1, :-2]) * dy2 +
+                              (e_old[2:, 1:-1] + e_old[:-2, 1:-1]) * dx2 -
+                              rhs[1:-1, 1:-1] * dx2 * dy2) * div_term)
+            if (k + 1) % config.CHECK_INTERVAL == 0:
+                res = residual(r32, e, rhs)
+                if res < inner_tol * rhs_norm or res >= prev_res:
+                    sweeps = k + 1
+                    break
+                prev_res = res
+        p += scale * e.double()
+        if history is not None:
+            history.append((it, rel, sweeps))
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
+    else:
+        rel = residual(r, p, b) / b_norm
+        if rel >= tol:
+            _warn_not_converged("solve_mixed_torch", max_iter, rel, tol)
+
+    torch.cuda.synchronize()
+    total_time = time.time() - start_time
+    field = p.cpu().numpy()
+    if ckpt is not None:
+        ckpt.close(field, final_it)
+    return None, None, field, final_it, total_time
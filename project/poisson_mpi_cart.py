@@ -0,0 +1,345 @@
+import numpy as np
+import config
+import tracing
+import checkpoint as ckpt_io
+from mpi4py import MPI
+from numba import njit, prange
+
+# 任意进程数的二维笛卡尔区域分解 (Numba CPU 计算)：
+#   - MPI.Compute_dims + Create_cart 得到 py x px 的进程网格，块大小允许不均匀
+#   - halo_width=1：每步用 Isend/Irecv 交换上一轮的边缘行/列，消息在途时先算不依赖 halo 的内部点，
+#     Waitall 之后再算紧贴 halo 的一圈边界带
+#   - halo_width=k>1 (deep halo)：每 k 步交换一次 k 层 ghost zone，其间在逐步收缩的有效区域上冗余计算，
+#     结果与单进程逐位一致
+# 本地数组 (ly + 2h, lx + 2h)，外圈 h 层是 halo；本地 (i, j) 对应全局 (y0 + i - h, x0 + j - h)。
+
+@njit(parallel=True, cache=True)
+def sweep_rect(p, pd, b, dx2, dy2, div_term, ys, ye, xs, xe):
+    for y in prange(ys, ye):
+        for x in range(xs, xe):
+            p[y, x] = (((pd[y, x + 1] + pd[y, x - 1]) * dy2 +
+                        (pd[y + 1, x] + pd[y - 1, x]) * dx2 -
+                        b[y, x] * dx2 * dy2) * div_term)
+
+@njit(cache=True)
+def rect_max_diff(p, pd, ys, ye, xs, xe):
+    err = 0.0
+    for y in range(ys, ye):
+        for x in range(xs, xe):
+            err = max(err, abs(p[y, x] - pd[y, x]))
+    return err
+
+def block_range(n, parts, coord):
+    """把全局下标 [0, n) 尽量均匀地分成 parts 段，前 n % parts 段多 1 个点。返回第 coord 段 [lo, hi)。"""
+    base, extra = divmod(n, parts)
+    lo = coord * base + min(coord, extra)
+    return lo, lo + base + (1 if coord < extra else 0)
+
+class CartBlock:
+    """一个进程负责的子块：全局范围、可更新的本地范围、邻居和 halo 缓冲区。"""
+
+    def __init__(self, cart, nx, ny, halo=1):
+        self.cart = cart
+        py, px = cart.dims
+        cy, cx = cart.Get_coords(cart.Get_rank())
+        self.y0, self.y1 = block_range(ny, py, cy)
+        self.x0, self.x1 = block_range(nx, px, cx)
+        self.ly, self.lx = self.y1 - self.y0, self.x1 - self.x0
+        # ghost zone 只能来自相邻进程自己的点，所以每个块至少 halo 宽
+        h = self.h = halo
+        if self.ly < max(2, h) or self.lx < max(2, h):
+            raise RuntimeError(f"Grid {nx}x{ny} is too small for a {py}x{px} process grid with halo width {h}")
+
+        # 全局边界点 (Dirichlet 0) 不更新：可更新的本地下标范围 [iy0, iy1) x [ix0, ix1)
+        self.iy0 = h + 1 if self.y0 == 0 else h
+        self.iy1 = h + self.ly - 1 if self.y1 == ny else h + self.ly
+        self.ix0 = h + 1 if self.x0 == 0 else h
+        self.ix1 = h + self.lx - 1 if self.x1 == nx else h + self.lx
+
+        # Shift(0, 1): y 方向 (上/下)，Shift(1, 1): x 方向 (左/右)；物理边界外为 MPI.PROC_NULL
+        self.north, self.south = cart.Shift(0, 1)
+        self.west, self.east = cart.Shift(1, 1)
+
+        # 列不连续，单独打包；行直接用数组切片 (连续)
+        self.send_w = np.empty(self.ly, dtype=np.float32)
+        self.send_e = np.empty(self.ly, dtype=np.float32)
+        self.recv_w = np.empty(self.ly, dtype=np.float32)
+        self.recv_e = np.empty(self.ly, dtype=np.float32)
+        self.recv_n = np.empty(self.lx, dtype=np.float32)
+        self.recv_s = np.empty(self.lx, dtype=np.float32)
+        if h > 1:
+            rows, cols = (h, self.lx), (self.ly + 2 * h, h)
+            self.deep = {name: np.empty(shape, dtype=np.float32) for name, shape in (
+                ("send_n", rows), ("send_s", rows), ("recv_n", rows), ("recv_s", rows),
+                ("send_w", cols), ("send_e", cols), ("recv_w", cols), ("recv_e", cols))}
+
+        # sweep 每步的几个 span 在构造时包好，tracing 关掉时就是原函数
+        self._post = tracing.wrap(self.start_exchange, "halo post")
+        self._wait = tracing.wrap(self.finish_exchange, "halo wait")
+        self._stencil = tracing.wrap(sweep_rect, "stencil")
+        self._edges = tracing.wrap(self._sweep_edges, "stencil edge")
+
+    def local_slice(self, ny, nx):
+        """本地数组 (含 halo) 覆盖的全局范围，裁剪到 [0, n) 内，返回 (全局切片, 本地切片)。"""
+        h = self.h
+        gy0, gy1 = max(self.y0 - h, 0), min(self.y1 + h, ny)
+        gx0, gx1 = max(self.x0 - h, 0), min(self.x1 + h, nx)
+        return ((slice(gy0, gy1), slice(gx0, gx1)),
+                (slice(gy0 - self.y0 + h, gy1 - self.y0 + h), slice(gx0 - self.x0 + h, gx1 - self.x0 + h)))
+
+    def owned(self, a):
+        h = self.h
+        return a[h:h + self.ly, h:h + self.lx]
+
+    def start_exchange(self, pd):
+        """发出 pd 的边缘行/列，接收邻居的到 halo 缓冲区。返回请求列表。"""
+        ly, lx = self.ly, self.lx
+        self.send_w[:] = pd[1:ly + 1, 1]
+        self.send_e[:] = pd[1:ly + 1, lx]
+        c = self.cart
+        return [
+            c.Irecv(self.recv_n, source=self.north, tag=0),
+            c.Irecv(self.recv_s, source=self.south, tag=1),
+            c.Irecv(self.recv_w, source=self.west, tag=2),
+            c.Irecv(self.recv_e, source=self.east, tag=3),
+            c.Isend(pd[1, 1:lx + 1], dest=self.north, tag=1),
+            c.Isend(pd[ly, 1:lx + 1], dest=self.south, tag=0),
+            c.Isend(self.send_w, dest=self.west, tag=3),
+            c.Isend(self.send_e, dest=self.east, tag=2),
+        ]
+
+    def finish_exchange(self, pd, requests):
+        MPI.Request.Waitall(requests)
+        ly, lx = self.ly, self.lx
+        # PROC_NULL 的接收不会写缓冲区，物理边界一侧的 halo 从不被读取
+        if self.north != MPI.PROC_NULL:
+            pd[0, 1:lx + 1] = self.recv_n
+        if self.south != MPI.PROC_NULL:
+            pd[ly + 1, 1:lx + 1] = self.recv_s
+        if self.west != MPI.PROC_NULL:
+            pd[1:ly + 1, 0] = self.recv_w
+        if self.east != MPI.PROC_NULL:
+            pd[1:ly + 1, lx + 1] = self.recv_e
+
+    def exchange_deep(self, pd):
+        """
+        h 层 halo 分两阶段交换：先南北 (只含本块的列)，再东西 (行方向包含刚收到的南北 halo)，
+        这样对角邻居的 h x h 角块经由中间进程转发到位，不需要额外的对角消息。
+        """
+        h, ly, lx, c, buf = self.h, self.ly, self.lx, self.cart, self.deep
+        buf["send_n"][:] = pd[h:2 * h, h:h + lx]
+        buf["send_s"][:] = pd[ly:ly + h, h:h + lx]
+        MPI.Request.Waitall([
+            c.Irecv(buf["recv_n"], source=self.north, tag=0),
+            c.Irecv(buf["recv_s"], source=self.south, tag=1),
+            c.Isend(buf["send_n"], dest=self.north, tag=1),
+            c.Isend(buf["send_s"], dest=self.south, tag=0),
+        ])
+        if self.north != MPI.PROC_NULL:
+            pd[0:h, h:h + lx] = buf["recv_n"]
+        if self.south != MPI.PROC_NULL:
+            pd[ly + h:ly + 2 * h, h:h + lx] = buf["recv_s"]
+
+        buf["send_w"][:] = pd[:, h:2 * h]
+        buf["send_e"][:] = pd[:, lx:lx + h]
+        MPI.Request.Waitall([
+            c.Irecv(buf["recv_w"], source=self.west, tag=2),
+            c.Irecv(buf["recv_e"], source=self.east, tag=3),
+            c.Isend(buf["send_w"], dest=self.west, tag=3),
+            c.Isend(buf["send_e"], dest=self.east, tag=2),
+        ])
+        if self.west != MPI.PROC_NULL:
+            pd[:, 0:h] = buf["recv_w"]
+        if self.east != MPI.PROC_NULL:
+            pd[:, lx + h:lx + 2 * h] = buf["recv_e"]
+
+    def sweep_deep(self, p, pd, b, dx2, dy2, div_term, s):
+        """交换后的第 s 步 (1..h)：在有邻居的方向上多算 h - s 层 ghost 点，物理边界一侧不扩展。"""
+        e = self.h - s
+        ys = self.iy0 - (e if self.north != MPI.PROC_NULL else 0)
+        ye = self.iy1 + (e if self.south != MPI.PROC_NULL else 0)
+        xs = self.ix0 - (e if self.west != MPI.PROC_NULL else 0)
+        xe = self.ix1 + (e if self.east != MPI.PROC_NULL else 0)
+        sweep_rect(p, pd, b, dx2, dy2, div_term, ys, ye, xs, xe)
+
+    def sweep(self, p, pd, b, dx2, dy2, div_term, overlap=True):
+        iy0, iy1, ix0, ix1 = self.iy0, self.iy1, self.ix0, self.ix1
+        requests = self._post(pd)
+        if not overlap:
+            self._wait(pd, requests)
+            self._stencil(p, pd, b, dx2, dy2, div_term, iy0, iy1, ix0, ix1)
+            return
+
+        # 1. 内部点：不读 halo (本地下标 2 .. ly-1)，与通信重叠
+        ys, ye = max(iy0, 2), min(iy1, self.ly)
+        xs, xe = max(ix0, 2), min(ix1, self.lx)
+        self._stencil(p, pd, b, dx2, dy2, div_term, ys, ye, xs, xe)
+
+        # 2. halo 到齐后补上外圈：上下两行 (整行)，左右两列 (去掉已算的角)
+        self._wait(pd, requests)
+        self._edges(p, pd, b, dx2, dy2, div_term, ys, ye, xs, xe)
+
+    def _sweep_edges(self, p, pd, b, dx2, dy2, div_term, ys, ye, xs, xe):
+        iy0, iy1, ix0, ix1 = self.iy0, self.iy1, self.ix0, self.ix1
+        if iy0 < ys:
+            sweep_rect(p, pd, b, dx2, dy2, div_term, iy0, ys, ix0, ix1)
+        if ye < iy1:
+            sweep_rect(p, pd, b, dx2, dy2, div_term, ye, iy1, ix0, ix1)
+        if ix0 < xs:
+            sweep_rect(p, pd, b, dx2, dy2, div_term, ys, ye, ix0, xs)
+        if xe < ix1:
+            sweep_rect(p, pd, b, dx2, dy2, div_term, ys, ye, xe, ix1)
+
+def make_cart(comm=None, dims=None):
+    comm = comm or MPI.COMM_WORLD
+    dims = dims or MPI.Compute_dims(comm.Get_size(), 2)
+    return comm.Create_cart(dims, periods=[False, False], reorder=True)
+
+def _time_it(fn, reps):
+    t0 = MPI.Wtime()
+    for _ in range(reps):
+        fn()
+    return (MPI.Wtime() - t0) / reps
+
+def choose_halo_width(cart, nx, ny, k_max=16, reps=20):
+    """
+    实测后按模型选 halo 宽度 k。每 k 步交换一次，交换耗时近似 alpha + beta * k (延迟 + 带宽)；
+    两次交换之间有邻居的方向平均多算 (k - 1) / 2 层 ghost 点，每点耗时 c。预测每步耗时：
+        t(k) = (alpha + beta * k) / k + c * (ly + ny_nb * (k - 1) / 2) * (lx + nx_nb * (k - 1) / 2)
+    各进程的 t(k) 取 MAX (最慢的进程决定整体速度)，返回 (argmin k, 模型参数 dict)。
+    """
+    probe = CartBlock(cart, nx, ny)
+    k_hi = cart.allreduce(min(k_max, probe.ly, probe.lx), op=MPI.MIN)
+    ly, lx = probe.ly, probe.lx
+    ny_nb = (probe.north != MPI.PROC_NULL) + (probe.south != MPI.PROC_NULL)
+    nx_nb = (probe.west != MPI.PROC_NULL) + (probe.east != MPI.PROC_NULL)
+
+    # 每点计算耗时
+    a = np.zeros((ly + 2, lx + 2), dtype=np.float32)
+    a2 = np.zeros_like(a)
+    one = np.float32(1.0)
+    sweep_rect(a2, a, a, one, one, one, 1, ly + 1, 1, lx + 1)
+    c = _time_it(lambda: sweep_rect(a2, a, a, one, one, one, 1, ly + 1, 1, lx + 1), reps) / (ly * lx)
+
+    # 两个宽度上的交换耗时，线性拟合 alpha + beta * k
+    widths = sorted({1, max(k_hi, 1)})
+    costs = []
+    for k in widths:
+        blk = CartBlock(cart, nx, ny, max(k, 2)) if k > 1 else probe
+        arr = np.zeros((blk.ly + 2 * blk.h, blk.lx + 2 * blk.h), dtype=np.float32)
+        exchange = (lambda: blk.exchange_deep(arr)) if k > 1 else \
+                   (lambda: MPI.Request.Waitall(blk.start_exchange(arr)))
+        exchange()
+        cart.Barrier()
+        costs.append(_time_it(exchange, reps))
+    beta = (costs[-1] - costs[0]) / (widths[-1] - widths[0]) if len(widths) > 1 else 0.0
+    alpha = max(costs[0] - beta, 0.0)
+
+    ks = np.arange(1, k_hi + 1)
+    t = ((alpha + beta * ks) / ks +
+         c * (ly + ny_nb * (ks - 1) / 2.0) * (lx + nx_nb * (ks - 1) / 2.0))
+    cart.Allreduce(MPI.IN_PLACE, t, op=MPI.MAX)
+    k = int(ks[np.argmin(t)])
+    return k, {"alpha": alpha, "beta": beta, "c": c, "t": dict(zip(ks.tolist(), t.tolist()))}
+
+@tracing.traced
+def solve_mpi_cart(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE,
+                   comm=None, dims=None, overlap=True, halo_width=1, gather=True, initial_guess=None,
+                   checkpoint=None, resume=None):
+    """
+    二维笛卡尔分解的 Jacobi 求解器，所有进程都要调用。dims=(py, px) 默认由 MPI.Compute_dims 决定。
+    overlap=False 时先等 halo 再整块计算 (用于对比重叠的收益，只对 halo_width=1 有效)。
+    halo_width=k>1 时每 k 步交换一次 k 层 halo；"auto" 由 choose_halo_width 实测选择。
+    gather=True 时 rank 0 返回拼好的整场，其它进程的 p 为 None；时间为 MPI.Wtime 墙钟时间。
+    checkpoint / resume: 每个 rank 存自己拥有的子块 (<path>.rank<N>)，续算要求进程数和 dims 不变。
+    """
+    cart = make_cart(comm, dims)
+    tracing.set_rank(cart.Get_rank())
+    if halo_width == "auto":
+        halo_width = choose_halo_width(cart, nx, ny)[0]
+    blk = CartBlock(cart, nx, ny, halo_width)
+    ly, lx, h = blk.ly, blk.lx, blk.h
+
+    dx = np.float32((config.X_MAX - config.X_MIN) / (nx - 1))
+    dy = np.float32((config.Y_MAX - config.Y_MIN) / (ny - 1))
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    p = np.zeros((ly + 2 * h, lx + 2 * h), dtype=np.float32)
+    pd = np.zeros_like(p)
+    b = np.zeros_like(p)
+    # ghost 点也要做冗余计算，b 覆盖含 halo 的整个本地范围
+    (gy_sl, gx_sl), _ = blk.local_slice(ny, nx)
+    for gy, gx, val in ((int(ny / 4), int(nx / 4), 100.0), (int(3 * ny / 4), int(3 * nx / 4), -100.0)):
+        if gy_sl.start <= gy < gy_sl.stop and gx_sl.start <= gx < gx_sl.stop:
+            b[gy - blk.y0 + h, gx - blk.x0 + h] = val
+    if initial_guess is not None:
+        blk.owned(p)[:] = initial_guess[blk.y0:blk.y1, blk.x0:blk.x1]
+    ckpt, saved, start = ckpt_io.start(checkpoint, resume, blk.owned(p).shape, comm=cart)
+    if saved is not None:
+        blk.owned(p)[:] = saved
+
+    # 预热 (JIT) 不计时
+    sweep_rect(pd, p, b, dx2, dy2, div_term, 1, 1, 1, 1)
+    rect_max_diff(p, pd, 1, 1, 1, 1)
+    pd[:] = p
+    cart.Barrier()
+    start_time = MPI.Wtime()
+    final_it = max_iter
+
+    if h == 1:
+        for it in range(start, max_iter):
+            pd, p = p, pd
+            blk.sweep(p, pd, b, dx2, dy2, div_term, overlap)
+            if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
+                with tracing.span("check"):
+                    local = rect_max_diff(p, pd, blk.iy0, blk.iy1, blk.ix0, blk.ix1)
+                    global_diff = cart.allreduce(local, op=MPI.MAX)
+                if global_diff < tol:
+                    final_it = it
+                    break
+            if ckpt is not None and ckpt.due(it):
+                ckpt.save(blk.owned(p), it + 1)
+    else:
+        it = start
+        converged = False
+        exchange = tracing.wrap(blk.exchange_deep, "halo")
+        sweep = tracing.wrap(blk.sweep_deep, "stencil")
+        while it < max_iter and not converged:
+            exchange(p)
+            for s in range(1, min(h, max_iter - it) + 1):
+                pd, p = p, pd
+                sweep(p, pd, b, dx2, dy2, div_term, s)
+                # 本块自己的点在整个周期内都有效，检查时机与单进程完全相同
+                if (not config.BENCHMARK_MODE) and (it % config.CHECK_INTERVAL == 0):
+                    with tracing.span("check"):
+                        local = rect_max_diff(p, pd, blk.iy0, blk.iy1, blk.ix0, blk.ix1)
+                        global_diff = cart.allreduce(local, op=MPI.MAX)
+                    if global_diff < tol:
+                        final_it = it
+                        converged = True
+                        break
+                it += 1
+            # 检查点落在周期边界上，续算时第一件事就是重新交换 k 层 halo
+            if not converged and ckpt is not None and ckpt.due(it - 1):
+                ckpt.save(blk.owned(p), it)
+
+    with tracing.span("barrier"):
+        cart.Barrier()
+    total_time = MPI.Wtime() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(blk.owned(pd if final_it < max_iter else p), final_it)
+
+    field = None
+    if gather:
+        parts = cart.gather((blk.y0, blk.y1, blk.x0, blk.x1, blk.owned(p).copy()), root=0)
+        if cart.Get_rank() == 0:
+            field = np.zeros((ny, nx), dtype=np.float32)
+            for y0, y1, x0, x1, local in parts:
+                field[y0:y1, x0:x1] = local
+
+    return (np.linspace(config.X_MIN, config.X_MAX, nx),
+            np.linspace(config.Y_MIN, config.Y_MAX, ny),
+            field, final_it, total_time)
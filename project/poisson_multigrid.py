@@ -0,0 +1,245 @@
+import numpy as np
+import time
+import config
+import tracing
+import checkpoint as ckpt_io
+from numba import njit, prange
+from poisson_cpu_parallel import poisson_rbsor_sweep, sor_optimal_omega
+
+# 粗化到这个规模以下就直接在最粗层上用 SOR 解
+COARSEST_POINTS = 256
+# 某方向网格步长比另一方向小这么多时才单独粗化该方向 (半粗化，处理 X_MAX/Y_MAX = 2:1 的各向异性)
+SEMI_COARSEN_RATIO = 1.5
+
+
+@njit(parallel=True, cache=True)
+def residual_kernel(r, p, b, dx2, dy2, nx, ny):
+    # r = b - L p，L 为与 Jacobi 模板一致的 5 点 Laplace 算子
+    for y in prange(1, ny - 1):
+        for x in range(1, nx - 1):
+            lap = ((p[y, x + 1] - 2.0 * p[y, x] + p[y, x - 1]) / dx2 +
+                   (p[y + 1, x] - 2.0 * p[y, x] + p[y - 1, x]) / dy2)
+            r[y, x] = b[y, x] - lap
+
+
+@njit(parallel=True, cache=True)
+def restrict_x(out, fine, lo, hi, pos_f, pos_c, hc, nx_c, ny):
+    # 沿 x 方向的加权平均 (线性插值的转置并按行归一化)，嵌套网格时即 1/4-1/2-1/4 全权重
+    for y in prange(ny):
+        for j in range(1, nx_c - 1):
+            acc = 0.0
+            wsum = 0.0
+            for i in range(lo[j], hi[j]):
+                w = 1.0 - abs(pos_f[i] - pos_c[j]) / hc
+                if w > 0.0:
+                    acc += w * fine[y, i]
+                    wsum += w
+            out[y, j] = acc / wsum
+
+
+@njit(parallel=True, cache=True)
+def restrict_y(out, fine, lo, hi, pos_f, pos_c, hc, nx, ny_c):
+    for j in prange(1, ny_c - 1):
+        for x in range(1, nx - 1):
+            acc = 0.0
+            wsum = 0.0
+            for i in range(lo[j], hi[j]):
+                w = 1.0 - abs(pos_f[i] - pos_c[j]) / hc
+                if w > 0.0:
+                    acc += w * fine[i, x]
+                    wsum += w
+            out[j, x] = acc / wsum
+
+
+@njit(parallel=True, cache=True)
+def prolong_add(p, coarse, jx, wx, jy, wy, nx, ny):
+    # 双线性插值粗网格修正量并加到细网格内部点上 (边界修正量恒为 0)
+    for y in prange(1, ny - 1):
+        j0 = jy[y]
+        ty = wy[y]
+        for x in range(1, nx - 1):
+            i0 = jx[x]
+            tx = wx[x]
+            e = ((1.0 - ty) * ((1.0 - tx) * coarse[j0, i0] + tx * coarse[j0, i0 + 1]) +
+                 ty * ((1.0 - tx) * coarse[j0 + 1, i0] + tx * coarse[j0 + 1, i0 + 1]))
+            p[y, x] += e
+
+
+def _interp_weights(n_f, n_c, length):
+    # 细网格点 i 落在粗网格区间 [j0, j0+1] 中，权重 t 为区间内的相对位置
+    hc = length / (n_c - 1)
+    pos_f = np.linspace(0.0, length, n_f)
+    j0 = np.minimum((pos_f / hc).astype(np.int64), n_c - 2)
+    t = pos_f / hc - j0
+    return j0, t
+
+
+def _restrict_ranges(n_f, n_c, length):
+    # 每个粗网格点 j 只从 (x_{j-1}, x_{j+1}) 内的细网格点取值
+    hf = length / (n_f - 1)
+    hc = length / (n_c - 1)
+    pos_f = np.linspace(0.0, length, n_f)
+    pos_c = np.linspace(0.0, length, n_c)
+    lo = np.maximum(np.floor((pos_c - hc) / hf).astype(np.int64), 0)
+    hi = np.minimum(np.ceil((pos_c + hc) / hf).astype(np.int64) + 1, n_f)
+    return lo, hi, pos_f, pos_c, hc
+
+
+class Level:
+    def __init__(self, nx, ny, dtype):
+        self.nx, self.ny = nx, ny
+        self.dx = (config.X_MAX - config.X_MIN) / (nx - 1)
+        self.dy = (config.Y_MAX - config.Y_MIN) / (ny - 1)
+        self.dx2 = dtype(self.dx * self.dx)
+        self.dy2 = dtype(self.dy * self.dy)
+        self.div_term = dtype(1.0 / (2.0 * (self.dx2 + self.dy2)))
+        self.p = np.zeros((ny, nx), dtype=dtype)
+        self.b = np.zeros((ny, nx), dtype=dtype)
+        self.r = np.zeros((ny, nx), dtype=dtype)
+        self.row_err = np.zeros(ny, dtype=dtype)
+
+
+def _coarsen_dims(nx, ny, dx, dy):
+    # 步长小的方向耦合强，先只粗化它，直到两个方向步长相近再同时粗化
+    cx = nx > 3 and dx <= SEMI_COARSEN_RATIO * dy
+    cy = ny > 3 and dy <= SEMI_COARSEN_RATIO * dx
+    if not (cx or cy):
+        return None
+    nx_c = (nx - 1) // 2 + 1 if cx else nx
+    ny_c = (ny - 1) // 2 + 1 if cy else ny
+    return nx_c, ny_c
+
+
+def hierarchy_dims(nx, ny):
+    dims = [(nx, ny)]
+    while nx * ny > COARSEST_POINTS:
+        dx = (config.X_MAX - config.X_MIN) / (nx - 1)
+        dy = (config.Y_MAX - config.Y_MIN) / (ny - 1)
+        coarse = _coarsen_dims(nx, ny, dx, dy)
+        if coarse is None:
+            break
+        nx, ny = coarse
+        dims.append(coarse)
+    return dims
+
+
+def build_hierarchy(nx, ny, dtype=np.float64):
+    levels = [Level(n_x, n_y, dtype) for n_x, n_y in hierarchy_dims(nx, ny)]
+
+    # 预计算相邻两层之间的转移算子参数
+    lx = config.X_MAX - config.X_MIN
+    ly = config.Y_MAX - config.Y_MIN
+    for fine, coarse in zip(levels[:-1], levels[1:]):
+        fine.jx, fine.wx = _interp_weights(fine.nx, coarse.nx, lx)
+        fine.jy, fine.wy = _interp_weights(fine.ny, coarse.ny, ly)
+        fine.rx = _restrict_ranges(fine.nx, coarse.nx, lx)
+        fine.ry = _restrict_ranges(fine.ny, coarse.ny, ly)
+        fine.tmp = np.zeros((fine.ny, coarse.nx), dtype=dtype)
+    return levels
+
+
+def _smooth(lv, sweeps):
+    # 复用红黑 SOR 核，omega=1 即红黑 Gauss-Seidel 光滑子
+    one = lv.dx2.dtype.type(1.0)
+    for _ in range(sweeps):
+        poisson_rbsor_sweep(lv.p, lv.b, lv.dx2, lv.dy2, lv.div_term, one, lv.nx, lv.ny, 0, lv.row_err)
+        poisson_rbsor_sweep(lv.p, lv.b, lv.dx2, lv.dy2, lv.div_term, one, lv.nx, lv.ny, 1, lv.row_err)
+
+
+def _coarse_solve(lv):
+    omega = lv.dx2.dtype.type(sor_optimal_omega(lv.nx, lv.ny, float(lv.dx2), float(lv.dy2)))
+    for _ in range(4 * max(lv.nx, lv.ny)):
+        poisson_rbsor_sweep(lv.p, lv.b, lv.dx2, lv.dy2, lv.div_term, omega, lv.nx, lv.ny, 0, lv.row_err)
+        poisson_rbsor_sweep(lv.p, lv.b, lv.dx2, lv.dy2, lv.div_term, omega, lv.nx, lv.ny, 1, lv.row_err)
+
+
+def mg_cycle(levels, k=0, gamma=1, nu1=2, nu2=2):
+    """gamma=1 为 V 循环，gamma=2 为 W 循环。"""
+    lv = levels[k]
+    if k == len(levels) - 1:
+        with tracing.span("coarse solve", level=k):
+            _coarse_solve(lv)
+        return
+
+    coarse = levels[k + 1]
+    with tracing.span("smooth", level=k):
+        _smooth(lv, nu1)
+
+    # 残差限制到粗网格，作为粗网格误差方程 L e = r 的右端项
+    with tracing.span("residual", level=k):
+        residual_kernel(lv.r, lv.p, lv.b, lv.dx2, lv.dy2, lv.nx, lv.ny)
+    with tracing.span("restrict", level=k):
+        lo, hi, pos_f, pos_c, hc = lv.rx
+        restrict_x(lv.tmp, lv.r, lo, hi, pos_f, pos_c, hc, coarse.nx, lv.ny)
+        lo, hi, pos_f, pos_c, hc = lv.ry
+        restrict_y(coarse.b, lv.tmp, lo, hi, pos_f, pos_c, hc, coarse.nx, coarse.ny)
+
+    coarse.p[:] = 0.0
+    for _ in range(gamma):
+        mg_cycle(levels, k + 1, gamma, nu1, nu2)
+
+    with tracing.span("prolong", level=k):
+        prolong_add(lv.p, coarse.p, lv.jx, lv.wx, lv.jy, lv.wy, lv.nx, lv.ny)
+    with tracing.span("smooth", level=k):
+        _smooth(lv, nu2)
+
+
+def residual_norm(lv):
+    residual_kernel(lv.r, lv.p, lv.b, lv.dx2, lv.dy2, lv.nx, lv.ny)
+    return float(np.linalg.norm(lv.r[1:-1, 1:-1]))
+
+
+@tracing.traced
+def solve_multigrid(nx=config.NX, ny=config.NY, max_cycles=50, tol=1e-8,
+                    cycle="V", nu1=2, nu2=2, dtype=np.float64, history=None, verbose=False,
+                    initial_guess=None, checkpoint=None, resume=None, snapshots=None):
+    """
+    几何多重网格求解器。tol 是相对残差 ||b - L p|| / ||b|| 的收敛阈值。
+    float32 的残差在大网格上会被舍入误差淹没，所以这里默认 float64。
+    history 若传入 list，则每个循环追加 (cycle, 相对残差, 本次缩减因子)。
+    检查点按循环计 (每个循环之后都可以写，间隔由写入开销决定)。
+    """
+    if cycle not in ("V", "W"):
+        raise ValueError(f"Unknown cycle '{cycle}', expected 'V' or 'W'")
+    gamma = 1 if cycle == "V" else 2
+
+    levels = build_hierarchy(nx, ny, dtype)
+    fine = levels[0]
+    fine.b[int(ny / 4), int(nx / 4)] = 100.0
+    fine.b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, dtype, interval=1,
+                                               snapshots=snapshots)
+    if initial_guess is not None:
+        fine.p[:] = initial_guess
+
+    if verbose:
+        dims = " -> ".join(f"{lv.nx}x{lv.ny}" for lv in levels)
+        print(f"   MG hierarchy ({len(levels)} levels): {dims}")
+
+    start_time = time.time()
+    b_norm = float(np.linalg.norm(fine.b[1:-1, 1:-1]))
+    prev = residual_norm(fine)
+    final_it = max_cycles
+
+    for it in range(start + 1, max_cycles + 1):
+        mg_cycle(levels, 0, gamma, nu1, nu2)
+        with tracing.span("check"):
+            res = residual_norm(fine)
+        factor = res / prev if prev > 0 else 0.0
+        prev = res
+        if history is not None:
+            history.append((it, res / b_norm, factor))
+        if verbose:
+            print(f"   cycle {it:>3} | rel. residual {res / b_norm:.3e} | factor {factor:.3f}")
+        if res / b_norm < tol:
+            final_it = it
+            break
+        if ckpt is not None and ckpt.due(it - 1):
+            ckpt.save(fine.p, it)
+
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        ckpt.close(fine.p, final_it)
+    return (np.linspace(config.X_MIN, config.X_MAX, nx),
+            np.linspace(config.Y_MIN, config.Y_MAX, ny),
+            fine.p, final_it, total_time)
@@ -1,10 +1,24 @@
 from numba import cuda, float32
+import numba
 import numpy as np
 import math
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
+import sources
+import cuda_reduce
+from cuda_reduce import DeviceMaxAbsDiff, AdaptiveInterval
+from poisson_lowp import EPS, FP16, GUARD_ULPS, field_scale
 
-@cuda.jit
+# 签名与 solve_numba 实际传入的类型一致；cache=True 把编译结果写入磁盘缓存
+KERNEL_SIGNATURE = "void(float32[:, ::1], float32[:, ::1], float32[:, ::1], float32, float32, float32, int64, int64)"
+SPARSE_SIGNATURE = "void(float32[:, ::1], float32[:, ::1], float32, float32, float32, int64, int64)"
+POINTS_SIGNATURE = "void(float32[:, ::1], float32[:, ::1], int64[:, ::1], float32[::1], float32, float32, float32)"
+HALF_SIGNATURE = "void(float16[:, ::1], float16[:, ::1], float32, float32, float32, int64, int64)"
+SOURCE_SIGNATURE = "void(float16[:, ::1], float16[:, ::1], int64[:, ::1], float32[::1], float32, float32, float32)"
+
+@cuda.jit(cache=True)
 def poisson_kernel(p_out, p_in, b, dx2, dy2, div_term, nx, ny):
     x, y = cuda.grid(2)
     if x > 0 and x < nx - 1 and y > 0 and y < ny - 1:
@@ -12,9 +26,136 @@ def poisson_kernel(p_out, p_in, b, dx2, dy2, div_term, nx, ny):
                         (p_in[y+1, x] + p_in[y-1, x]) * dx2 -
                         b[y, x] * dx2 * dy2) * div_term)
 
-def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+# 点源 (sources.Points)：主核不读 b，源点由 poisson_points 按带 b 的完整公式重算 (与稠密 b 逐位相同)。
+# 两个核读的都是 p_in，只要求 poisson_points 排在主核之后 (同一个流里按顺序执行)
+@cuda.jit(cache=True)
+def poisson_kernel_sparse(p_out, p_in, dx2, dy2, div_term, nx, ny):
+    x, y = cuda.grid(2)
+    if x > 0 and x < nx - 1 and y > 0 and y < ny - 1:
+        p_out[y, x] = (((p_in[y, x+1] + p_in[y, x-1]) * dy2 +
+                        (p_in[y+1, x] + p_in[y-1, x]) * dx2) * div_term)
+
+@cuda.jit(cache=True)
+def poisson_points(p_out, p_in, b_idx, b_val, dx2, dy2, div_term):
+    k = cuda.grid(1)
+    if k < b_idx.shape[0]:
+        y = b_idx[k, 0]
+        x = b_idx[k, 1]
+        p_out[y, x] = (((p_in[y, x+1] + p_in[y, x-1]) * dy2 +
+                        (p_in[y+1, x] + p_in[y-1, x]) * dx2 -
+                        b_val[k] * dx2 * dy2) * div_term)
+
+# 点源修正核每块的线程数
+POINT_THREADS = 32
+
+# storage="fp16"：场以 float16 存储、float32 计算 (见 poisson_lowp.py)。b 不占显存：
+# 与上面相同，主核不带源项，源点由 poisson_source_half 按点表重算 (b_val 是缩放后的单步增量)
+@cuda.jit(cache=True)
+def poisson_kernel_half(p_out, p_in, dx2, dy2, div_term, nx, ny):
+    x, y = cuda.grid(2)
+    if x > 0 and x < nx - 1 and y > 0 and y < ny - 1:
+        p_out[y, x] = np.float16(((float32(p_in[y, x+1]) + float32(p_in[y, x-1])) * dy2 +
+                                  (float32(p_in[y+1, x]) + float32(p_in[y-1, x])) * dx2) * div_term)
+
+@cuda.jit(cache=True)
+def poisson_source_half(p_out, p_in, b_idx, b_val, dx2, dy2, div_term):
+    k = cuda.grid(1)
+    if k < b_idx.shape[0]:
+        y = b_idx[k, 0]
+        x = b_idx[k, 1]
+        p_out[y, x] = np.float16(((float32(p_in[y, x+1]) + float32(p_in[y, x-1])) * dy2 +
+                                  (float32(p_in[y+1, x]) + float32(p_in[y-1, x])) * dx2) * div_term - b_val[k])
+
+def compile_kernels():
+    """按显式签名编译 (或从缓存加载) CUDA 核，返回耗时 (秒)。"""
+    t0 = time.perf_counter()
+    # CUDA 模拟器 (NUMBA_ENABLE_CUDASIM=1) 下核是解释执行的，没有可编译的东西
+    if not numba.config.ENABLE_CUDASIM:
+        poisson_kernel.compile(KERNEL_SIGNATURE)
+        poisson_kernel_sparse.compile(SPARSE_SIGNATURE)
+        poisson_points.compile(POINTS_SIGNATURE)
+        poisson_kernel_half.compile(HALF_SIGNATURE)
+        poisson_source_half.compile(SOURCE_SIGNATURE)
+    cuda_reduce.compile_kernels()
+    return time.perf_counter() - t0
+
+def _solve_half(nx, ny, max_iter, tol, p_host, start, dx2, dy2, div_term, blocks, threads, ckpt, src):
+    """
+    float16 存储阶段，返回 (float32 场, 已完成的步数, 是否已经结束)。
+    与 poisson_lowp 相同：场按 2 的幂缩放，更新量降到 fp16 的分辨率以下 (或 tol 以下) 时交回 float32 阶段。
+    这里的更新量是存储值之差 (显存里只有 16 位的场)，停滞时为 0，同样会触发切换。
+    源项总是按点表处理 (稠密 / 解析源项取非零点)。
+    """
+    b_idx, b_src = src.points(nx, ny, np.float32)
+    b_max = float(np.abs(b_src).max()) if len(b_src) else 0.0
+    scale = np.float32(field_scale(b_max, float(dx2), float(dy2), float(div_term)))
+    b_val = b_src * dx2 * dy2 * div_term * scale
+    p_half = (p_host * scale).astype(np.float16)
+
+    d_p_in = cuda.to_device(p_half)
+    d_p_out = cuda.to_device(p_half)
+    d_idx = cuda.to_device(b_idx)
+    d_val = cuda.to_device(b_val)
+    # max|p| 用同一个归约核对全 0 的场求
+    d_zero = cuda.to_device(np.zeros_like(p_half))
+    max_diff = DeviceMaxAbsDiff(nx, ny)
+    interval = AdaptiveInterval(start=config.CHECK_INTERVAL)
+    next_check = start
+    point_blocks = max(1, -(-len(b_idx) // POINT_THREADS))
+
+    def unscaled(d):
+        def gather(dst):
+            dst[...] = d.copy_to_host()
+            dst /= scale
+        return gather
+
+    def sweep(d_p_out, d_p_in):
+        poisson_kernel_half[blocks, threads](d_p_out, d_p_in, dx2, dy2, div_term, nx, ny)
+        if len(b_idx):
+            poisson_source_half[point_blocks, POINT_THREADS](d_p_out, d_p_in, d_idx, d_val, dx2, dy2, div_term)
+        cuda.synchronize()
+    sweep = tracing.wrap(sweep, "stencil")
+
+    done = True
+    it = start
+    for it in range(start, max_iter):
+        sweep(d_p_out, d_p_in)
+
+        if not config.BENCHMARK_MODE and it == next_check:
+            with tracing.span("check"):
+                diff = max_diff(d_p_out, d_p_in) / scale
+                pmax = max_diff(d_p_out, d_zero) / scale
+            if diff < tol or diff < GUARD_ULPS * EPS[FP16] * pmax:
+                d_p_in, d_p_out = d_p_out, d_p_in
+                it += 1
+                done = False
+                break
+            next_check = it + interval.next(it, diff, tol)
+
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(unscaled(d_p_out), it + 1)
+        d_p_in, d_p_out = d_p_out, d_p_in
+    else:
+        it = max_iter
+
+    field = np.empty((ny, nx), dtype=np.float32)
+    unscaled(d_p_in)(field)
+    return field, it, done
+
+@tracing.traced
+def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, initial_guess=None,
+                checkpoint=None, resume=None, snapshots=None, storage="fp32", source=None):
+    """
+    storage: "fp32" 或 "fp16"。fp16 时场以 float16 存储、float32 计算，b 用稀疏表；
+    收敛的最后阶段 (更新量降到 fp16 分辨率以下) 换回 float32 存储算完，见 _solve_half。
+    source: 源项 (见 sources.py)，默认两点源。点源时 b 不占显存，主核之后只修正源点。
+    """
+    if storage not in ("fp32", "fp16"):
+        raise ValueError(f"Unknown storage '{storage}', expected 'fp32' or 'fp16' (bf16 is CPU only)")
     if not cuda.is_available():
         return None, None, None, None, None
+    # JIT 不计入下面的计时窗口
+    compile_kernels()
 
     # --- 1. 准备 CPU 数据 ---
     xmin, xmax = config.X_MIN, config.X_MAX
@@ -22,10 +163,16 @@ def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config
     dx = float32((xmax - xmin) / (nx - 1))
     dy = float32((ymax - ymin) / (ny - 1))
     
+    # 检查点：resume 时从保存的场和迭代数接着算 (见 checkpoint.py)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
     p_host = np.zeros((ny, nx), dtype=np.float32)
-    b_host = np.zeros((ny, nx), dtype=np.float32)
-    b_host[int(ny / 4), int(nx / 4)] = 100
-    b_host[int(3 * ny / 4), int(3 * nx / 4)] = -100
+    if initial_guess is not None:
+        p_host[:] = initial_guess
+    src = sources.as_source(source)
+    if src.sparse:
+        b_idx, b_val = src.points(nx, ny, np.float32)
+    else:
+        b_host = src.dense(nx, ny, np.float32)
 
     dx2, dy2 = dx**2, dy**2
     div_term = float32(1.0 / (2 * (dx2 + dy2)))
@@ -36,6 +183,16 @@ def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config
     start_time = time.time()
     final_it = 0
 
+    if storage == "fp16":
+        with cuda.gpus[0]:
+            p_host, start, done = _solve_half(nx, ny, max_iter, tol, p_host, start, dx2, dy2, div_term,
+                                              blocks_per_grid, threads_per_block, ckpt, src)
+        if done:
+            total_time = time.time() - start_time
+            if ckpt is not None:
+                ckpt.close(p_host, start)
+            return np.linspace(xmin, xmax, nx), np.linspace(ymin, ymax, ny), p_host, start, total_time
+
     # --- 2. 关键修改：用 Context Manager 包裹所有 GPU 操作 ---
     # 这样可以保证 d_p_in 分配时的上下文和 kernel 运行时的上下文是同一个
     try:
@@ -43,27 +200,53 @@ def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config
             # 显存分配
             d_p_in = cuda.to_device(p_host)
             d_p_out = cuda.to_device(p_host)
-            d_b = cuda.to_device(b_host)
-            
-            # 迭代循环
-            for it in range(max_iter):
-                poisson_kernel[blocks_per_grid, threads_per_block](
-                    d_p_out, d_p_in, d_b, dx2, dy2, div_term, nx, ny
-                )
+            if src.sparse:
+                d_idx = cuda.to_device(b_idx)
+                d_val = cuda.to_device(b_val)
+                point_blocks = max(1, -(-len(b_idx) // POINT_THREADS))
+            else:
+                d_b = cuda.to_device(b_host)
+            # 收敛量在显存里归约，每次检查只回传一个 float；检查间隔按收敛速度自适应
+            max_diff = DeviceMaxAbsDiff(nx, ny)
+            interval = AdaptiveInterval(start=config.CHECK_INTERVAL)
+            next_check = start
+
+            def sweep(d_p_out, d_p_in):
+                if not src.sparse:
+                    poisson_kernel[blocks_per_grid, threads_per_block](
+                        d_p_out, d_p_in, d_b, dx2, dy2, div_term, nx, ny
+                    )
+                else:
+                    poisson_kernel_sparse[blocks_per_grid, threads_per_block](
+                        d_p_out, d_p_in, dx2, dy2, div_term, nx, ny
+                    )
+                    if len(b_idx):
+                        poisson_points[point_blocks, POINT_THREADS](
+                            d_p_out, d_p_in, d_idx, d_val, dx2, dy2, div_term
+                        )
                 # 同步
                 cuda.synchronize()
+            # 每步一次的 span 在循环外包好，tracing 关掉时就是 sweep 本身
+            sweep = tracing.wrap(sweep, "stencil")
+            
+            # 迭代循环
+            for it in range(start, max_iter):
+                sweep(d_p_out, d_p_in)
                 
                 # 收敛检查
-                if not config.BENCHMARK_MODE and it % config.CHECK_INTERVAL == 0:
-                    p_curr = d_p_out.copy_to_host()
-                    p_prev = d_p_in.copy_to_host()
-                    diff = np.max(np.abs(p_curr - p_prev))
+                if not config.BENCHMARK_MODE and it == next_check:
+                    with tracing.span("check"):
+                        diff = max_diff(d_p_out, d_p_in)
                     
                     if diff < tol:
                         final_it = it
-                        # 确保最后的结果在 d_p_in 里
-                        d_p_in.copy_to_device(d_p_out) 
+                        # 确保最后的结果在 d_p_in 里；d_p_out 留着上一步的场给检查点
+                        d_p_in, d_p_out = d_p_out, d_p_in
                         break
+                    next_check = it + interval.next(it, diff, tol)
+
+                if ckpt is not None and ckpt.due(it):
+                    ckpt.save(d_p_out, it + 1)
                 
                 # 交换指针 (仅在 GPU 内部进行)
                 d_p_in, d_p_out = d_p_out, d_p_in
@@ -71,10 +254,15 @@ def solve_numba(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config
                 final_it = max_iter
             
             # 取回结果
-            p_final = d_p_in.copy_to_host()
+            with tracing.span("copy"):
+                p_final = d_p_in.copy_to_host()
             
     except Exception as e:
         print(f"CRITICAL ERROR: {e}")
         return None, None, None, None, None
 
-    return np.linspace(xmin, xmax, nx), np.linspace(ymin, ymax, ny), p_final, final_it, time.time() - start_time
\ No newline at end of file
+    total_time = time.time() - start_time
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(d_p_out if final_it < max_iter else p_final, final_it)
+    return np.linspace(xmin, xmax, nx), np.linspace(ymin, ymax, ny), p_final, final_it, total_time
\ No newline at end of file
@@ -1,10 +1,15 @@
 import numpy as np
 from mpi4py import MPI
+import tracing
+import checkpoint as ckpt_io
 
-def solve_2gpu_mpi(nx: int, ny: int, max_iter: int = 1000, check_interval: int = 100) -> float:
+@tracing.traced
+def solve_2gpu_mpi(nx: int, ny: int, max_iter: int = 1000, check_interval: int = 100,
+                   initial_guess: np.ndarray = None, checkpoint: str = None, resume=None) -> float:
     comm = MPI.COMM_WORLD
     rank = comm.Get_rank()
     size = comm.Get_size()
+    tracing.set_rank(rank)
 
     # 允许 size 为 1 或 2
     if size > 2:
@@ -22,8 +27,18 @@ def solve_2gpu_mpi(nx: int, ny: int, max_iter: int = 1000, check_interval: int =
     div_term = 1.0 / (2.0 * (dx2 + dy2))
     local_ny = ny // size
 
-    p = cuda.to_device(np.zeros((local_ny + 2, nx), dtype=np.float32))
-    pd = cuda.to_device(np.zeros((local_ny + 2, nx), dtype=np.float32))
+    # 本地第 i 行对应全局第 rank * local_ny + i - 1 行 (第 0 行和最后一行是 halo)
+    p_host = np.zeros((local_ny + 2, nx), dtype=np.float32)
+    if initial_guess is not None:
+        g0 = rank * local_ny - 1
+        lo, hi = max(g0, 0), min(g0 + local_ny + 2, ny)
+        p_host[lo - g0:hi - g0] = initial_guess[lo:hi]
+    # 每个 rank 存自己的本地块 (含 halo 行)，只落在 check_interval 的批边界上
+    ckpt, saved, start = ckpt_io.start(checkpoint, resume, p_host.shape, comm=comm)
+    if saved is not None:
+        p_host[:] = saved
+    p = cuda.to_device(p_host)
+    pd = cuda.to_device(p_host)
     b = cuda.to_device(np.zeros((local_ny + 2, nx), dtype=np.float32))
 
     @cuda.jit
@@ -62,23 +77,32 @@ def solve_2gpu_mpi(nx: int, ny: int, max_iter: int = 1000, check_interval: int =
 
     start_time = MPI.Wtime()
 
-    for it in range(0, max_iter, check_interval):
-        for _ in range(check_interval):
-            pd, p = p, pd
-            solve_kernel[blocks, threads](p, pd, b, div_term, dx2, dy2, local_ny, nx, rank, size)
+    for it in range(start, max_iter, check_interval):
+        with tracing.span("stencil", steps=check_interval):
+            for _ in range(check_interval):
+                pd, p = p, pd
+                solve_kernel[blocks, threads](p, pd, b, div_term, dx2, dy2, local_ny, nx, rank, size)
 
-        cuda.synchronize()
+            cuda.synchronize()
 
         # 核心修改：如果是单卡运行，跳过 MPI 通信
         if size > 1:
-            if rank == 0:
-                p[local_ny, :].copy_to_host(host_send)
-                comm.Sendrecv(sendbuf=host_send, dest=1, sendtag=11, recvbuf=host_recv, source=1, recvtag=22)
-                p[local_ny + 1, :].copy_to_device(host_recv)
-            else:
-                p[1, :].copy_to_host(host_send)
-                comm.Sendrecv(sendbuf=host_send, dest=0, sendtag=22, recvbuf=host_recv, source=0, recvtag=11)
-                p[0, :].copy_to_device(host_recv)
-
-    comm.Barrier()
-    return MPI.Wtime() - start_time
\ No newline at end of file
+            with tracing.span("halo"):
+                if rank == 0:
+                    p[local_ny, :].copy_to_host(host_send)
+                    comm.Sendrecv(sendbuf=host_send, dest=1, sendtag=11, recvbuf=host_recv, source=1, recvtag=22)
+                    p[local_ny + 1, :].copy_to_device(host_recv)
+                else:
+                    p[1, :].copy_to_host(host_send)
+                    comm.Sendrecv(sendbuf=host_send, dest=0, sendtag=22, recvbuf=host_recv, source=0, recvtag=11)
+                    p[0, :].copy_to_device(host_recv)
+
+        if ckpt is not None and ckpt.due(it + check_interval - 1):
+            ckpt.save(p, it + check_interval)
+
+    with tracing.span("barrier"):
+        comm.Barrier()
+    total_time = MPI.Wtime() - start_time
+    if ckpt is not None:
+        ckpt.close(p, max(max_iter, start))
+    return total_time
\ No newline at end of file
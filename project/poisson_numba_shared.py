@@ -6,7 +6,7 @@ TILE_SIZE = 16
 SHARED_Y = TILE_SIZE + 2
 SHARED_X = TILE_SIZE + 2
 
-@cuda.jit
+@cuda.jit(cache=True)
 def poisson_shared_kernel(p_out, p_in, b, dx2, dy2, div_term, nx, ny):
     # ✅ 使用模块级常量 + 关键字参数
     s_p = cuda.shared.array(shape=(SHARED_Y, SHARED_X), dtype=float32)
@@ -0,0 +1,225 @@
+import os
+import time
+import errno
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import numba
+from numba import njit, prange, types
+import config
+import tracing
+import memory as mem_model
+import checkpoint as ckpt_io
+from poisson_cpu_parallel import _tile_sweep, max_abs_diff, reduction_buffers
+
+# 核外 (out-of-core) Jacobi：4096^2 以上的 CPU 运行在报告里是 OOM，内存小的节点上还想算 32k^2。
+#   - p、pd、b 都放在 np.memmap 文件里，内存里只有几条水平带 (band)
+#   - 每条带连同上下各 k 行 halo 读进内存，在内存里连做 k 次 Jacobi (与 poisson_step_time_blocked 同样的收缩 halo)，
+#     只把带本身写回另一个文件；每遍 (pass) 扫完所有带，场前进 k 步，磁盘流量摊到 k 步上
+#   - 读写在单独的 I/O 线程里：计算第 i 条带时预取第 i+1 条，第 i-1 条的结果在后台写回。
+#     两组带缓冲区轮流用；I/O 线程按提交顺序执行，读某组缓冲区一定排在上一次从它写回之后
+#   - 核带 nogil，计算和 I/O 线程里的拷贝 (缺页读盘) 真正重叠
+# 不给 workdir 时文件放在临时目录，建好映射后立即删除：进程退出 (包括被杀) 时磁盘空间自动释放，
+# 返回的场仍是这个映射。给了 workdir 时文件保留 (p.bin、pd.bin、b.bin，最终结果是返回的那个)。
+# 检查点不经过内存暂存区 (checkpoint.Checkpointer 的 staging=False)：在遍与遍之间把 p 的文件直接拷进检查点文件，
+# 续算时初值直接从检查点文件的 memmap 分块拷进 p。快照的缓冲池要放几帧整场，这里不支持。
+
+# 每条带的缓冲区：两组 (读入的带 + halo、ping-pong 工作区、b)，共 6 份
+BAND_BUFFERS = 6
+
+# 不给 mem_bytes 时，带缓冲区最多用可用内存的这个比例 (其余留给页缓存做预读和回写)
+MEM_FRACTION = 0.25
+MAX_BAND_BYTES = 1 << 30
+
+@njit(parallel=True, nogil=True, cache=True)
+def poisson_band_sweeps(a, w, b, dx2, dy2, div_term, nx, h, k, top, bottom):
+    # a: 第 t 步的带 (含 halo)，w: 工作区。在 a、w 之间来回做 k 步，有效行每步向内收缩一行；
+    # 贴着物理边界 (top / bottom) 的一侧不收缩。k 为奇数时结果在 w，偶数时在 a
+    for s in range(1, k + 1):
+        ys = 1 if top else s
+        ye = h - 1 if bottom else h - s
+        if s % 2 == 1:
+            for y in prange(ys, ye):
+                _tile_sweep(w, a, b, dx2, dy2, div_term, 0, 0, y, y + 1, 1, nx - 1)
+        else:
+            for y in prange(ys, ye):
+                _tile_sweep(a, w, b, dx2, dy2, div_term, 0, 0, y, y + 1, 1, nx - 1)
+
+def _kernel_signatures(dtype=np.float32):
+    ft = numba.from_dtype(np.dtype(dtype))
+    arr, i8 = ft[:, ::1], types.int64
+    return {poisson_band_sweeps: [(arr, arr, arr, ft, ft, ft, i8, i8, i8, types.boolean, types.boolean)]}
+
+def compile_kernels():
+    """按显式签名编译 (或从磁盘缓存加载) 带核和收敛检查用的归约核，返回耗时 (秒)。"""
+    import poisson_cpu_parallel
+    t0 = time.perf_counter()
+    for kernel, sigs in _kernel_signatures().items():
+        for sig in sigs:
+            kernel.compile(sig)
+    poisson_cpu_parallel.compile_kernels((np.float32,))
+    return time.perf_counter() - t0
+
+def band_rows_for(nx, ny, k, mem_bytes=None, itemsize=4):
+    """按内存预算选带高 (内部行数)：BAND_BUFFERS 份 (带高 + 2k) 行放得下，且不小于 k，不超过内部行数。"""
+    if mem_bytes is None:
+        avail = mem_model.available_host_bytes()
+        mem_bytes = MAX_BAND_BYTES if avail != avail else min(MEM_FRACTION * avail, MAX_BAND_BYTES)
+    rows = int(mem_bytes // (BAND_BUFFERS * nx * itemsize)) - 2 * k
+    return max(min(rows, ny - 2), k, 1)
+
+def _create(path, shape, dtype, fill=None):
+    # w+ 用 ftruncate 建稀疏文件，全 0 的场不占磁盘写入
+    mm = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+    if fill is not None:
+        for y0 in range(0, shape[0], 1024):
+            mm[y0:y0 + 1024] = fill[y0:y0 + 1024]
+    return mm
+
+def _check_disk(workdir, need):
+    free = shutil.disk_usage(workdir).free
+    # 稀疏文件在写入时才分配，磁盘写满时 memmap 的写入是 SIGBUS，所以先检查
+    if need > free:
+        raise OSError(errno.ENOSPC, f"Out-of-core solve needs {need / 1e9:.2f} GB in {workdir}, "
+                                    f"{free / 1e9:.2f} GB free")
+
+def _load(src, b, slot, lo, hi, top, bottom):
+    a, w, bb = slot
+    h = hi - lo
+    with tracing.span("load", rows=h):
+        a[:h] = src[lo:hi]
+        bb[:h] = b[lo:hi]
+        # 工作区里不被更新、但会被读到的值：左右边界列，贴着物理边界时的首末行
+        w[:h, 0] = a[:h, 0]
+        w[:h, -1] = a[:h, -1]
+        if top:
+            w[0] = a[0]
+        if bottom:
+            w[h - 1] = a[h - 1]
+
+def _store(dst, y0, y1, res, r0, r1):
+    with tracing.span("store", rows=y1 - y0):
+        dst[y0:y1] = res[r0:r1]
+
+@tracing.traced
+def solve_ooc(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, time_block=8,
+              band_rows=None, mem_bytes=None, workdir=None, history=None, initial_guess=None, checkpoint=None,
+              resume=None, snapshots=None):
+    """
+    time_block: 每遍在内存里连做几步 (k)。磁盘流量约为每 k 步 3 个整场；带的 halo 重复计算约占 2k / 带高。
+    band_rows: 带高 (内部行数)；默认按 mem_bytes (默认可用内存的 MEM_FRACTION，最多 1 GB) 推算。
+    workdir: 放 memmap 文件的目录；默认临时目录，算完即删 (见模块注释)。
+    initial_guess: (ny, nx) 初值，可以本身就是 memmap；默认全 0。
+    history 若传入 list，每次收敛检查追加 (it, max|Δp|, None)。收敛只能在遍与遍之间检查，
+    max|Δp| 是每遍最后一步的更新量，与 solve_cpu_auto 的逐步检查口径相同。
+    checkpoint= / resume=：同其它求解器，只在遍与遍之间写 (同步写，间隔按 budget 自动加大)。
+    snapshots= 不支持 (ValueError)。
+    返回的场是 np.memmap。
+    """
+    if snapshots is not None:
+        raise ValueError("solve_ooc does not support snapshots: the writer buffers whole frames in memory")
+    compile_kernels()
+    k = max(int(time_block), 1)
+    dtype = np.float32
+    itemsize = np.dtype(dtype).itemsize
+    band_rows = band_rows or band_rows_for(nx, ny, k, mem_bytes, itemsize)
+
+    xmin, xmax = config.X_MIN, config.X_MAX
+    ymin, ymax = config.Y_MIN, config.Y_MAX
+    dx = np.float32((xmax - xmin) / (nx - 1))
+    dy = np.float32((ymax - ymin) / (ny - 1))
+    dx2 = dx * dx
+    dy2 = dy * dy
+    div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix="poisson_ooc_")
+    os.makedirs(workdir, exist_ok=True)
+    _check_disk(workdir, 3 * nx * ny * itemsize)
+    if checkpoint and not os.path.exists(checkpoint):
+        # 检查点文件同样是稀疏的 memmap (两个槽位)
+        _check_disk(os.path.dirname(os.path.abspath(checkpoint)), 2 * nx * ny * itemsize)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, dtype, staging=False)
+    paths = [os.path.join(workdir, name) for name in ("p.bin", "pd.bin", "b.bin")]
+    p = _create(paths[0], (ny, nx), dtype, initial_guess)
+    pd = _create(paths[1], (ny, nx), dtype, initial_guess)
+    b = _create(paths[2], (ny, nx), dtype)
+    b[int(ny / 4), int(nx / 4)] = 100.0
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    if not keep:
+        for path in paths:
+            os.remove(path)
+        os.rmdir(workdir)
+
+    rows = band_rows + 2 * k
+    slots = [tuple(np.empty((rows, nx), dtype=dtype) for _ in range(3)) for _ in range(2)]
+    bands = [(y0, min(y0 + band_rows, ny - 1)) for y0 in range(1, ny - 1, band_rows)]
+    part_max = reduction_buffers(nx, rows)[0]
+
+    start_time = time.time()
+    final_it = max_iter
+    it = start
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ooc-io") as io:
+        while it < max_iter:
+            steps = min(k, max_iter - it)
+            pd, p = p, pd
+            # 与 _solve_time_blocked 一样只能在遍边界上检查：这一遍跨过 CHECK_INTERVAL 的整数倍时 (以及第一遍)
+            crossed = it == start or it // config.CHECK_INTERVAL != (it + steps) // config.CHECK_INTERVAL
+            check = (not config.BENCHMARK_MODE) and crossed
+            error = 0.0
+            stores = []
+            extent = [(max(y0 - steps, 0), min(y1 + steps, ny)) for y0, y1 in bands]
+            lo, hi = extent[0]
+            pending = io.submit(_load, pd, b, slots[0], lo, hi, lo == 0, hi == ny)
+            for i, (y0, y1) in enumerate(bands):
+                a, w, bb = slots[i % 2]
+                lo, hi = extent[i]
+                pending.result()
+                # 预取下一条带到另一组缓冲区 (排在那组上一次写回之后)
+                if i + 1 < len(bands):
+                    nlo, nhi = extent[i + 1]
+                    pending = io.submit(_load, pd, b, slots[(i + 1) % 2], nlo, nhi, nlo == 0, nhi == ny)
+                h = hi - lo
+                with tracing.span("stencil", steps=steps):
+                    poisson_band_sweeps(a[:h], w[:h], bb[:h], dx2, dy2, div_term, nx, h, steps, lo == 0, hi == ny)
+                res, prev = (w, a) if steps % 2 == 1 else (a, w)
+                r0, r1 = y0 - lo, y1 - lo
+                if check:
+                    with tracing.span("check"):
+                        error = max(error, max_abs_diff(res[r0:r1], prev[r0:r1], part_max))
+                stores.append(io.submit(_store, p, y0, y1, res, r0, r1))
+            for f in stores:
+                f.result()
+            it += steps
+            if ckpt is not None and ckpt.due(it - 1):
+                ckpt.save(p, it)
+
+            if check:
+                if history is not None:
+                    history.append((it, error, None))
+                if error < tol:
+                    final_it = it
+                    break
+
+    total_time = time.time() - start_time
+    if ckpt is not None and final_it < max_iter:
+        # 收敛时存这一遍之前的场 (pd，已完成 final_it - steps 步)：续算重做同一遍、在同一处判定收敛，结果逐位相同
+        ckpt.close(pd, final_it - steps)
+    elif ckpt is not None:
+        ckpt.close(p, final_it)
+    return None, None, p, final_it, total_time
+
+if __name__ == "__main__":
+    # 用法: python poisson_ooc.py 网格大小 [k] [内存预算 MB] [工作目录]
+    import sys
+    config.BENCHMARK_MODE = False
+    n = int(sys.argv[1])
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    mem = float(sys.argv[3]) * 1e6 if len(sys.argv) > 3 else None
+    workdir = sys.argv[4] if len(sys.argv) > 4 else None
+    rows = band_rows_for(n, n, k, mem)
+    print(f"{n}x{n}: {3 * n * n * 4 / 1e9:.2f} GB on disk, bands of {rows} rows "
+          f"({BAND_BUFFERS * (rows + 2 * k) * n * 4 / 1e6:.1f} MB in memory), k={k}")
+    _, _, p, iters, t = solve_ooc(nx=n, ny=n, time_block=k, band_rows=rows, workdir=workdir)
+    print(f"{iters} iterations in {t:.2f} s, {n * n * iters / (t * 1e9):.3f} GUPS")
@@ -2,8 +2,15 @@ import torch
 import numpy as np
 import time
 import config
+import tracing
+import checkpoint as ckpt_io
+import sources
 
-def solve_pytorch(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE):
+@tracing.traced
+def solve_pytorch(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE, initial_guess=None,
+                  checkpoint=None, resume=None, snapshots=None, source=None):
+    # source: 源项 (见 sources.py)，默认两点源。点源时不分配 b，模板表达式少了 b 那一项，
+    # 源点用高级索引按带 b 的完整公式重算
     device = torch.device('cuda')
     xmin, xmax = config.X_MIN, config.X_MAX
     ymin, ymax = config.Y_MIN, config.Y_MAX
@@ -13,10 +20,19 @@ def solve_pytorch(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=conf
     # 使用 float32
     p = torch.zeros((ny, nx), device=device, dtype=torch.float32)
     p_old = torch.zeros((ny, nx), device=device, dtype=torch.float32)
-    b = torch.zeros((ny, nx), device=device, dtype=torch.float32)
-
-    b[int(ny / 4), int(nx / 4)] = 100.0
-    b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+    src = sources.as_source(source)
+    if src.sparse:
+        b_idx, b_val = src.points(nx, ny, np.float32)
+        ys = torch.as_tensor(b_idx[:, 0], device=device)
+        xs = torch.as_tensor(b_idx[:, 1], device=device)
+        b_val = torch.as_tensor(b_val, device=device)
+    else:
+        b = torch.as_tensor(src.dense(nx, ny, np.float32), device=device)
+    # 检查点：resume 时从保存的场和迭代数接着算 (见 checkpoint.py)
+    ckpt, initial_guess, start = ckpt_io.start(checkpoint, resume, (ny, nx), initial_guess, snapshots=snapshots)
+    if initial_guess is not None:
+        p.copy_(torch.as_tensor(initial_guess, dtype=torch.float32))
+        p_old.copy_(p)
 
     dx2 = dx**2
     dy2 = dy**2
@@ -25,25 +41,48 @@ def solve_pytorch(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=conf
     # 预热
     torch.cuda.synchronize()
 
+    # tracing 打开时每个 span 结束前同步，量到的是核的真实耗时
+    sync = torch.cuda.synchronize
+
+    def stencil(p, p_old):
+        # 只写内部点，边界 0 值固定在两个缓冲区里
+        if not src.sparse:
+            p[1:-1, 1:-1] = (((p_old[1:-1, 2:] + p_old[1:-1, :-2]) * dy2 +
+                              (p_old[2:, 1:-1] + p_old[:-2, 1:-1]) * dx2 -
+                              b[1:-1, 1:-1] * dx2 * dy2) * div_term)
+        else:
+            p[1:-1, 1:-1] = (((p_old[1:-1, 2:] + p_old[1:-1, :-2]) * dy2 +
+                              (p_old[2:, 1:-1] + p_old[:-2, 1:-1]) * dx2) * div_term)
+            if len(b_idx):
+                p[ys, xs] = (((p_old[ys, xs + 1] + p_old[ys, xs - 1]) * dy2 +
+                              (p_old[ys + 1, xs] + p_old[ys - 1, xs]) * dx2 -
+                              b_val * dx2 * dy2) * div_term)
+    # 每步一次的 span 在循环外包好，tracing 关掉时循环里不多任何东西
+    stencil = tracing.wrap(stencil, "stencil", sync=sync)
+
     start_time = time.time()
     final_it = 0
     
-    for it in range(max_iter):
-        p_old.copy_(p) # 原地拷贝，避免重新分配内存
-        
-        p[1:-1, 1:-1] = (((p_old[1:-1, 2:] + p_old[1:-1, :-2]) * dy2 +
-                          (p_old[2:, 1:-1] + p_old[:-2, 1:-1]) * dx2 -
-                          b[1:-1, 1:-1] * dx2 * dy2) * div_term)
-        
-        p[0, :], p[-1, :], p[:, 0], p[:, -1] = 0.0, 0.0, 0.0, 0.0
+    for it in range(start, max_iter):
+        p_old, p = p, p_old # 双缓冲交换，代替 p_old.copy_(p) 的整场拷贝
+        stencil(p, p_old)
         
         if not config.BENCHMARK_MODE and it % config.CHECK_INTERVAL == 0:
-            diff = torch.max(torch.abs(p - p_old)).item()
+            with tracing.span("check"):
+                diff = torch.max(torch.abs(p - p_old)).item()
             if diff < tol:
                 final_it = it
                 break
+        if ckpt is not None and ckpt.due(it):
+            ckpt.save(p, it + 1)
     else:
         final_it = max_iter
 
     torch.cuda.synchronize()
-    return None, None, p.cpu().numpy(), final_it, time.time() - start_time
\ No newline at end of file
+    total_time = time.time() - start_time
+    with tracing.span("copy"):
+        field = p.cpu().numpy()
+    if ckpt is not None:
+        # 收敛时存最后一步之前的场 (已完成 final_it 步)：续算重做这一步、在同一步判定收敛，结果逐位相同
+        ckpt.close(p_old if final_it < max_iter else field, final_it)
+    return None, None, field, final_it, total_time
\ No newline at end of file
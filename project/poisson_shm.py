@@ -0,0 +1,263 @@
+import numpy as np
+import time
+import os
+import glob
+import config
+import tracing
+import checkpoint as ckpt_io
+import multiprocessing as mp
+from multiprocessing import shared_memory, connection
+import threading
+from numba import njit, types
+
+# 不依赖 mpi4py 的多进程后端：p / pd / b 放在 multiprocessing.shared_memory 里，
+# 每个 worker 进程绑定到一组核 (或一个 NUMA 节点)，负责一条水平 slab，每步之后用 Barrier 同步。
+# 相邻 slab 的边界行直接在共享缓冲区里读，没有 halo 拷贝，也没有 pickle：
+# 传给子进程的只有共享内存的名字、形状和 slab 范围。
+# 每个进程内部是单线程核，不再依赖 Numba 线程池跨 socket 调度。
+
+@njit(cache=True)
+def slab_sweep(p, pd, b, dx2, dy2, div_term, ys, ye, nx):
+    for y in range(ys, ye):
+        # 从 0 开始的行视图，内层循环才能向量化
+        d = p[y, 1:]
+        s0 = pd[y, :]
+        sn = pd[y + 1, 1:]
+        ss = pd[y - 1, 1:]
+        bb = b[y, 1:]
+        for j in range(nx - 2):
+            d[j] = (((s0[j + 2] + s0[j]) * dy2 +
+                     (sn[j] + ss[j]) * dx2 -
+                     bb[j] * dx2 * dy2) * div_term)
+
+@njit(cache=True)
+def slab_max_diff(p, pd, ys, ye):
+    err = 0.0
+    for y in range(ys, ye):
+        for x in range(p.shape[1]):
+            err = max(err, abs(p[y, x] - pd[y, x]))
+    return err
+
+def compile_kernels():
+    """按显式签名编译 (或从缓存加载) slab 核，返回耗时 (秒)。"""
+    t0 = time.perf_counter()
+    arr, f4, i8 = types.float32[:, ::1], types.float32, types.int64
+    slab_sweep.compile((arr, arr, arr, f4, f4, f4, i8, i8, i8))
+    slab_max_diff.compile((arr, arr, i8, i8))
+    return time.perf_counter() - t0
+
+def numa_cpu_sets():
+    """按 NUMA 节点分组的 CPU 集合 (只保留本进程允许使用的核)；读不到拓扑时整机算一个节点。"""
+    allowed = os.sched_getaffinity(0)
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist"),
+                       key=lambda s: int(s.split("node")[-1].split("/")[0])):
+        cpus = set()
+        with open(path) as f:
+            for part in f.read().strip().split(","):
+                if part:
+                    lo, _, hi = part.partition("-")
+                    cpus.update(range(int(lo), int(hi or lo) + 1))
+        if cpus & allowed:
+            nodes.append(sorted(cpus & allowed))
+    return nodes or [sorted(allowed)]
+
+def worker_cpu_sets(workers, affinity="core"):
+    """
+    每个 worker 的 CPU 集合。affinity="core"：可用核按编号连续均分；
+    "numa"：worker 轮流分到各 NUMA 节点，绑定整个节点；None：不绑定。
+    """
+    if affinity is None or not hasattr(os, "sched_setaffinity"):
+        return [None] * workers
+    if affinity == "numa":
+        nodes = numa_cpu_sets()
+        return [nodes[w % len(nodes)] for w in range(workers)]
+    if affinity == "core":
+        cpus = sorted(os.sched_getaffinity(0))
+        return [cpus[(w * len(cpus)) // workers:max((w + 1) * len(cpus) // workers,
+                                                    (w * len(cpus)) // workers + 1)]
+                for w in range(workers)]
+    raise ValueError(f"Unknown affinity '{affinity}', expected 'core', 'numa' or None")
+
+def slab_range(n_rows, workers, w):
+    """内部行 [1, ny-1) 尽量均匀地分给 workers 个进程，前 n_rows % workers 个多 1 行。"""
+    base, extra = divmod(n_rows, workers)
+    lo = 1 + w * base + min(w, extra)
+    return lo, lo + base + (1 if w < extra else 0)
+
+# stats 每行：compute 秒, barrier 等待秒, 最近一次检查的 max|Δp|, 结束时的迭代号
+_COMPUTE, _WAIT, _DIFF, _ITER = range(4)
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _worker(w, workers, names, nx, ny, ys, ye, cpus, max_iter, tol, benchmark, check_interval,
+            step_barrier, sync_barrier, start=0, checkpoint=None):
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+    handles = [_attach(names[k], (ny, nx), np.float32) for k in ("p", "pd", "b")]
+    stats_shm, stats = _attach(names["stats"], (workers, 4), np.float64)
+    (_, p), (_, pd), (_, b) = handles
+    try:
+        dx = np.float32((config.X_MAX - config.X_MIN) / (nx - 1))
+        dy = np.float32((config.Y_MAX - config.Y_MIN) / (ny - 1))
+        dx2 = dx * dx
+        dy2 = dy * dy
+        div_term = np.float32(1.0 / (2.0 * (dx2 + dy2)))
+        # 新进程第一次调用时从磁盘缓存加载，不计入求解时间
+        slab_sweep(pd, p, b, dx2, dy2, div_term, ys, ys, nx)
+        slab_max_diff(p, pd, ys, ys)
+
+        # worker 0 负责检查点：步间 Barrier 之后刚写完的缓冲区要到再下一步才会被覆盖，
+        # 而其它 worker 要越过下一个 Barrier 必须等它，所以这时拷整场是安全的
+        ckpt = ckpt_io.Checkpointer(checkpoint, (ny, nx)) if (checkpoint and w == 0) else None
+        compute = wait = 0.0
+        final_it = max_iter
+        sweep = tracing.wrap(slab_sweep, "stencil")
+        barrier = tracing.wrap(step_barrier.wait, "barrier")
+        sync_barrier.wait()
+        for it in range(start, max_iter):
+            pd, p = p, pd
+            t0 = time.perf_counter()
+            sweep(p, pd, b, dx2, dy2, div_term, ys, ye, nx)
+            t1 = time.perf_counter()
+            # 下一步要读邻居 slab 这一步刚写的边界行
+            barrier()
+            compute += t1 - t0
+            wait += time.perf_counter() - t1
+            if (not benchmark) and (it % check_interval == 0):
+                with tracing.span("check"):
+                    stats[w, _DIFF] = slab_max_diff(p, pd, ys, ye)
+                    step_barrier.wait()
+                # 所有 worker 读同一组数，决定一致；下次写入前至少还隔着一次扫描后的 Barrier
+                if stats[:, _DIFF].max() < tol:
+                    final_it = it
+                    break
+            if ckpt is not None and ckpt.due(it):
+                ckpt.save(p, it + 1)
+        # 最后一次由主进程在计时之外写
+        if ckpt is not None:
+            ckpt.close()
+        stats[w, _COMPUTE] = compute
+        stats[w, _WAIT] = wait
+        stats[w, _ITER] = final_it
+        sync_barrier.wait()
+    except BaseException:
+        # 一个 worker 出错时让其它进程 (包括主进程) 从 Barrier 上退出，而不是一直挂着
+        step_barrier.abort()
+        sync_barrier.abort()
+        raise
+    finally:
+        del p, pd, b, stats
+        for shm, _ in handles:
+            shm.close()
+        stats_shm.close()
+        # multiprocessing 的子进程不跑 atexit，trace 在这里写 (每个 worker 一个文件)
+        if tracing.ENABLED:
+            tracing.write(tracing.output_path(f"shm{w}"))
+
+def _watch(procs, barriers):
+    # worker 没走到 except 就退出 (启动失败、被信号杀掉) 时，主进程不能一直等在 Barrier 上
+    pending = {proc.sentinel: proc for proc in procs}
+    while pending:
+        for sentinel in connection.wait(list(pending)):
+            # sentinel 可读时进程可能还没被回收，join 之后 exitcode 才可靠
+            proc = pending.pop(sentinel)
+            proc.join()
+            if proc.exitcode != 0:
+                for barrier in barriers:
+                    barrier.abort()
+                return
+
+@tracing.traced
+def solve_shm(nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER, tol=config.TOLERANCE,
+              workers=None, affinity="core", start_method=None, timings=None, initial_guess=None,
+              checkpoint=None, resume=None):
+    """
+    共享内存多进程 Jacobi，结果与 solve_cpu_auto 逐位一致。
+    workers: 进程数，默认等于可用核数 (不超过内部行数)。
+    affinity: "core" 每个 worker 绑定一组连续的核，"numa" 绑定整个 NUMA 节点，None 不绑定。
+    start_method: multiprocessing 启动方式，默认 forkserver (没有时用 spawn)。
+        不默认 fork：进程里跑过 prange (TBB 线程层) 之后再 fork，主进程退出时会卡住。
+    timings 若传入 list，每个 worker 追加一个 dict：worker, rows, cpus, compute, wait (秒)。
+    checkpoint / resume: 见 checkpoint.py；运行中由 worker 0 写，结束时主进程写最终结果。
+    返回的时间是主进程看到的墙钟时间，不含进程启动和 JIT。
+    """
+    workers = min(workers or len(os.sched_getaffinity(0)), ny - 2)
+    cpu_sets = worker_cpu_sets(workers, affinity)
+    start_method = start_method or ("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    ctx = mp.get_context(start_method)
+    if start_method == "forkserver":
+        # fork server 里先导入本模块 (和 Numba 缓存)，之后每个 worker 从它 fork，不用各自再导入
+        ctx.set_forkserver_preload([__name__])
+    compile_kernels()
+    # 只在这里读检查点；写入由 worker 0 负责
+    _, initial_guess, start = ckpt_io.start(None, checkpoint if resume is True else resume, (ny, nx), initial_guess)
+
+    nbytes = ny * nx * np.dtype(np.float32).itemsize
+    blocks = {k: shared_memory.SharedMemory(create=True, size=nbytes) for k in ("p", "pd", "b")}
+    blocks["stats"] = shared_memory.SharedMemory(create=True, size=workers * 4 * 8)
+    procs = []
+    # 共享内存上的数组视图；close 之前必须全部释放
+    views = {k: np.ndarray((ny, nx), dtype=np.float32, buffer=blocks[k].buf) for k in ("p", "pd", "b")}
+    views["stats"] = np.ndarray((workers, 4), dtype=np.float64, buffer=blocks["stats"].buf)
+    try:
+        # 新建的共享内存由系统清零
+        p, pd, b, stats = views["p"], views["pd"], views["b"], views["stats"]
+        b[int(ny / 4), int(nx / 4)] = 100.0
+        b[int(3 * ny / 4), int(3 * nx / 4)] = -100.0
+        if initial_guess is not None:
+            p[:] = initial_guess
+            pd[:] = initial_guess
+
+        names = {k: shm.name for k, shm in blocks.items()}
+        step_barrier = ctx.Barrier(workers)
+        sync_barrier = ctx.Barrier(workers + 1)
+        slabs = [slab_range(ny - 2, workers, w) for w in range(workers)]
+        for w, (ys, ye) in enumerate(slabs):
+            proc = ctx.Process(target=_worker, daemon=True,
+                               args=(w, workers, names, nx, ny, ys, ye, cpu_sets[w], max_iter, tol,
+                                     config.BENCHMARK_MODE, config.CHECK_INTERVAL,
+                                     step_barrier, sync_barrier, start, checkpoint))
+            proc.start()
+            procs.append(proc)
+        threading.Thread(target=_watch, args=(procs, (step_barrier, sync_barrier)), daemon=True).start()
+
+        try:
+            with tracing.span("startup"):
+                sync_barrier.wait()
+            start_time = time.time()
+            with tracing.span("solve wait", workers=workers):
+                sync_barrier.wait()
+            total_time = time.time() - start_time
+        except threading.BrokenBarrierError:
+            raise RuntimeError("A shared-memory worker failed, see its traceback above") from None
+
+        final_it = int(stats[0, _ITER])
+        # 每个 worker 做了同样多次交换：奇数步最后写的是 pd 块，偶数步是 p 块
+        steps = (max_iter if final_it == max_iter else final_it + 1) - start
+        with tracing.span("copy"):
+            field = (pd if steps % 2 == 1 else p).copy()
+            # 收敛时检查点存最后一步之前的场 (另一块缓冲区，已完成 final_it 步)：续算重做这一步、在同一步判定收敛
+            prev = (p if steps % 2 == 1 else pd).copy() if (checkpoint and final_it < max_iter) else None
+        if timings is not None:
+            for w, (ys, ye) in enumerate(slabs):
+                timings.append({"worker": w, "rows": ye - ys, "cpus": cpu_sets[w],
+                                "compute": float(stats[w, _COMPUTE]), "wait": float(stats[w, _WAIT])})
+    finally:
+        p = pd = b = stats = None
+        views.clear()
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    if checkpoint:
+        ckpt_io.Checkpointer(checkpoint, (ny, nx)).close(field if prev is None else prev, final_it)
+    return (np.linspace(config.X_MIN, config.X_MAX, nx),
+            np.linspace(config.Y_MIN, config.Y_MAX, ny),
+            field, final_it, total_time)
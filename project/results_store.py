@@ -0,0 +1,328 @@
+import os
+import sys
+import glob
+import json
+from contextlib import contextmanager
+import numpy as np
+from log_parsers import parse_file
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有 flock，只支持单写入者
+    fcntl = None
+
+# 只追加的列式结果库：一个目录，每列一个文件。
+#   <列>.col   数值列：原始 little-endian 数组 (i8 / f8)；字符串列：int32 字典编码
+#   <列>.dict  字符串列的取值表，每行一个 JSON 字符串，编码 = 行号 (也只追加)
+#   _rows      已提交的行数。先写各列，最后原子地替换 _rows，中途崩溃多写的尾巴下次追加前截掉
+#   _retired   作废的行号 (<i8，只追加)：查询时跳过。log / CSV 改过之后旧的行作废、整个文件重新导入
+#   _sources.json  导入过的文件 {文件名: [大小, mtime_ns]}，ingest 用它判断文件是否改过
+# 查询时只读需要的列 (np.fromfile)，字符串过滤先转成编码再比较整数，几千上万条记录也只是几次数组运算。
+# 追加时对 _lock 加 flock，Slurm array 的多个任务可以写同一个库。
+
+COLUMNS = {
+    "source": "str",      # 来源：log 文件名、CSV 文件名或 bench_suite:<run_id>
+    "run_id": "str",      # Slurm job id、suite 运行 id 或手工数据集名
+    "backend": "str",     # solvers.BACKENDS 里的名字 (旧 log 按对应关系映射)
+    "label": "str",       # 图例名 / 变体 (如 halo 模式)
+    "host": "str",
+    "mode": "str",        # "converge" 动态容差 / "fixed" 固定步数
+    "status": "str",      # Converged / Max Iter / estimate ...
+    "nx": "i8",
+    "ny": "i8",
+    "threads": "i8",
+    "ranks": "i8",
+    "iterations": "i8",
+    "tol": "f8",
+    "time": "f8",         # 秒 (suite 记录是重复测量的中位数)
+    "time_iqr": "f8",
+    "gups": "f8",
+    "efficiency": "f8",   # 弱扩展效率 (%)
+    "bandwidth": "f8",    # 访存模型换算的实际带宽 (GB/s)
+    "pct_peak": "f8",     # 占可达带宽的百分比
+    "peak_mem": "f8",     # 内存峰值 (MB，tracemalloc + 显存分配器)
+    "peak_rss": "f8",     # 驻留内存峰值 (MB)
+    "bytes_per_cell": "f8",
+    "timestamp": "f8",
+}
+MISSING = {"i8": -1, "f8": np.nan}
+_DTYPES = {"str": np.dtype("<i4"), "i8": np.dtype("<i8"), "f8": np.dtype("<f8")}
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+class ResultsStore:
+    """只追加的列式结果库。append 接受任意 dict 可迭代对象 (可以是解析器生成器)，按块写入。"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._dicts = {}
+        self._codes = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def rows(self):
+        try:
+            with open(self._file("_rows")) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _load_dict(self, col):
+        # 其它进程可能追加过新值，只读新增的部分
+        values = self._dicts.setdefault(col, [])
+        codes = self._codes.setdefault(col, {})
+        try:
+            with open(self._file(f"{col}.dict")) as f:
+                for i, line in enumerate(f):
+                    if i >= len(values):
+                        values.append(json.loads(line))
+                        codes[values[-1]] = i
+        except FileNotFoundError:
+            pass
+        return values, codes
+
+    def _encode(self, rec, col, kind, new_values):
+        v = rec.get(col)
+        if kind == "str":
+            v = "" if v is None else str(v)
+        elif v is None or v == "":
+            return MISSING[kind]
+        if kind == "i8":
+            return int(float(v))
+        if kind == "f8":
+            return float(v)
+        codes = self._codes[col]
+        if v not in codes:
+            codes[v] = len(self._dicts[col])
+            self._dicts[col].append(v)
+            new_values.setdefault(col, []).append(v)
+        return codes[v]
+
+    def append(self, records, chunk=4096):
+        """追加记录，返回条数。缺失的列填 MISSING；不认识的键忽略。"""
+        total = 0
+        batch = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= chunk:
+                total += self._append_batch(batch)
+                batch = []
+        if batch:
+            total += self._append_batch(batch)
+        return total
+
+    @contextmanager
+    def _locked(self):
+        lock = open(self._file("_lock"), "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def _append_batch(self, batch):
+        with self._locked():
+            n = self.rows()
+            for col, kind in COLUMNS.items():
+                if kind == "str":
+                    self._load_dict(col)
+            new_values = {}
+            arrays = {col: np.array([self._encode(r, col, kind, new_values) for r in batch],
+                                    dtype=_DTYPES[kind])
+                      for col, kind in COLUMNS.items()}
+            for col, values in new_values.items():
+                with open(self._file(f"{col}.dict"), "a") as f:
+                    f.writelines(json.dumps(v) + "\n" for v in values)
+            for col, arr in arrays.items():
+                with open(self._file(f"{col}.col"), "ab") as f:
+                    # 截掉上次崩溃留下的未提交尾巴；后来新增的列先为已有的行补上缺失值
+                    have = f.tell() // arr.itemsize
+                    if have > n:
+                        f.truncate(n * arr.itemsize)
+                    elif have < n:
+                        f.write(self._missing(col, n - have).tobytes())
+                    f.write(arr.tobytes())
+            tmp = self._file("_rows.tmp")
+            with open(tmp, "w") as f:
+                f.write(str(n + len(batch)))
+            os.replace(tmp, self._file("_rows"))
+        return len(batch)
+
+    def retired(self):
+        """作废的行号 (retire 登记的)。"""
+        try:
+            with open(self._file("_retired"), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        # 写到一半崩溃留下的半条记录不算
+        return np.frombuffer(raw[:len(raw) // 8 * 8], dtype="<i8")
+
+    def retire(self, **filters):
+        """把满足 filters 的有效行标为作废 (不删数据，查询时跳过)，返回条数。"""
+        with self._locked():
+            rows = np.flatnonzero(self._mask(filters)).astype("<i8")
+            with open(self._file("_retired"), "ab") as f:
+                f.write(rows.tobytes())
+        return len(rows)
+
+    def sources(self):
+        """导入过的文件：{文件名: [大小, mtime_ns]}。"""
+        try:
+            with open(self._file("_sources.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_source(self, name, key):
+        with self._locked():
+            manifest = self.sources()
+            manifest[name] = key
+            tmp = self._file("_sources.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._file("_sources.json"))
+
+    def _missing(self, col, count):
+        # 字符串列的缺失值是 ""；还不在取值表里时先登记 (调用方持有 _lock，或只在读路径上用数值列)
+        kind = COLUMNS[col]
+        if kind != "str":
+            return np.full(count, MISSING[kind], dtype=_DTYPES[kind])
+        self._load_dict(col)
+        new_values = {}
+        code = self._encode({}, col, kind, new_values)
+        for values in new_values.values():
+            with open(self._file(f"{col}.dict"), "a") as f:
+                f.writelines(json.dumps(v) + "\n" for v in values)
+        return np.full(count, code, dtype=_DTYPES[kind])
+
+    def column(self, col, decode=True):
+        kind = COLUMNS[col]
+        n = self.rows()
+        try:
+            arr = np.fromfile(self._file(f"{col}.col"), dtype=_DTYPES[kind], count=n)
+        except FileNotFoundError:
+            arr = np.zeros(0, dtype=_DTYPES[kind])
+        if len(arr) < n and kind != "str":
+            # 库建好之后才加进 COLUMNS 的列，下次追加前旧行都是缺失值
+            arr = np.concatenate([arr, self._missing(col, n - len(arr))])
+        if kind == "str" and decode:
+            values, _ = self._load_dict(col)
+            return np.array(values, dtype=object)[arr] if len(arr) else np.zeros(0, dtype=object)
+        return arr
+
+    def distinct(self, col):
+        """字符串列在有效行里出现过的所有取值 (没有作废行时只读取值表，不扫描整列)。"""
+        if not len(self.retired()):
+            return set(self._load_dict(col)[0])
+        return set(self.query(columns=[col])[col])
+
+    def _mask(self, filters):
+        n = self.rows()
+        mask = np.ones(n, dtype=bool)
+        retired = self.retired()
+        mask[retired[retired < n]] = False
+        for col, want in filters.items():
+            kind = COLUMNS[col]
+            if kind == "str":
+                codes = self.column(col, decode=False)
+                values, table = self._load_dict(col)
+                if callable(want):
+                    mask &= np.array([bool(want(v)) for v in values], dtype=bool)[codes]
+                    continue
+                wanted = [want] if isinstance(want, str) else list(want)
+                mask &= np.isin(codes, [table[v] for v in wanted if v in table])
+            else:
+                arr = self.column(col)
+                if callable(want):
+                    mask &= want(arr)
+                elif np.isscalar(want):
+                    mask &= arr == want
+                else:
+                    mask &= np.isin(arr, list(want))
+        return mask
+
+    def query(self, columns=None, **filters):
+        """
+        按列过滤，返回 {列名: 数组}。过滤值可以是单个值、值的列表/集合，或作用在取值上的函数：
+            store.query(backend="cupy", nx=[1024, 2048])
+            store.query(gups=lambda g: g > 10)
+        columns 只取需要的列 (默认全部)。
+        """
+        mask = self._mask(filters)
+        return {col: self.column(col)[mask] for col in (columns or COLUMNS)}
+
+    def series(self, x="nx", y="time", agg=np.median, **filters):
+        """
+        画图用：满足 filters 的记录按 x 分组，每组的 y 用 agg 合并 (默认中位数，同一配置跑了多次也只出一个点)。
+        返回按 x 排序的 (xs, ys) 两个数组；y 缺失 (NaN) 的记录不参与。
+        """
+        data = self.query(columns=[x, y], **filters)
+        xs, ys = data[x], data[y].astype(np.float64)
+        keep = ~np.isnan(ys)
+        xs, ys = xs[keep], ys[keep]
+        ux = np.unique(xs)
+        return ux, np.array([agg(ys[xs == v]) for v in ux])
+
+    def value(self, y, agg=np.median, **filters):
+        """满足 filters 的记录里 y 的合并值 (单个数)，没有记录时为 NaN。"""
+        ys = self.query(columns=[y], **filters)[y].astype(np.float64)
+        ys = ys[~np.isnan(ys)]
+        return float(agg(ys)) if len(ys) else float("nan")
+
+def ingest(store, paths, verbose=False):
+    """
+    把 log / CSV 文件追加进库，可以反复调用。返回新增条数。
+    文件按 (文件名, 大小, mtime) 识别：没变的跳过；改过的 (手工改了 CSV、作业还在写的 log) 先作废
+    这个 source 以前的行，再整个重新导入。
+    """
+    seen = set(store._load_dict("source")[0])
+    manifest = store.sources()
+    total = 0
+    for path in paths:
+        name = os.path.basename(path)
+        st = os.stat(path)
+        key = [st.st_size, st.st_mtime_ns]
+        if manifest.get(name) == key:
+            continue
+        if name in seen:
+            store.retire(source=name)
+        n = store.append(parse_file(path))
+        store.record_source(name, key)
+        total += n
+        if verbose:
+            print(f"  {name}: {n} records")
+    return total
+
+def default_store(path=DEFAULT_PATH, log_dir=LOG_DIR):
+    """打开默认结果库，并增量导入 logs/ 下所有 .log 和手工录入的 CSV。画图脚本都从这里取数据。"""
+    store = ResultsStore(path)
+    ingest(store, sorted(glob.glob(os.path.join(log_dir, "*.log"))) +
+           sorted(glob.glob(os.path.join(log_dir, "*.csv"))))
+    return store
+
+if __name__ == "__main__":
+    # 用法: python results_store.py ingest logs/*.log results.csv ...
+    #       python results_store.py show [列=值 ...]
+    if len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        store = ResultsStore()
+        print(f"Ingested {ingest(store, sys.argv[2:], verbose=True)} records into {store.path}")
+    else:
+        store = default_store()
+        filters = dict(arg.split("=", 1) for arg in sys.argv[2:])
+        for col, v in filters.items():
+            if COLUMNS[col] != "str":
+                filters[col] = float(v) if COLUMNS[col] == "f8" else int(v)
+        data = store.query(**filters)
+        cols = ["source", "backend", "label", "nx", "ny", "threads", "ranks", "iterations", "time", "gups"]
+        print(" | ".join(f"{c:^12}" for c in cols))
+        print("-" * (15 * len(cols)))
+        for i in range(len(data["nx"])):
+            print(" | ".join(f"{data[c][i]:^12.4g}" if COLUMNS[c] == "f8" else f"{str(data[c][i])[:12]:^12}"
+                             for c in cols))
@@ -20,6 +20,11 @@ export OMP_NUM_THREADS=16
 export OMP_PROC_BIND=true
 export OMP_PLACES=cores
 
-# 3. 运行
+# 3. Numba 磁盘缓存放在共享目录，先编译一次，之后每个任务只从缓存加载
+export NUMBA_CACHE_DIR=$HOME/.cache/numba_poisson
+mkdir -p $NUMBA_CACHE_DIR
+python -c "import poisson_cpu_parallel as m; print(f'Numba kernels ready in {m.compile_kernels():.2f}s')"
+
+# 4. 运行
 echo "Starting Numba Parallel (16 Threads)..."
 srun --cpu-bind=cores python -u benchmark_cpu_parallel.py
\ No newline at end of file
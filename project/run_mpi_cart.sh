@@ -0,0 +1,22 @@
+#!/bin/bash
+#SBATCH --job-name=mpi_cart_weak_scaling
+#SBATCH --account=C3SE2025-2-17
+#SBATCH --partition=vera
+#SBATCH --nodes=1
+#SBATCH --ntasks=8             # 分别测试 1 / 2 / 4 / 8
+#SBATCH --cpus-per-task=1
+#SBATCH --time=00:15:00
+#SBATCH --output=logs/mpi_cart_%j.log
+
+module purge
+module load GCC/12.3.0 OpenMPI/4.1.5 Python/3.11.3-GCCcore-12.3.0
+source "$HOME/venvs/poisson_venv/bin/activate"
+
+# 每个进程单线程，并行度全部来自 MPI
+export NUMBA_NUM_THREADS=1
+export NUMBA_CACHE_DIR=$HOME/.cache/numba_poisson
+
+echo "Starting 2D Cartesian Weak Scaling Experiment..."
+for n in 1 2 4 8; do
+    srun --ntasks=$n --cpu-bind=cores python -u benchmark_mpi.py cpu
+done
@@ -23,6 +23,8 @@ source $HOME/project/gpu_env/bin/activate
 export NUMBA_CUDA_USE_NVIDIA_BINDING=1
 unset CUDA_HOME
 unset NUMBA_CUDA_DIR
+# 编译好的 CUDA 核缓存到共享目录，重复提交时不再重新编译
+export NUMBA_CACHE_DIR=$HOME/.cache/numba_poisson
 
 # 4. 运行 Shared Memory Benchmark
 echo "Starting Numba Shared Memory Benchmark..."
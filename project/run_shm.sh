@@ -0,0 +1,29 @@
+#!/bin/bash
+#SBATCH --job-name=cpu_shm
+#SBATCH --account=C3SE2025-2-17
+#SBATCH --nodes=1
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task=64
+#SBATCH --time=00:30:00
+#SBATCH --partition=vera
+#SBATCH --constraint=ZEN4
+#SBATCH --output=logs/cpu/shm_%j.log
+
+# 1. 环境准备 (不需要 MPI 模块)
+module purge
+module load virtualenv/20.26.2-GCCcore-13.3.0 SciPy-bundle/2024.05-gfbf-2024a
+source $HOME/venvs/poisson_venv/bin/activate
+
+# 2. worker 数 = prange 对照的线程数；每个 worker 进程自己是单线程
+export NUMBA_NUM_THREADS=64
+export OMP_NUM_THREADS=1
+
+# 3. Numba 磁盘缓存放在共享目录，先编译一次，fork 出的 worker 直接继承
+export NUMBA_CACHE_DIR=$HOME/.cache/numba_poisson
+mkdir -p $NUMBA_CACHE_DIR logs/cpu
+python -c "import poisson_shm as m; print(f'Numba kernels ready in {m.compile_kernels():.2f}s')"
+
+# 4. 运行：按核绑定，再按 NUMA 节点绑定对比
+echo "Starting Shared-Memory Multiprocess (64 workers)..."
+srun --cpu-bind=none python -u benchmark_shm.py core
+srun --cpu-bind=none python -u benchmark_shm.py numa
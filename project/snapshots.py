@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import threading
+import numpy as np
+from checkpoint import _to_host
+
+# 场的时间序列快照：visualize.save_plot 和 pyPoisson 的 np.save 都只在最后同步写一次整场。
+#   SnapshotWriter：求解线程每 every 步把场拷进缓冲池里的一块 (GPU 后端在这一步拷回主机)，
+#     整块缓冲区本身经有界队列交给后台线程 (不再拷贝)，写完再还回池子；池子空了说明磁盘跟不上，
+#     默认阻塞等待 (背压)，block=False 时丢掉这一帧并计数
+#   磁盘格式 (一个目录，和 results_store 一样每类数据一个只追加的文件)：
+#     meta.json   形状、类型、tile 大小、压缩方式
+#     data.bin    各 tile 的 (压缩) 字节，按写入顺序拼接
+#     index.bin   每个 tile 一条 (frame, tile_y, tile_x, offset, nbytes)
+#     frames.bin  每帧一条 (frame, iteration, time)，整帧的 tile 都写完之后才追加，中途崩溃的半帧读不到
+#   SnapshotReader：只读 index 和 frames，reader[k] 读第 k 帧，reader[k, y0:y1, x0:x1] 只解压相交的 tile，
+#     4096^2 的帧也不用整帧读进来
+# 求解器通过 checkpoint.start(..., snapshots=writer) 接入，和检查点用同一个 due / save 钩子。
+
+INDEX_DTYPE = np.dtype([("frame", "<i8"), ("ty", "<i8"), ("tx", "<i8"), ("offset", "<i8"), ("nbytes", "<i8")])
+FRAME_DTYPE = np.dtype([("frame", "<i8"), ("iteration", "<i8"), ("time", "<f8")])
+CODECS = ("zlib", "none")
+
+class SnapshotWriter:
+    """
+    with SnapshotWriter("run.snap", every=500) as snaps:
+        solvers.solve("cpu_auto", ..., snapshots=snaps)
+    也可以直接 snaps.write(field, iteration)。形状在第一帧时确定，之后每帧必须相同。
+    tile: (ty, tx) 或单个整数；compress: "zlib" (level 1；Jacobi 场早期大片为 0，压缩比很高) 或 "none"。
+    后台压缩和写盘要占一个核：求解已经占满所有核时，every 不要设得太小。
+    queue_size: 队列里最多排几帧；缓冲池比它多一块 (正在写的那帧)。
+    """
+
+    def __init__(self, path, every=100, tile=256, compress="zlib", level=1, queue_size=2, block=True,
+                 dtype=np.float32):
+        if compress not in CODECS:
+            raise ValueError(f"Unknown compression '{compress}', expected one of {CODECS}")
+        self.path = path
+        self.every = every
+        self.tile = (tile, tile) if np.isscalar(tile) else tuple(tile)
+        self.compress = compress
+        self.level = level
+        self.block = block
+        self.dtype = np.dtype(dtype)
+        self.shape = None
+        self.frames = 0
+        self.dropped = 0
+        self.bytes_raw = 0
+        self.bytes_written = 0
+        self._queue_size = queue_size
+        self._last = None
+        self._next = None
+        self._error = None
+        os.makedirs(path, exist_ok=True)
+        # 追加到已有的快照目录 (例如续算)：帧号接着往下编
+        self._meta_file = os.path.join(path, "meta.json")
+        self._frame_no = 0
+        if os.path.exists(self._meta_file):
+            with open(self._meta_file) as f:
+                meta = json.load(f)
+            self.shape, self.tile = tuple(meta["shape"]), tuple(meta["tile"])
+            self.dtype, self.compress = np.dtype(meta["dtype"]), meta["codec"]
+            frames = _read_records(os.path.join(path, "frames.bin"), FRAME_DTYPE)
+            self._frame_no = int(frames["frame"].max()) + 1 if len(frames) else 0
+        self._thread = None
+
+    # ---- 求解器钩子 (与 checkpoint.Checkpointer 相同的接口) ----
+
+    def due(self, it):
+        """第 it 步 (从 0 计) 之后是否该写一帧：已完成的步数跨过 every 的下一个整数倍时。
+        只在批边界上检查的求解器 (GPU 批量发射、时间分块) 落在跨过之后的第一个边界上。"""
+        if self._next is None:
+            self._next = -(-(it + 1) // self.every) * self.every
+        return it + 1 >= self._next
+
+    def save(self, field, iteration):
+        self._next = (iteration // self.every + 1) * self.every
+        return self.write(field, iteration)
+
+    def finish(self, field=None, iteration=None):
+        """求解结束：最后一帧还没写过时补上，然后等队列写完 (文件保持打开，可以接着下一次求解)。"""
+        self._next = None
+        if field is not None and iteration != self._last:
+            self.write(field, iteration)
+        if self._thread is not None:
+            self._queue.join()
+        self._raise()
+
+    # ---- 写入 ----
+
+    def open(self, shape):
+        """确定帧形状、建缓冲池并启动后台线程；已经打开时只检查形状。write 第一次调用时自动打开。"""
+        if self._thread is not None:
+            if tuple(shape) != self.shape:
+                raise ValueError(f"Snapshot {self.path} holds {self.shape} frames, got {tuple(shape)}")
+            return
+        if self.shape is not None and tuple(shape) != self.shape:
+            raise ValueError(f"Snapshot {self.path} holds {self.shape} frames, got {tuple(shape)}")
+        self.shape = tuple(shape)
+        if not os.path.exists(self._meta_file):
+            with open(self._meta_file, "w") as f:
+                json.dump({"shape": list(self.shape), "dtype": self.dtype.str, "tile": list(self.tile),
+                           "codec": self.compress}, f)
+        self._data = open(os.path.join(self.path, "data.bin"), "ab")
+        self._index = open(os.path.join(self.path, "index.bin"), "ab")
+        self._frames = open(os.path.join(self.path, "frames.bin"), "ab")
+        self._free = queue.Queue()
+        for _ in range(self._queue_size + 1):
+            self._free.put(np.empty(self.shape, dtype=self.dtype))
+        self._queue = queue.Queue(maxsize=self._queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, field, iteration, timestamp=None):
+        """把 field 拷进池里的一块缓冲区并排队。block=False 且池子空时丢帧，返回 False。"""
+        self._raise()
+        if self._thread is None:
+            self.open(field.shape)
+        try:
+            buf = self._free.get(block=self.block)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        _to_host(buf, field)
+        self._last = iteration
+        self._queue.put((buf, self._frame_no, int(iteration), time.time() if timestamp is None else timestamp))
+        self._frame_no += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                buf, frame, iteration, stamp = item
+                if self._error is None:
+                    self._write_frame(buf, frame, iteration, stamp)
+                self._free.put(buf)
+            except BaseException as e:   # 下一次 write / finish 时在求解线程里抛出
+                self._error = e
+                self._free.put(item[0])
+            finally:
+                self._queue.task_done()
+
+    def _write_frame(self, buf, frame, iteration, stamp):
+        ty, tx = self.tile
+        ny, nx = self.shape
+        offset = self._data.tell()
+        records = []
+        for j, y0 in enumerate(range(0, ny, ty)):
+            for i, x0 in enumerate(range(0, nx, tx)):
+                raw = np.ascontiguousarray(buf[y0:y0 + ty, x0:x0 + tx])
+                payload = zlib.compress(raw, self.level) if self.compress == "zlib" else raw.tobytes()
+                self._data.write(payload)
+                records.append((frame, j, i, offset, len(payload)))
+                offset += len(payload)
+                self.bytes_raw += raw.nbytes
+                self.bytes_written += len(payload)
+        # 先落数据，再落索引，最后登记这一帧
+        self._data.flush()
+        self._index.write(np.array(records, dtype=INDEX_DTYPE).tobytes())
+        self._index.flush()
+        self._frames.write(np.array([(frame, iteration, stamp)], dtype=FRAME_DTYPE).tobytes())
+        self._frames.flush()
+        self.frames += 1
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        """写完队列里的帧并关闭文件。"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            for f in (self._data, self._index, self._frames):
+                f.close()
+        self._raise()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def report(self, file=sys.stderr):
+        ratio = self.bytes_raw / self.bytes_written if self.bytes_written else float("nan")
+        print(f"Snapshots {self.path}: {self.frames} frames, {self.dropped} dropped, "
+              f"{self.bytes_written / 1e6:.1f} MB on disk (x{ratio:.2f} compression)", file=file)
+
+def _read_records(path, dtype):
+    try:
+        return np.fromfile(path, dtype=dtype, count=os.path.getsize(path) // dtype.itemsize)
+    except FileNotFoundError:
+        return np.zeros(0, dtype=dtype)
+
+class SnapshotReader:
+    """
+    r = SnapshotReader("run.snap")
+    len(r), r.iterations, r.times           每帧的迭代数 / 写入时间
+    r[k]                                    第 k 帧整场 (k 可以为负)
+    r[k, y0:y1, x0:x1]                      只读相交的 tile
+    r.tile(k, j, i)                         第 j 行第 i 列的 tile
+    打开时只读 meta、index 和 frames；tile 数据用 pread 按需读取，可以在写入的同时读 (只看到已完成的帧)。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.shape = tuple(meta["shape"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.tile_shape = tuple(meta["tile"])
+        self.codec = meta["codec"]
+        self.ntiles = tuple(-(-n // t) for n, t in zip(self.shape, self.tile_shape))
+        self.refresh()
+        self._fd = os.open(os.path.join(path, "data.bin"), os.O_RDONLY)
+
+    def refresh(self):
+        """重新读索引 (写入方还在追加时调用)。"""
+        frames = _read_records(os.path.join(self.path, "frames.bin"), FRAME_DTYPE)
+        index = _read_records(os.path.join(self.path, "index.bin"), INDEX_DTYPE)
+        self.frame_ids = frames["frame"]
+        self.iterations = frames["iteration"]
+        self.times = frames["time"]
+        # (帧号, tile_y, tile_x) -> (offset, nbytes)；帧号不一定从 0 开始连续
+        pos = {f: k for k, f in enumerate(self.frame_ids.tolist())}
+        ny, nx = self.ntiles
+        self._offset = np.full((len(frames), ny, nx), -1, dtype=np.int64)
+        self._nbytes = np.zeros((len(frames), ny, nx), dtype=np.int64)
+        keep = np.array([f in pos for f in index["frame"].tolist()], dtype=bool)
+        index = index[keep]
+        k = np.array([pos[f] for f in index["frame"].tolist()], dtype=np.int64)
+        self._offset[k, index["ty"], index["tx"]] = index["offset"]
+        self._nbytes[k, index["ty"], index["tx"]] = index["nbytes"]
+
+    def __len__(self):
+        return len(self.iterations)
+
+    def _tile_extent(self, j, i):
+        ty, tx = self.tile_shape
+        return (min(ty, self.shape[0] - j * ty), min(tx, self.shape[1] - i * tx))
+
+    def tile(self, k, j, i):
+        """第 k 帧的 (j, i) 号 tile。"""
+        k = range(len(self))[k]
+        payload = os.pread(self._fd, int(self._nbytes[k, j, i]), int(self._offset[k, j, i]))
+        if self.codec == "zlib":
+            payload = zlib.decompress(payload)
+        return np.frombuffer(payload, dtype=self.dtype).reshape(self._tile_extent(j, i))
+
+    def region(self, k, ys=slice(None), xs=slice(None)):
+        """第 k 帧的 [ys, xs] 子区域 (步长为 1 的切片)，只读相交的 tile。"""
+        ty, tx = self.tile_shape
+        y0, y1, _ = ys.indices(self.shape[0])
+        x0, x1, _ = xs.indices(self.shape[1])
+        out = np.empty((max(y1 - y0, 0), max(x1 - x0, 0)), dtype=self.dtype)
+        for j in range(y0 // ty, -(-y1 // ty)):
+            for i in range(x0 // tx, -(-x1 // tx)):
+                t = self.tile(k, j, i)
+                gy0, gx0 = j * ty, i * tx
+                sy0, sy1 = max(y0, gy0), min(y1, gy0 + t.shape[0])
+                sx0, sx1 = max(x0, gx0), min(x1, gx0 + t.shape[1])
+                out[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = t[sy0 - gy0:sy1 - gy0, sx0 - gx0:sx1 - gx0]
+        return out
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            k, *rest = key
+            return self.region(k, *rest)
+        return self.region(key)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self):
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+if __name__ == "__main__":
+    # 用法: python snapshots.py 快照目录      列出各帧
+    with SnapshotReader(sys.argv[1]) as r:
+        on_disk = os.path.getsize(os.path.join(r.path, "data.bin"))
+        print(f"{r.path}: {len(r)} frames of {r.shape[0]}x{r.shape[1]} {r.dtype}, "
+              f"{r.tile_shape[0]}x{r.tile_shape[1]} tiles, codec {r.codec}, {on_disk / 1e6:.1f} MB")
+        print(f"{'Frame':^8} | {'Iteration':^10} | {'max|p|':^12}")
+        print("-" * 36)
+        for k in range(len(r)):
+            print(f"{k:^8} | {r.iterations[k]:^10} | {np.abs(r[k]).max():^12.5g}")
@@ -0,0 +1,180 @@
+# solvers.py
+# 统一求解入口：solve(backend=..., **params)
+# 各后端模块只在第一次用到时才 import，CPU 路径不再为 torch / cupy / numba.cuda 付导入时间。
+import importlib
+import time
+from dataclasses import dataclass, field
+import numpy as np
+import config
+import bandwidth as bw_model
+import memory as mem_model
+import sources
+
+@dataclass
+class SolveResult:
+    backend: str
+    field: np.ndarray
+    iterations: int
+    wall_time: float
+    compile_time: float = 0.0
+    gups: float = 0.0
+    # 按 bandwidth.TRAFFIC 访存模型算出的实际带宽 (bytes/s)，没有模型的后端为 0
+    bandwidth: float = 0.0
+    residual_history: list = field(default_factory=list)
+    # track_memory=True 时的内存峰值 (memory.MemoryStats)
+    memory: mem_model.MemoryStats = None
+    x: np.ndarray = None
+    y: np.ndarray = None
+
+    @property
+    def compile_seconds(self):
+        return self.compile_time
+
+    @property
+    def solve_seconds(self):
+        return self.wall_time
+
+@dataclass(frozen=True)
+class Backend:
+    module: str
+    function: str
+    defaults: dict = field(default_factory=dict)
+    # 是否接受 history=list 参数 (记录残差/更新量历史)
+    history: bool = False
+    # iterations 是否是整场扫描次数；多重网格的 iterations 是循环数，不算 GUPS
+    sweeps: bool = True
+    # 模块里按显式签名编译核的函数名，没有则用小网格预热代替
+    compile: str = None
+    # 后端最大迭代数参数的名字 (多重网格是 max_cycles)
+    iter_arg: str = "max_iter"
+    # 是否支持 snapshots= (核外求解器放不下快照的整帧缓冲池)
+    snapshots: bool = True
+
+BACKENDS = {
+    "cpu":          Backend("poisson_cpu", "solve_cpu"),
+    "cpu_auto":     Backend("poisson_cpu_parallel", "solve_cpu_auto", history=True, compile="compile_kernels"),
+    "cpu_rbsor":    Backend("poisson_cpu_parallel", "solve_cpu_auto", {"method": "rbsor"}, history=True,
+                            compile="compile_kernels"),
+    "cpu_bf16":     Backend("poisson_lowp", "solve_lowp", {"storage": "bf16"}, history=True,
+                            compile="compile_kernels"),
+    "cpu_fp16":     Backend("poisson_lowp", "solve_lowp", {"storage": "fp16"}, history=True,
+                            compile="compile_kernels"),
+    "shm":          Backend("poisson_shm", "solve_shm", compile="compile_kernels"),
+    "ooc":          Backend("poisson_ooc", "solve_ooc", {"time_block": 8}, history=True, compile="compile_kernels",
+                            snapshots=False),
+    "multigrid":    Backend("poisson_multigrid", "solve_multigrid", history=True, sweeps=False,
+                            iter_arg="max_cycles"),
+    "cg":           Backend("poisson_cg", "solve_cg", history=True, compile="compile_kernels"),
+    "fast_direct":  Backend("poisson_fft", "solve_fast_direct", sweeps=False),
+    "mixed":        Backend("poisson_mixed", "solve_mixed", history=True, sweeps=False),
+    "mixed_torch":  Backend("poisson_mixed", "solve_mixed_torch", history=True, sweeps=False),
+    "torch":        Backend("poisson_pytorch", "solve_pytorch"),
+    "numba":        Backend("poisson_numba", "solve_numba", compile="compile_kernels"),
+    "numba_fp16":   Backend("poisson_numba", "solve_numba", {"storage": "fp16"}, compile="compile_kernels"),
+    "numba_shared": Backend("poisson_numba_final", "solve_numba_shared", compile="compile_kernels"),
+    "cupy":         Backend("poisson_cupy", "solve_cupy"),
+    "cupy_2gpu":    Backend("poisson_cupy_multi", "solve_cupy_2gpu"),
+}
+
+# 没有 compile= 的后端第一次调用时用这么大的网格跑两步预热
+WARMUP_SIZE = 32
+
+_loaded = {}
+_compile_time = {}
+
+def available_backends():
+    return list(BACKENDS)
+
+def load_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {available_backends()}")
+    if name not in _loaded:
+        spec = BACKENDS[name]
+        module = importlib.import_module(spec.module)
+        _loaded[name] = getattr(module, spec.function)
+    return _loaded[name]
+
+def _call(spec, fn, nx, ny, max_iter, tol, kwargs):
+    out = fn(nx=nx, ny=ny, tol=tol, **{spec.iter_arg: max_iter}, **kwargs)
+    # 现有后端返回 (x, y, p, it, t)，solve_cupy_2gpu 只返回 (it, t)
+    if len(out) == 2:
+        return None, None, None, out[0], out[1]
+    return out
+
+def _warm_source(source):
+    # 与网格无关的源项 (解析式、按比例给的点) 原样用于预热；按真实网格给的 (稠密数组、绝对下标的点)
+    # 换成同一条核路径 (点表 / 稠密) 上的默认两点源
+    src = sources.as_source(source)
+    if isinstance(src, sources.Analytic) or (isinstance(src, sources.Points) and src.relative):
+        return src
+    return sources.DEFAULT if src.sparse else sources.Dense(sources.DEFAULT.dense(WARMUP_SIZE, WARMUP_SIZE))
+
+def _warmup(name, spec, fn, kwargs):
+    # 第一次调用某个后端时先编译 (或用小网格跑两步)，把 JIT/kernel 编译时间单独计出来
+    if name in _compile_time:
+        return 0.0
+    if spec.compile:
+        module = importlib.import_module(spec.module)
+        _compile_time[name] = getattr(module, spec.compile)()
+        return _compile_time[name]
+    saved = config.BENCHMARK_MODE
+    config.BENCHMARK_MODE = True
+    t0 = time.perf_counter()
+    try:
+        _call(spec, fn, WARMUP_SIZE, WARMUP_SIZE, 2, 1.0, kwargs)
+    finally:
+        config.BENCHMARK_MODE = saved
+    _compile_time[name] = time.perf_counter() - t0
+    return _compile_time[name]
+
+def solve(backend="cpu_auto", nx=config.NX, ny=config.NY, max_iter=config.MAX_ITER,
+          tol=config.TOLERANCE, warmup=True, track_memory=False, preflight=True, **params):
+    """
+    运行指定后端并返回 SolveResult。params 原样传给后端 (如 method=, time_block=, cycle=)。
+    多重网格的 max_iter 作为最大循环数，tol 作为相对残差；fast_direct 忽略两者。
+    preflight: 分配之前按 memory.FOOTPRINT 估算峰值，放不下时抛 MemoryError。
+    checkpoint= / resume= / snapshots= 原样传给后端 (见 checkpoint.py、snapshots.py)，编译预热不会碰这些文件。
+    initial_guess=: (ny, nx) 初值，只用于真正的求解，预热从 0 开始；按网格给的 source= 在预热时换成默认两点源。
+    source=: 源项 (见 sources.py)，cpu_auto / numba / torch / cpu_bf16 / cpu_fp16 支持，点源时核里不读 b。
+    track_memory: 用 memory.MemoryMonitor 实测峰值 (tracemalloc 会拖慢求解，计时的运行不要打开)。
+    """
+    fn = load_backend(backend)
+    spec = BACKENDS[backend]
+    if params.get("snapshots") is not None and not spec.snapshots:
+        raise ValueError(f"Backend '{backend}' does not support snapshots=")
+    if preflight:
+        mem_model.preflight(backend, nx, ny, params)
+    kwargs = dict(spec.defaults)
+    kwargs.update(params)
+
+    # 预热用 32x32 小网格：不能读写真正的检查点和快照文件，按真实网格尺寸给的初值和源项也放不进去
+    warm_kwargs = {k: v for k, v in kwargs.items() if k not in ("checkpoint", "resume", "snapshots", "initial_guess")}
+    if warm_kwargs.get("source") is not None:
+        warm_kwargs["source"] = _warm_source(warm_kwargs["source"])
+    compile_time = _warmup(backend, spec, fn, warm_kwargs) if warmup else 0.0
+
+    history = []
+    if spec.history:
+        kwargs["history"] = history
+
+    mem = None
+    if track_memory:
+        with mem_model.MemoryMonitor(nx * ny) as monitor:
+            x, y, p, iters, duration = _call(spec, fn, nx, ny, max_iter, tol, kwargs)
+        mem = monitor.stats
+    else:
+        x, y, p, iters, duration = _call(spec, fn, nx, ny, max_iter, tol, kwargs)
+
+    if iters is None:
+        raise RuntimeError(f"Backend '{backend}' is not available on this machine")
+    if x is None:
+        x = np.linspace(config.X_MIN, config.X_MAX, nx)
+        y = np.linspace(config.Y_MIN, config.Y_MAX, ny)
+
+    gups = (nx * ny * iters) / (duration * 1e9) if spec.sweeps and duration > 0 else 0.0
+    # 访存模型要看到后端的默认参数 (例如 ooc 默认 time_block=8)
+    bandwidth = bw_model.achieved_bandwidth(backend, nx, ny, iters, duration, dict(spec.defaults, **params))
+    return SolveResult(backend=backend, field=p, iterations=iters, wall_time=duration,
+                       compile_time=compile_time, gups=gups,
+                       bandwidth=bandwidth if bandwidth == bandwidth else 0.0,
+                       residual_history=history, memory=mem, x=x, y=y)
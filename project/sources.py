@@ -0,0 +1,114 @@
+# sources.py
+# 源项 b 的三种表示：所有后端都分配一个 ny x nx 的 b，里面只有两个非零点 (b[ny/4, nx/4] = 100，b[3ny/4, 3nx/4] = -100)，
+# 每步却要把它整场读一遍，占模板读流量的三分之一。
+#   - Dense：任意的稠密场 (ny, nx)
+#   - Points：稀疏点表 (行, 列, 值)。核里完全不读 b，按不带源项的模板扫一遍，
+#     再只在源点上按带 b 的完整公式重算 (后修正)，结果与稠密 b 逐位相同
+#   - Analytic：f(X, Y) 按物理坐标在网格上求值，得到稠密场
+# 后端接受 source= 参数 (Source 对象、ndarray 或函数，见 as_source)，默认是上面的两点源 (DEFAULT)。
+# 稀疏路径目前在 solve_cpu_auto (Jacobi 逐步核)、solve_numba、solve_pytorch 和 solve_lowp 里；
+# 其余后端 (以及 time_block / rbsor 路径) 用 dense() 展开成稠密 b。
+import numpy as np
+import config
+
+class Source:
+    """源项基类。sparse 为真时后端用点表 (points / csr) 代替稠密 b。"""
+    sparse = False
+
+    def dense(self, nx, ny, dtype=np.float32):
+        raise NotImplementedError
+
+    def points(self, nx, ny, dtype=np.float32):
+        """
+        返回 (idx, val)：idx 为 (n, 2) int64 的 (行, 列)，按行、列排序；val 为 (n,) 的源项值。
+        只含内部点 (边界上的 b 不参与计算，核里重算边界点还会越界)。默认取稠密场的非零点。
+        """
+        b = self.dense(nx, ny, dtype)
+        ys, xs = np.nonzero(b[1:-1, 1:-1])
+        ys, xs = ys + 1, xs + 1
+        return np.stack([ys, xs], axis=1).astype(np.int64), b[ys, xs]
+
+    def csr(self, nx, ny, dtype=np.float32):
+        """按行压缩的点表 (ptr, cols, vals)：第 y 行的源点是 cols[ptr[y]:ptr[y + 1]]，供 CPU 核逐行修正。"""
+        idx, val = self.points(nx, ny, dtype)
+        ptr = np.searchsorted(idx[:, 0], np.arange(ny + 1)).astype(np.int64)
+        return ptr, np.ascontiguousarray(idx[:, 1]), np.ascontiguousarray(val)
+
+class Dense(Source):
+    def __init__(self, b):
+        self.b = np.asarray(b)
+
+    def dense(self, nx, ny, dtype=np.float32):
+        if self.b.shape != (ny, nx):
+            raise ValueError(f"Dense source has shape {self.b.shape}, grid is {(ny, nx)}")
+        return np.array(self.b, dtype=dtype)
+
+class Points(Source):
+    """
+    entries: (行, 列, 值) 的列表。relative=True 时行列是网格尺寸的比例 (行 = int(fy * ny))，与网格大小无关。
+    同一个点出现多次时值相加。
+    """
+    sparse = True
+
+    def __init__(self, entries, relative=False):
+        self.entries = [(y, x, float(v)) for y, x, v in entries]
+        self.relative = relative
+
+    def points(self, nx, ny, dtype=np.float32):
+        acc = {}
+        for y, x, v in self.entries:
+            if self.relative:
+                y, x = int(y * ny), int(x * nx)
+            y, x = int(y), int(x)
+            if not (0 <= y < ny and 0 <= x < nx):
+                raise ValueError(f"Point source ({y}, {x}) is outside the {ny}x{nx} grid")
+            if 0 < y < ny - 1 and 0 < x < nx - 1:
+                acc[y, x] = acc.get((y, x), 0.0) + v
+        keys = sorted(acc)
+        idx = np.array(keys, dtype=np.int64).reshape(len(keys), 2)
+        return idx, np.array([acc[k] for k in keys], dtype=dtype)
+
+    def dense(self, nx, ny, dtype=np.float32):
+        idx, val = self.points(nx, ny, dtype)
+        b = np.zeros((ny, nx), dtype=dtype)
+        b[idx[:, 0], idx[:, 1]] = val
+        return b
+
+class Analytic(Source):
+    """f(X, Y)：X、Y 是 (ny, nx) 的物理坐标 (config.X_MIN..X_MAX, Y_MIN..Y_MAX)，返回可以广播成 (ny, nx) 的源项。"""
+    def __init__(self, f):
+        self.f = f
+
+    def dense(self, nx, ny, dtype=np.float32):
+        x = np.linspace(config.X_MIN, config.X_MAX, nx)
+        y = np.linspace(config.Y_MIN, config.Y_MAX, ny)
+        X, Y = np.meshgrid(x, y)
+        return np.ascontiguousarray(np.broadcast_to(np.asarray(self.f(X, Y), dtype=dtype), (ny, nx)))
+
+# 报告里所有后端用的两点源
+DEFAULT = Points([(0.25, 0.25, 100.0), (0.75, 0.75, -100.0)], relative=True)
+
+def as_source(source):
+    """None -> DEFAULT；Source 原样返回；可调用对象 -> Analytic；数组 -> Dense。"""
+    if source is None:
+        return DEFAULT
+    if isinstance(source, Source):
+        return source
+    if callable(source):
+        return Analytic(source)
+    return Dense(source)
+
+def is_sparse(source):
+    return as_source(source).sparse
+
+if __name__ == "__main__":
+    # 用法: python sources.py 网格大小   (默认两点源的点表，以及稠密 b 与之是否一致)
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    idx, val = DEFAULT.points(n, n)
+    for (y, x), v in zip(idx, val):
+        print(f"b[{y}, {x}] = {v}")
+    ref = np.zeros((n, n), dtype=np.float32)
+    ref[int(n / 4), int(n / 4)] = 100.0
+    ref[int(3 * n / 4), int(3 * n / 4)] = -100.0
+    print("matches dense b:", bool(np.array_equal(DEFAULT.dense(n, n), ref)))
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from collections import defaultdict
+
+# 可选的热路径计时：不用 nsys 也能看到时间在 stencil / copy / check / halo 之间怎么分。
+#   POISSON_TRACE=trace.json python benchmark_cpu_parallel.py    (值为 1 时写到 trace.json)
+# 退出时写 Chrome trace-event JSON (chrome://tracing 或 ui.perfetto.dev 直接打开)，并在 stderr 打印耗时最多的阶段。
+# MPI 下每个 rank 写 trace.rank<N>.json，pid = rank；用 "python tracing.py merge" 合成一个文件。
+# 没设环境变量时 traced / wrap 原样返回函数、span 返回同一个空 context manager。
+# 每步一次的 span (例如每次扫描的 stencil) 用 wrap 在循环外包好核函数，关掉时循环里什么都不多；
+# span 只用在检查、拷贝这类低频阶段。
+# GPU 上的核是异步的，span 默认只量到发射；需要真实耗时时传 sync= (例如 cp.cuda.Device().synchronize)，
+# 只在打开 tracing 时才会调用。
+
+_SETTING = os.environ.get("POISSON_TRACE", "")
+ENABLED = _SETTING not in ("", "0")
+DEFAULT_FILE = "trace.json"
+
+# (name, cat, start_ns, dur_ns, tid, args)
+_events = []
+# perf_counter 只在进程内可比；加上这个偏移换成墙钟，不同进程的事件才能对齐
+_EPOCH_NS = time.time_ns() - time.perf_counter_ns()
+
+def _env_rank():
+    for key in ("OMPI_COMM_WORLD_RANK", "PMI_RANK", "PMIX_RANK", "SLURM_PROCID"):
+        if key in os.environ:
+            return int(os.environ[key])
+    return None
+
+_rank = _env_rank()
+
+def set_rank(rank):
+    """MPI 求解器在拿到 communicator 之后调用，事件的 pid 和输出文件名都按 rank 区分。"""
+    global _rank
+    _rank = rank
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "cat", "sync", "args", "start")
+
+    def __init__(self, name, cat, sync, args):
+        self.name = name
+        self.cat = cat
+        self.sync = sync
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.sync is not None:
+            self.sync()
+        _events.append((self.name, self.cat, self.start, time.perf_counter_ns() - self.start,
+                        threading.get_ident(), self.args))
+        return False
+
+if ENABLED:
+    def span(name, cat="phase", sync=None, **args):
+        """with tracing.span("stencil"): ... 记录一段耗时。args 会出现在 trace 的详情里。"""
+        return _Span(name, cat, sync, args)
+
+    def traced(fn):
+        """求解函数的装饰器：整次调用记为一个 cat="solve" 的 span。"""
+        def wrapper(*a, **kw):
+            with _Span(fn.__name__, "solve", None, {}):
+                return fn(*a, **kw)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def wrap(fn, name, cat="phase", sync=None, **args):
+        """step = tracing.wrap(step, "stencil")：每次调用 fn 记为一个 span。在循环外调用。"""
+        def wrapper(*a, **kw):
+            with _Span(name, cat, sync, args):
+                return fn(*a, **kw)
+        wrapper.__wrapped__ = fn
+        return wrapper
+else:
+    def span(name, cat="phase", sync=None, **args):
+        return _NULL
+
+    def traced(fn):
+        return fn
+
+    def wrap(fn, name, cat="phase", sync=None, **args):
+        return fn
+
+def events():
+    """到目前为止记录的事件 (Chrome trace-event 格式的 dict 列表)。"""
+    pid = os.getpid() if _rank is None else _rank
+    tids = {}
+    out = []
+    for name, cat, start, dur, tid, args in _events:
+        out.append({"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tids.setdefault(tid, len(tids)),
+                    "ts": (_EPOCH_NS + start) / 1e3, "dur": dur / 1e3, "args": args})
+    label = f"rank {_rank}" if _rank is not None else f"pid {os.getpid()}"
+    out.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": label}})
+    return out
+
+def clear():
+    _events.clear()
+
+def output_path(suffix=None):
+    """输出文件名：POISSON_TRACE 的值 (为 1 时用 trace.json)，MPI 下加 .rank<N>，suffix 再加一段。"""
+    path = _SETTING if _SETTING not in ("", "0", "1") else DEFAULT_FILE
+    root, ext = os.path.splitext(path)
+    if _rank is not None:
+        root += f".rank{_rank}"
+    if suffix:
+        root += f".{suffix}"
+    return root + (ext or ".json")
+
+def write(path=None):
+    """写 Chrome trace JSON，返回文件名；没有事件时不写。"""
+    if not _events:
+        return None
+    path = path or output_path()
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events(), "displayTimeUnit": "ms"}, f)
+    return path
+
+def summarize(trace_events, top=10):
+    """
+    按名字合并 "X" 事件：返回 [(name, calls, total_us, mean_us, pct)]，按总时间降序。
+    pct 是占最外层 cat="solve" span 总时间的比例 (没有 solve span 时占全部事件之和)。
+    嵌套调用的求解函数 (例如混合精度里的多重网格) 只按最外层计时。
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+    solve_total = 0.0
+    all_total = 0.0
+    solve_end = {}
+    for ev in sorted((e for e in trace_events if e.get("ph") == "X"), key=lambda e: e["ts"]):
+        if ev.get("cat") == "solve":
+            key = (ev["pid"], ev["tid"])
+            if ev["ts"] >= solve_end.get(key, float("-inf")):
+                solve_total += ev["dur"]
+                solve_end[key] = ev["ts"] + ev["dur"]
+            continue
+        t = totals[ev["name"]]
+        t[0] += 1
+        t[1] += ev["dur"]
+        all_total += ev["dur"]
+    base = solve_total or all_total or 1.0
+    rows = [(name, calls, total, total / calls, 100.0 * total / base) for name, (calls, total) in totals.items()]
+    rows.sort(key=lambda r: -r[2])
+    return rows[:top]
+
+def print_summary(trace_events=None, top=10, file=sys.stderr, label=None):
+    if trace_events is None:
+        trace_events = events()
+        label = label or (f"rank {_rank}" if _rank is not None else f"pid {os.getpid()}")
+    rows = summarize(trace_events, top)
+    label = label or "all processes"
+    print("==========================================================================", file=file)
+    print(f" Trace Summary ({label}, {sum(1 for e in trace_events if e.get('ph') == 'X')} spans)", file=file)
+    print("==========================================================================", file=file)
+    print(f"{'Phase':^20} | {'Calls':^8} | {'Total (ms)':^10} | {'Mean (us)':^10} | {'% of solve':^10}", file=file)
+    print("-" * 72, file=file)
+    for name, calls, total, mean, pct in rows:
+        print(f"{name:^20} | {calls:^8} | {total / 1e3:^10.3f} | {mean:^10.2f} | {pct:^10.1f}", file=file)
+    print("-" * 72, file=file)
+
+def merge(paths, out):
+    """把多个 rank / 进程的 trace 文件合成一个 (时间戳已经是墙钟，直接拼接)。"""
+    merged = []
+    for path in paths:
+        with open(path) as f:
+            merged.extend(json.load(f)["traceEvents"])
+    with open(out, "w") as f:
+        json.dump({"traceEvents": merged, "displayTimeUnit": "ms"}, f)
+    return out
+
+def _at_exit():
+    path = write()
+    if path:
+        print_summary()
+        print(f"Trace written: {path}", file=sys.stderr)
+
+if ENABLED:
+    atexit.register(_at_exit)
+
+if __name__ == "__main__":
+    # 用法: python tracing.py summary trace.json [N]
+    #       python tracing.py merge out.json trace.rank0.json trace.rank1.json ...
+    if len(sys.argv) >= 3 and sys.argv[1] == "summary":
+        with open(sys.argv[2]) as f:
+            print_summary(json.load(f)["traceEvents"], int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+                          file=sys.stdout)
+    elif len(sys.argv) >= 4 and sys.argv[1] == "merge":
+        print(f"Merged {len(sys.argv) - 3} files into {merge(sys.argv[3:], sys.argv[2])}")
+    else:
+        print("usage: python tracing.py summary FILE [N] | merge OUT FILES...")
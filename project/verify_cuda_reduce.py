@@ -0,0 +1,59 @@
+# 不需要 GPU 也能跑：NUMBA_ENABLE_CUDASIM=1 python verify_cuda_reduce.py
+# 检查 1) 显存归约与 NumPy 结果一致 2) 自适应间隔能收敛 3) 两个 Numba CUDA 求解器与 CPU 版逐步一致
+import numpy as np
+import numba
+import config
+from numba import cuda
+from cuda_reduce import DeviceMaxAbsDiff, AdaptiveInterval
+
+def check_reduction():
+    rng = np.random.default_rng(0)
+    for ny, nx in [(1, 1), (17, 33), (64, 64), (129, 70)]:
+        a = rng.standard_normal((ny, nx)).astype(np.float32)
+        c = rng.standard_normal((ny, nx)).astype(np.float32)
+        got = DeviceMaxAbsDiff(nx, ny)(cuda.to_device(a), cuda.to_device(c))
+        want = float(np.abs(a - c).max())
+        status = "OK" if got == want else "FAILED"
+        print(f"  max|a-c| {ny}x{nx:<4}: device {got:.6f} | numpy {want:.6f} | {status}")
+
+def check_interval():
+    # max|dp| = 0.9^it，从 1 衰减到 1e-6 大约 131 步
+    interval = AdaptiveInterval(start=10, min_interval=1)
+    it, checks, tol = 0, 0, 1e-6
+    while 0.9 ** it >= tol:
+        it += interval.next(it, 0.9 ** it, tol)
+        checks += 1
+    print(f"  adaptive interval: converged at it={it} after {checks} checks (exact: 132)")
+
+    # tol=0 表示跑满步数：不能对 tol/diff 取对数，间隔只放宽到上限
+    interval = AdaptiveInterval(start=10, min_interval=1, max_interval=640)
+    steps = [interval.next(it, 0.9 ** it, 0.0) for it in range(0, 1000, 100)]
+    status = "OK" if steps[-1] == 640 else "FAILED"
+    print(f"  adaptive interval, tol=0: intervals {steps[:4]}... -> {steps[-1]} | {status}")
+
+def check_solvers(nx=40, ny=24, steps=250):
+    from poisson_cpu_parallel import solve_cpu_auto
+    from poisson_numba import solve_numba
+    from poisson_numba_final import solve_numba_shared
+
+    saved = config.BENCHMARK_MODE
+    try:
+        config.BENCHMARK_MODE = False
+        # tol=0 不会提前停止，跑满 steps 步；steps > 2*CHECK_INTERVAL 以覆盖自适应间隔的 tol=0 分支
+        _, _, p_gpu, it_gpu, _ = solve_numba(nx, ny, steps, 0.0)
+        _, _, p_sh, it_sh, _ = solve_numba_shared(nx, ny, steps, 0.0)
+        config.BENCHMARK_MODE = True
+        _, _, p_cpu, _, _ = solve_cpu_auto(nx, ny, steps)
+    finally:
+        config.BENCHMARK_MODE = saved
+
+    scale = np.abs(p_cpu).max()
+    for name, p, it in (("solve_numba", p_gpu, it_gpu), ("solve_numba_shared", p_sh, it_sh)):
+        err = np.abs(p - p_cpu).max() / scale
+        print(f"  {name:<18} {nx}x{ny}, {it} steps: rel. diff vs CPU {err:.2e} | {'OK' if err < 1e-5 else 'FAILED'}")
+
+if __name__ == "__main__":
+    print(f"CUDA simulator: {bool(numba.config.ENABLE_CUDASIM)}")
+    check_reduction()
+    check_interval()
+    check_solvers()
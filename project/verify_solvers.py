@@ -0,0 +1,64 @@
+# 检查 solvers.solve 的参数处理：python verify_solvers.py
+# 每项检查都从空的注册表开始 (第一次调用会走 32x32 的预热)，打印 OK / FAILED
+import os
+import tempfile
+import dataclasses
+import numpy as np
+import config
+import solvers
+import sources
+
+def fresh_solve(backend, *args, **kwargs):
+    solvers._loaded.clear()
+    solvers._compile_time.clear()
+    return solvers.solve(backend, *args, **kwargs)
+
+def check_initial_guess(n=40, backends=("cpu", "cpu_auto", "multigrid", "mixed")):
+    # 预热网格比 n 小，按 n 给的初值不能传进预热
+    guess = np.zeros((n, n), dtype=np.float32)
+    for name in backends:
+        try:
+            res = fresh_solve(name, nx=n, ny=n, max_iter=20, tol=1e-6, initial_guess=guess)
+            status = "OK" if res.field.shape == (n, n) else "FAILED"
+        except ValueError as e:
+            status = f"FAILED ({e})"
+        print(f"  initial_guess {n}x{n} on fresh {name:<10}: {status}")
+
+def check_source(n=40):
+    # 按 n 给的源项 (稠密数组 / 绝对下标的点) 在预热时要换掉；走小网格预热的 cpu_auto 代替 torch
+    solvers.BACKENDS["cpu_auto_warm"] = dataclasses.replace(solvers.BACKENDS["cpu_auto"], compile=None)
+    b = sources.DEFAULT.dense(n, n)
+    cases = (("ndarray", b), ("Points", sources.Points([(n - 5, n - 5, 100.0)])),
+             ("Analytic", lambda X, Y: X * Y))
+    try:
+        for label, source in cases:
+            try:
+                res = fresh_solve("cpu_auto_warm", nx=n, ny=n, max_iter=20, tol=1e-6, source=source)
+                want = solvers.solve("cpu_auto", nx=n, ny=n, max_iter=20, tol=1e-6, source=source).field
+                status = "OK" if np.array_equal(res.field, want) else "FAILED"
+            except ValueError as e:
+                status = f"FAILED ({e})"
+            print(f"  source={label:<8} {n}x{n} on fresh warm-up backend: {status}")
+    finally:
+        del solvers.BACKENDS["cpu_auto_warm"]
+
+def check_resume_after_convergence(nx=70, ny=50):
+    # 作业脚本每次都带 resume：已经收敛的运行再续算一次，场和步数都不能变
+    cases = (("cpu", {}), ("cpu_auto", {}), ("cpu_auto", {"time_block": 4}), ("cpu_rbsor", {}),
+             ("cpu_bf16", {}), ("shm", {}), ("ooc", {}))
+    with tempfile.TemporaryDirectory() as tmp:
+        for k, (name, params) in enumerate(cases):
+            path = os.path.join(tmp, f"ckpt{k}")
+            first = solvers.solve(name, nx=nx, ny=ny, max_iter=5000, tol=1e-6, checkpoint=path, **params)
+            again = solvers.solve(name, nx=nx, ny=ny, max_iter=5000, tol=1e-6, checkpoint=path, resume=True,
+                                  **params)
+            same = again.iterations == first.iterations and np.array_equal(again.field, first.field)
+            status = "OK" if same and first.iterations < 5000 else "FAILED"
+            label = name + "".join(f" {k}={v}" for k, v in params.items())
+            print(f"  resume after convergence {label:<22}: it {first.iterations} -> {again.iterations} | {status}")
+
+if __name__ == "__main__":
+    config.BENCHMARK_MODE = False
+    check_initial_guess()
+    check_source()
+    check_resume_after_convergence()
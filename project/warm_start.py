@@ -0,0 +1,67 @@
+import numpy as np
+import time
+import config
+import solvers
+from scipy.interpolate import RectBivariateSpline
+
+# 网格尺寸扫描 50 -> 100 -> ... -> 2000 时，把上一个尺寸的收敛解插值到下一个网格上作为初值
+# (nested iteration)，代替每次都从全 0 开始。
+
+def base_tolerance(size, base_tol=1e-7):
+    """基准脚本里的动态容差：Tol = Tol_base / (Size/50)^2。"""
+    return base_tol / ((size / 50.0) ** 2)
+
+def interpolate_field(p, nx, ny, order=1):
+    """
+    把 (ny_c, nx_c) 的场插值到 (ny, nx) 网格上 (同一物理区域)。
+    order=1 为双线性，order=3 为双三次样条。边界按 Dirichlet 条件置 0。
+    """
+    if order not in (1, 3):
+        raise ValueError(f"Unknown interpolation order {order}, expected 1 or 3")
+    ny_c, nx_c = p.shape
+    spline = RectBivariateSpline(np.linspace(config.Y_MIN, config.Y_MAX, ny_c),
+                                 np.linspace(config.X_MIN, config.X_MAX, nx_c),
+                                 np.asarray(p, dtype=np.float64), kx=order, ky=order)
+    out = spline(np.linspace(config.Y_MIN, config.Y_MAX, ny),
+                 np.linspace(config.X_MIN, config.X_MAX, nx)).astype(p.dtype)
+    out[0, :] = out[-1, :] = 0.0
+    out[:, 0] = out[:, -1] = 0.0
+    return out
+
+def source_scale(n_coarse, n_fine):
+    """
+    b 是固定节点值 ±100 的点源，对应的物理源强度是 100 * dx * dy，随网格加密而变小，
+    解也按单元面积同比例缩小。粗网格解要乘上面积比才是细网格解的近似。
+    """
+    return ((n_coarse - 1) / (n_fine - 1)) ** 2
+
+def nested_sweep(backend, sizes, order=1, tol_fn=base_tolerance, max_iter=config.MAX_ITER,
+                 cold=True, **params):
+    """
+    依次求解 sizes 中的每个方形网格，每一级都用上一级 (warm) 的解插值 (并按 source_scale 缩放)
+    作为 initial_guess。
+    cold=True 时同时跑一次从 0 开始的求解作对照。
+    返回每个尺寸一行的 dict 列表：size, tol, warm_iters, warm_time, cold_iters, cold_time, interp_time。
+    """
+    rows = []
+    prev = None
+    for size in sizes:
+        tol = tol_fn(size)
+        t0 = time.perf_counter()
+        guess = None
+        if prev is not None:
+            guess = interpolate_field(prev, size, size, order) * source_scale(prev.shape[0], size)
+        interp_time = time.perf_counter() - t0
+
+        warm = solvers.solve(backend, nx=size, ny=size, max_iter=max_iter, tol=tol,
+                             initial_guess=guess, **params)
+        row = {"size": size, "tol": tol, "interp_time": interp_time,
+               "warm_iters": warm.iterations, "warm_time": warm.wall_time,
+               "cold_iters": None, "cold_time": None}
+        if cold:
+            ref = solvers.solve(backend, nx=size, ny=size, max_iter=max_iter, tol=tol, **params)
+            row["cold_iters"] = ref.iterations
+            row["cold_time"] = ref.wall_time
+        rows.append(row)
+        prev = warm.field
+    return rows